@@ -0,0 +1,332 @@
+"""
+Benchmarks of the render engines and animation generators.
+
+Each benchmark runs a hot path headlessly with a fixed seed, and reports
+operations per second, per operation latency percentiles and peak memory.
+
+python bench.py                     Run everything.
+python bench.py game screensaver    Only benchmarks whose name contains one of these.
+python bench.py --save base.json    Save results as a baseline.
+python bench.py --compare base.json Compare against a baseline, and exit 1 on regressions.
+python bench.py --board 810x270     Stress test on a board 100 times larger.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+ESCAPEROOM = os.path.join(ROOT, "escaperoom")
+sys.path.insert(0, SRC)
+
+import numpy as np
+import pygame
+
+from layout import BoardLayout, parse_grid
+
+# Board every benchmark runs on. Set with --board.
+LAYOUT = BoardLayout()
+
+
+class StopBench(Exception):
+    pass
+
+
+class BenchDisplay:
+    """
+    Stands in for Display when benchmarking generators: sleeps return at once,
+    and every commit is timed as one operation. Stops the generator after max_ops commits.
+    """
+
+    def __init__(self, max_ops):
+        self.layout = LAYOUT
+        self.board = LAYOUT.zeros()
+        self.run = True
+        self.max_ops = max_ops
+        self.times = []
+        self.last = time.perf_counter_ns()
+
+    def commit(self):
+        now = time.perf_counter_ns()
+        self.times.append(now - self.last)
+        self.last = now
+        if len(self.times) >= self.max_ops:
+            raise StopBench
+
+    def notify(self):
+        pass
+
+    def sleep(self, seconds):
+        if len(self.times) >= self.max_ops:
+            raise StopBench
+
+    @contextmanager
+    def frame(self):
+        yield self.board
+        self.commit()
+
+    def __setattr__(self, name, value):
+        # matrix() assigns whole boards instead of committing.
+        if name == "board" and "board" in self.__dict__:
+            self.__dict__["board"] = np.asarray(value, dtype=bool)
+            self.commit()
+        else:
+            super().__setattr__(name, value)
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def life_boards(count, seed):
+    """
+    Realistic board sequence: game of life from a random start, reseeded every 150 steps.
+    """
+    import game_of_life
+    rng = np.random.default_rng(seed)
+    boards = []
+    board = None
+    for i in range(count):
+        if i % 150 == 0:
+            board = rng.random(LAYOUT.shape) < 0.5
+        else:
+            game_of_life.game_step(board)
+        boards.append(board.copy())
+    return boards
+
+
+def bench_draw_board(engine):
+    def setup(ops, seed):
+        from display import Display
+        disp = Display(load_params=False, geometry_cache=None, engine=engine, headless=True, layout=LAYOUT)
+        boards = life_boards(ops, seed)
+        disp.draw_board()
+        state = {"i": 0}
+
+        def op():
+            disp.board[:] = boards[state["i"] % len(boards)]
+            state["i"] += 1
+            disp.draw_board()
+        return op
+    return setup
+
+
+def bench_draw_dots(ops, seed):
+    # draw.py loads its font from the working directory.
+    pygame.font.init()
+    draw = load_module("escaperoom_draw", os.path.join(ESCAPEROOM, "draw.py"))
+    rng = np.random.default_rng(seed)
+    boards = [rng.random(LAYOUT.shape) < 0.5 for _ in range(min(ops, 100))]
+    state = {"i": 0}
+
+    def op():
+        draw.draw_dots(boards[state["i"] % len(boards)])
+        state["i"] += 1
+    return op
+
+
+def bench_game_step(ops, seed):
+    import game_of_life
+    board = np.random.default_rng(seed).random(LAYOUT.shape) < 0.5
+
+    def op():
+        game_of_life.game_step(board)
+    return op
+
+
+def bench_spectrogram(ops, seed):
+    import audio
+    sample_rate = 44100
+    rng = np.random.default_rng(seed)
+    t = np.arange(sample_rate * 2) / sample_rate
+    signal = 0.1 * np.sin(2 * np.pi * (100 + 200 * t) * t) + 0.01 * rng.standard_normal(len(t))
+    chunk_size = sample_rate // 15
+    disp = BenchDisplay(max_ops=float("inf"))
+    state = {"i": 0}
+
+    def op():
+        i = state["i"] * chunk_size % (len(signal) - chunk_size)
+        audio.display_spectrogram(disp, signal[i:i + chunk_size], sample_rate)
+        state["i"] += 1
+    return op
+
+
+def bench_animation(name, make_args):
+    """
+    Generators run until they commit `ops` frames. Each frame is one operation.
+    """
+    def run(ops, seed):
+        import screensaver
+        random.seed(seed)
+        np.random.seed(seed)
+        disp = BenchDisplay(ops)
+        func = getattr(screensaver, name.split("_", 1)[0] if name.startswith("erase") else name)
+        while True:
+            try:
+                func(disp, *make_args(disp))
+            except StopBench:
+                return disp.times
+    return run
+
+
+def erase_args(choice):
+    # erase() picks its variant with random.random().
+    def make_args(disp):
+        disp.board[:] = LAYOUT.resize(np.load("ultimate.npy"))
+        random.random = lambda: choice
+        return ()
+    return make_args
+
+
+def text_args(disp):
+    return (LAYOUT.resize(np.load("ultimate.npy")),)
+
+
+# Timed per call: name -> setup(ops, seed) returning op().
+OPS = {
+    "draw_board/full": bench_draw_board("full"),
+    "draw_board/dirty": bench_draw_board("dirty"),
+    "draw_board/sparse": bench_draw_board("sparse"),
+    "escaperoom/draw_dots": bench_draw_dots,
+    "game_of_life/game_step": bench_game_step,
+    "audio/display_spectrogram": bench_spectrogram,
+}
+
+# Timed per committed frame: name -> run(ops, seed) returning frame times in ns.
+ANIMATIONS = {
+    "screensaver/" + name: bench_animation(name, make_args) for name, make_args in {
+        "falling_columns": text_args,
+        "floodfill": text_args,
+        "pixel_slide_in": text_args,
+        "elastic_slide": text_args,
+        "matrix": lambda disp: (LAYOUT.zeros(),),
+        "erase_sweep": erase_args(0.1),
+        "erase_random": erase_args(0.3),
+        "erase_radial": erase_args(0.5),
+        "erase_streak": erase_args(0.7),
+        "erase_shatter": erase_args(0.9),
+    }.items()
+}
+
+
+def set_board(cols, rows):
+    global LAYOUT
+    LAYOUT = BoardLayout(rows, cols)
+
+
+def measure(name, ops, seed):
+    """
+    Returns result dict. Timing and peak memory are measured in separate runs,
+    as tracemalloc slows down allocation heavy code.
+    """
+    real_random = random.random
+
+    def run(count):
+        random.random = real_random
+        if name in OPS:
+            op = OPS[name](count, seed)
+            # Only count memory used while running, not setup.
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            times = []
+            for _ in range(count):
+                start = time.perf_counter_ns()
+                op()
+                times.append(time.perf_counter_ns() - start)
+            return times
+        return ANIMATIONS[name](count, seed)
+
+    try:
+        times = np.array(run(ops)) / 1e6
+        tracemalloc.start()
+        run(max(1, ops // 10))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    finally:
+        random.random = real_random
+
+    return {
+        "ops": len(times),
+        "ops_per_sec": float(len(times) / (times.sum() / 1e3)),
+        "p50_ms": float(np.percentile(times, 50)),
+        "p95_ms": float(np.percentile(times, 95)),
+        "p99_ms": float(np.percentile(times, 99)),
+        "max_ms": float(times.max()),
+        "peak_kb": peak / 1024,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print change in throughput against baseline. Returns names of regressions.
+    """
+    regressions = []
+    print()
+    print(f"{'benchmark':32s} {'baseline':>10s} {'now':>10s} {'change':>8s}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["ops_per_sec"]
+        change = result["ops_per_sec"] / before - 1
+        flag = ""
+        if change < -tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:32s} {before:10.1f} {result['ops_per_sec']:10.1f} {change * 100:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("filter", nargs="*", help="Only run benchmarks whose name contains one of these.")
+    parser.add_argument("--ops", type=int, default=200, help="Operations (calls or frames) per benchmark.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Write results to this JSON file.")
+    parser.add_argument("--compare", help="Baseline JSON file to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed throughput drop against the baseline.")
+    parser.add_argument("--board", type=parse_grid, metavar="COLSxROWS", help="Run on a board of this size (default 81x27).")
+    args = parser.parse_args()
+    if args.board is not None:
+        set_board(*args.board)
+    # Display parses the command line for its own flags.
+    sys.argv = sys.argv[:1]
+
+    # Generators load their assets from the working directory.
+    os.chdir(SRC)
+    names = [name for name in list(OPS) + list(ANIMATIONS) if not args.filter or any(f in name for f in args.filter)]
+    results = {}
+    print(f"{'benchmark':32s} {'ops/s':>10s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'peak KiB':>9s}")
+    for name in names:
+        try:
+            result = measure(name, args.ops, args.seed)
+        except (FileNotFoundError, pygame.error) as e:
+            print(f"{name:32s} skipped: {e}")
+            continue
+        results[name] = result
+        print(
+            f"{name:32s} {result['ops_per_sec']:10.1f} {result['p50_ms']:8.3f} {result['p95_ms']:8.3f} "
+            f"{result['p99_ms']:8.3f} {result['peak_kb']:9.1f}"
+        )
+
+    if args.save is not None:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=4)
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
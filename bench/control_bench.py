@@ -0,0 +1,84 @@
+"""
+Loopback latency of the control socket.
+
+Runs a headless Display with a daemon redrawing the board, and times key
+presses sent over TCP and a UNIX socket from send to the keydown hook being
+called, and to the reply arriving back.
+
+python control_bench.py [--keys N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from threading import Thread
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import numpy as np
+
+
+def busy_daemon(disp):
+    """
+    Keep the render loop and GIL busy, like a real program.
+    """
+    rng = np.random.default_rng(0)
+    while disp.run:
+        disp.board = rng.random(disp.board.shape) < 0.5
+        disp.sleep(1 / 30)
+
+
+def measure(disp, keys, tmp, results):
+    from control import ControlClient, ControlServer
+
+    hooked = []
+    disp.keydown_hooks.append(lambda disp, key: hooked.append(time.perf_counter()))
+    path = os.path.join(tmp, "control.sock")
+    server = ControlServer(disp.control, ("127.0.0.1", 0), path)
+    server.start()
+    for transport in ("tcp", "unix"):
+        if transport == "tcp":
+            client = ControlClient(tcp=server.listeners[0].getsockname())
+        else:
+            client = ControlClient(unix=path)
+        sent = []
+        replied = []
+        hooked.clear()
+        for i in range(keys):
+            sent.append(time.perf_counter())
+            assert client.send("key up") == "ok"
+            replied.append(time.perf_counter())
+            # Spread the presses over the frame period.
+            time.sleep(0.003)
+        client.close()
+        results.append((transport, np.array(hooked) - sent, np.array(replied) - sent))
+    server.close()
+    disp.run = False
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keys", type=int, default=1000)
+    args = parser.parse_args()
+    sys.argv = sys.argv[:1] + ["--headless"]
+
+    from display import Display
+    disp = Display(load_params=False, geometry_cache=None)
+    disp.add_daemon(busy_daemon, (disp,))
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        Thread(target=measure, args=(disp, args.keys, tmp, results), daemon=True).start()
+        disp.start()
+
+    for transport, hook, reply in results:
+        print(
+            f"{transport:4s}  send to hook p50 {np.percentile(hook, 50) * 1e3:6.3f} ms  p99 {np.percentile(hook, 99) * 1e3:6.3f} ms  "
+            f"max {hook.max() * 1e3:6.3f} ms   round trip p50 {np.percentile(reply, 50) * 1e3:6.3f} ms  "
+            f"p99 {np.percentile(reply, 99) * 1e3:6.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
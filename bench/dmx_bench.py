@@ -0,0 +1,112 @@
+"""
+Load test of the Art-Net/sACN receiver on localhost.
+
+A fake console sends every mapped universe at 44 Hz (a full DMX refresh),
+optionally followed by a sync packet, to a DmxReceiver on a headless Display.
+Fewer channels per universe spreads the board over more universes. Reports
+frames committed per second, last packet to commit latency and CPU use.
+
+python dmx_bench.py [--seconds S] [--rate HZ] [--widths 512 128 32 8]
+"""
+
+import argparse
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import numpy as np
+
+
+def run(disp, protocol, width, sync, seconds, rate):
+    import dmx
+
+    receiver = dmx.DmxReceiver(
+        disp, artnet=protocol == "artnet", sacn=protocol == "sacn", channels_per_universe=width,
+        bind="127.0.0.1", artnet_port=0, sacn_port=0,
+    )
+    address = next(iter(receiver.sockets)).getsockname()
+    commits = []
+    commit = receiver.commit
+
+    def timed_commit():
+        commit()
+        commits.append(time.perf_counter())
+
+    receiver.commit = timed_commit
+    receiver.start()
+
+    # Random levels per frame, so every commit changes the board.
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (receiver.universes, width), dtype=np.uint8) for _ in range(16)]
+    packets = []
+    for levels in frames:
+        if protocol == "artnet":
+            frame = [dmx.artdmx_packet(u + 1, levels[u], 1) for u in range(receiver.universes)]
+            if sync:
+                frame.append(dmx.artsync_packet())
+        else:
+            frame = [dmx.e131_packet(u + 1, levels[u], 1, 1 if sync else 0) for u in range(receiver.universes)]
+            if sync:
+                frame.append(dmx.e131_sync_packet(1))
+        packets.append(frame)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sent = []
+    count = int(seconds * rate)
+    cpu = time.process_time()
+    start = time.perf_counter()
+    for i in range(count):
+        target = start + i / rate
+        while time.perf_counter() < target:
+            time.sleep(max(min(target - time.perf_counter(), 1e-3), 0))
+        *frame, last = packets[i % len(packets)]
+        for packet in frame:
+            sock.sendto(packet, address)
+        sent.append(time.perf_counter())
+        sock.sendto(last, address)
+    time.sleep(0.1)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+
+    disp.run = False
+    receiver.thread.join()
+    disp.run = True
+    receiver.close()
+    sock.close()
+
+    # Match each commit to the frame whose last packet was sent just before it.
+    sent = np.array(sent)
+    commits = np.array(commits)
+    index = np.searchsorted(sent, commits) - 1
+    latencies = (commits - sent[np.clip(index, 0, None)])[index >= 0]
+    if not len(latencies):
+        latencies = np.zeros(1)
+    print(
+        f"{protocol:6s} {receiver.universes:4d} universes x {width:3d} ch  {'sync' if sync else '    '}  "
+        f"{receiver.packets / elapsed:7.0f} packets/s  {receiver.frames / elapsed:5.1f} frames/s ({receiver.frames}/{count})  "
+        f"latency p50 {np.percentile(latencies, 50) * 1e3:5.2f} ms  p99 {np.percentile(latencies, 99) * 1e3:5.2f} ms  "
+        f"CPU {cpu / elapsed * 100:4.0f}%"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--rate", type=float, default=44, help="Console refresh rate.")
+    parser.add_argument("--widths", type=int, nargs="+", default=[512, 128, 32, 8], help="Channels per universe to test.")
+    args = parser.parse_args()
+    sys.argv = sys.argv[:1]
+
+    from display import Display
+    disp = Display(load_params=False, geometry_cache=None, headless=True)
+    for protocol in ("artnet", "sacn"):
+        for width in args.widths:
+            for sync in (False, True):
+                run(disp, protocol, width, sync, args.seconds, args.rate)
+
+
+if __name__ == "__main__":
+    main()
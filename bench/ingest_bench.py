@@ -0,0 +1,77 @@
+"""
+Throughput and latency of frame ingest on localhost.
+
+Sends frames to a FrameReceiver on a headless Display, over UDP and a UNIX
+socket, at a fixed rate and flat out, and reports frames applied per second,
+drops and send to apply latency.
+
+python ingest_bench.py [--frames N] [--fps FPS]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import numpy as np
+
+
+def run(disp, transport, frames, fps):
+    from ingest import FrameReceiver, FrameSender
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if transport == "udp":
+            address = ("127.0.0.1", 0)
+            receiver = FrameReceiver(disp, udp=address)
+            sender = FrameSender(udp=receiver.sockets[0].getsockname())
+        else:
+            path = os.path.join(tmp, "ingest.sock")
+            receiver = FrameReceiver(disp, unix=path)
+            sender = FrameSender(unix=path)
+        receiver.start()
+
+        boards = np.random.default_rng(0).random((64, 27, 81)) < 0.5
+        start = time.perf_counter()
+        for i in range(frames):
+            sender.send(boards[i % len(boards)])
+            if fps:
+                target = start + (i + 1) / fps
+                while time.perf_counter() < target:
+                    pass
+        elapsed = time.perf_counter() - start
+        # Let the receiver catch up.
+        time.sleep(0.2)
+
+        disp.run = False
+        receiver.thread.join()
+        disp.run = True
+        sender.close()
+        receiver.close()
+
+    stats = receiver.stats()
+    print(
+        f"{transport:5s} {'flat out' if not fps else f'{fps:g} fps':>9s}  sent {frames / elapsed:9.0f}/s  "
+        f"applied {stats['applied'] / elapsed:8.0f}/s ({stats['applied']}/{frames})  late {stats['dropped']}  "
+        f"latency p50 {stats['latency_p50'] * 1e3:6.3f} ms  p99 {stats['latency_p99'] * 1e3:6.3f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--fps", type=float, default=240, help="Rate for the paced run.")
+    args = parser.parse_args()
+    sys.argv = sys.argv[:1]
+
+    from display import Display
+    disp = Display(load_params=False, geometry_cache=None, headless=True)
+    for transport in ("udp", "unix"):
+        run(disp, transport, args.frames, args.fps)
+        run(disp, transport, args.frames, 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Stress test of the render and animation paths on larger boards.
+
+Runs bench.py's benchmarks, and the one off projection geometry build, on
+boards of the 27x81 shape scaled up in area by each factor, and reports the
+time per operation and per dot. Work that grows linearly with the board
+keeps its time per dot flat (or falling, as fixed costs are spread out),
+while a quadratic loop shows up as time per dot growing with the board.
+Exits 1 if any benchmark's time per dot grows more than --tolerance times.
+
+Linear isn't fast: the full and dirty engines still draw every dot with
+its own cv2.circle call (stamp_dots), about 3 us per dot, so only sparse
+keeps up with boards 100 times larger.
+
+python stress_bench.py [--scales 1 10 100] [--ops N] [filter...]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pygame
+
+import bench
+from layout import COLS, ROWS
+
+
+def geometry_build():
+    """
+    Seconds to build everything the renderers need for bench.LAYOUT.
+    """
+    from display import DrawParams, Geometry
+    start = time.perf_counter()
+    geometry = Geometry(DrawParams(), 1280, 720, bench.LAYOUT)
+    geometry.neighbour_boxes
+    geometry.footprints
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("filter", nargs="*", help="Only run benchmarks whose name contains one of these.")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100], help="Board areas, relative to 27x81.")
+    parser.add_argument("--ops", type=int, default=20, help="Operations (calls or frames) per benchmark.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=3, help="Allowed growth of the time per dot.")
+    args = parser.parse_args()
+    sys.argv = sys.argv[:1]
+
+    os.chdir(bench.SRC)
+    names = ["geometry/build"] + list(bench.OPS) + list(bench.ANIMATIONS)
+    names = [name for name in names if not args.filter or any(f in name for f in args.filter)]
+    # name -> [(dots, ms per op)] per scale
+    results = {name: [] for name in names}
+    for scale in args.scales:
+        rows, cols = round(ROWS * scale**0.5), round(COLS * scale**0.5)
+        bench.set_board(cols, rows)
+        print(f"{cols}x{rows} board, {rows * cols} dots")
+        for name in list(results):
+            try:
+                if name == "geometry/build":
+                    ms = geometry_build() * 1e3
+                else:
+                    ms = 1e3 / bench.measure(name, args.ops, args.seed)["ops_per_sec"]
+            except (FileNotFoundError, pygame.error) as e:
+                print(f"  {name:32s} skipped: {e}")
+                results.pop(name)
+                continue
+            results[name].append((rows * cols, ms))
+            print(f"  {name:32s} {ms:10.3f} ms  {ms * 1e6 / (rows * cols):10.1f} ns per dot")
+
+    print()
+    print(f"{'benchmark':32s} " + " ".join(f"{f'{scale:g}x':>9s}" for scale in args.scales) + "   (time per dot, relative to the first)")
+    superlinear = []
+    for name, points in results.items():
+        per_dot = [ms / dots for dots, ms in points]
+        growth = [value / per_dot[0] for value in per_dot]
+        flag = ""
+        if max(growth) > args.tolerance:
+            flag = "  SUPERLINEAR"
+            superlinear.append(name)
+        print(f"{name:32s} " + " ".join(f"{value:9.2f}" for value in growth) + flag)
+    if superlinear:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
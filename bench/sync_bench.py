@@ -0,0 +1,117 @@
+"""
+Multi-node sync on one machine: a master process and several follower
+processes, each a headless Display.
+
+The master commits a new board at --fps. Each follower's clock is skewed by
+a random offset of up to a few seconds, which the clock sync has to remove.
+Since they're on one machine, the followers' commit times can be compared
+directly: reports the spread of commit times of the same frame across
+followers, how late each follower committed against its target, and the
+error of its clock offset estimate.
+
+python sync_bench.py [--followers N] [--seconds S] [--fps FPS]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import numpy as np
+
+
+def master_daemon(disp, fps):
+    y, x = np.mgrid[: disp.board.shape[0], : disp.board.shape[1]]
+    i = 0
+    while disp.run:
+        disp.board = (x + y + i) % 8 < 2
+        i += 1
+        disp.sleep(1 / fps)
+
+
+def run_master(args):
+    from display import Display
+
+    sys.argv = [sys.argv[0], "--headless", "--limit", str(args.seconds + 2), "--sync-master", str(args.port), "--sync-delay", str(args.delay)]
+    disp = Display(load_params=False, geometry_cache=None, engine="sparse")
+    disp.add_daemon(master_daemon, (disp, args.fps))
+    disp.start()
+
+
+def run_follower(args):
+    from display import Display
+    from sync import SyncFollower
+
+    sys.argv = [sys.argv[0], "--headless", "--limit", str(args.seconds)]
+    disp = Display(load_params=False, geometry_cache=None, engine="sparse")
+    follower = SyncFollower(disp, ("127.0.0.1", args.port), clock_offset=args.clock_offset)
+    follower.start()
+    disp.start()
+    disp.run = False
+    follower.close()
+    with open(args.out, "w") as f:
+        json.dump({"log": list(follower.log), "stats": follower.stats(), "clock_offset": args.clock_offset}, f)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--followers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--fps", type=float, default=30, help="Master's commit rate.")
+    parser.add_argument("--delay", type=float, default=0.1)
+    parser.add_argument("--port", type=int, default=9300)
+    parser.add_argument("--role", choices=("master", "follower"), help=argparse.SUPPRESS)
+    parser.add_argument("--clock-offset", type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.role == "master":
+        return run_master(args)
+    if args.role == "follower":
+        return run_follower(args)
+
+    rng = np.random.default_rng(0)
+    common = [sys.executable, __file__, "--seconds", str(args.seconds), "--fps", str(args.fps), "--delay", str(args.delay), "--port", str(args.port)]
+    with tempfile.TemporaryDirectory() as tmp:
+        master = subprocess.Popen(common + ["--role", "master"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        time.sleep(1)
+        followers = []
+        for i in range(args.followers):
+            out = os.path.join(tmp, f"{i}.json")
+            offset = int(rng.uniform(-3, 3) * 1e9)
+            command = common + ["--role", "follower", "--clock-offset", str(offset), "--out", out]
+            followers.append((subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL), out))
+        results = []
+        for process, out in followers:
+            process.wait()
+            with open(out) as f:
+                results.append(json.load(f))
+        master.wait()
+
+    commits = {}
+    for i, result in enumerate(results):
+        stats = result["stats"]
+        # Master clock is the same clock, so the true offset is minus the skew.
+        error = stats["offset"] + result["clock_offset"] / 1e9
+        print(
+            f"follower {i}: applied {stats['applied']:4d}/{stats['received']:4d}  offset error {error * 1e6:7.1f} us  "
+            f"round trip {stats['rtt'] * 1e6:6.1f} us  late p50 {stats['late_p50'] * 1e3:5.2f} ms  p99 {stats['late_p99'] * 1e3:5.2f} ms"
+        )
+        for sequence, ns in result["log"]:
+            commits.setdefault(sequence, []).append(ns)
+    spreads = np.array([max(times) - min(times) for times in commits.values() if len(times) == len(results)]) / 1e6
+    if len(spreads):
+        print(
+            f"{len(spreads)} frames committed by all {len(results)} followers. Spread between followers: "
+            f"p50 {np.percentile(spreads, 50):.2f} ms  p99 {np.percentile(spreads, 99):.2f} ms  max {spreads.max():.2f} ms"
+        )
+    else:
+        print("No frame was committed by every follower")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Compose time of tiled displays.
+
+Renders random boards headlessly on grids of tiles, with each tile pool and
+engine, and reports milliseconds per frame against a single board. With
+enough cores, the process pool should keep the time per frame close to one
+board's, instead of growing with the number of tiles.
+
+python tiles_bench.py [--frames N] [--grids 1x1 2x1 2x2] [--engines full sparse]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import numpy as np
+
+
+def run(grid, pool, engine, frames):
+    from display import Display
+
+    disp = Display(load_params=False, geometry_cache=None, engine=engine, headless=True, tiles=grid, tile_pool=pool)
+    rng = np.random.default_rng(0)
+    boards = rng.random((16, *disp.board.shape)) < 0.5
+    # The first frame builds the geometry (and starts the processes).
+    disp.compose(boards[0])
+    times = []
+    for i in range(frames):
+        start = time.perf_counter()
+        disp.compose(boards[i % len(boards)])
+        times.append(time.perf_counter() - start)
+    if disp.tile_renderer is not None:
+        disp.tile_renderer.close()
+    return np.array(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--grids", nargs="+", default=["1x1", "2x1", "2x2"])
+    parser.add_argument("--engines", nargs="+", default=["full", "sparse"])
+    args = parser.parse_args()
+    sys.argv = sys.argv[:1]
+
+    from display import parse_grid
+    print(f"{os.cpu_count()} cores")
+    for engine in args.engines:
+        single = None
+        for text in args.grids:
+            grid = parse_grid(text)
+            for pool in ("process", "thread") if grid != (1, 1) else (None,):
+                times = run(grid if grid != (1, 1) else None, pool or "process", engine, args.frames)
+                mean = times.mean()
+                if single is None:
+                    single = mean
+                print(
+                    f"{engine:6s} {text:4s} {pool or 'single':7s}  mean {mean * 1e3:7.2f} ms  "
+                    f"p95 {np.percentile(times, 95) * 1e3:7.2f} ms  {mean / single:4.2f}x one board"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,23 +6,65 @@ Run this file to live adjust the display field of view.
 
 import json
 import os
+import shlex
+import sys
 import time
+from threading import Lock
 
 import cv2
 import numpy as np
 import pygame
 
+# Frame pacing, profiling, sinks and the board layout are shared with the main
+# display. Appended, so this directory's modules (display, screensaver...) still
+# come first.
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC not in sys.path:
+    sys.path.append(SRC)
+from frames import FrameScheduler, NpySink, Profiler, RingSink
+from layout import BoardLayout
+
 WINDOW_RES = (424, 240)
 
 
 class Display:
-    def __init__(self):
+    def __init__(self, fps=60, vsync=False, stats=False, profile=None, headless=False, sinks=(), layout=None):
+        """
+        fps: Frame rate to flip at.
+        vsync: Sync flips to the display refresh, if available.
+        stats: Print frame time statistics at exit.
+        profile: Path to write per stage timings of render() and start() to at exit, or None.
+        headless: Render offscreen, using SDL's dummy video driver, so no display is needed.
+        sinks: Frame sinks, called with each rendered frame. See RingSink.
+        layout: BoardLayout of the board.
+        """
+        self.layout = layout or BoardLayout()
         self.load_warp()
 
         self.keydown_callbacks = []
+        # Keys also come from the control socket's thread.
+        self.key_lock = Lock()
 
         self.run = True
-        self.window = pygame.display.set_mode(WINDOW_RES, pygame.FULLSCREEN)
+        self.window = None
+        self.sinks = list(sinks)
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            pygame.display.quit()
+            pygame.display.init()
+            self.window = pygame.display.set_mode(WINDOW_RES)
+        elif vsync:
+            try:
+                self.window = pygame.display.set_mode(WINDOW_RES, pygame.FULLSCREEN | pygame.SCALED, vsync=1)
+            except pygame.error as e:
+                print(f"Warning: vsync not available ({e})")
+                vsync = False
+        if self.window is None:
+            self.window = pygame.display.set_mode(WINDOW_RES, pygame.FULLSCREEN)
+        self.scheduler = FrameScheduler(fps, vsync=vsync)
+        self.stats = stats
+        self.profile = profile
+        self.profiler = Profiler(enabled=profile is not None)
 
     def add_keydown_callback(self, callback):
         """
@@ -30,29 +72,64 @@ class Display:
         """
         self.keydown_callbacks.append(callback)
 
+    def keydown(self, key):
+        """
+        Handle a key press, from the keyboard or the control socket.
+        """
+        with self.key_lock:
+            for callback in self.keydown_callbacks:
+                callback(key)
+            if key in (pygame.K_ESCAPE, pygame.K_q):
+                self.run = False
+
+    def control(self, line):
+        """
+        Run one control socket command (see control.py).
+        """
+        words = shlex.split(line)
+        if words[0] == "key":
+            keys = [pygame.key.key_code(name) for name in words[1:]]
+            for key in keys:
+                self.keydown(key)
+        elif words[0] == "quit":
+            self.run = False
+        else:
+            raise ValueError(f"Unknown command {words[0]}")
+
     def start(self):
         """
         Blocking (pygame needs main thread).
         Keep updating display.
         """
         while self.run:
-            time.sleep(1 / 60)
+            self.scheduler.wait()
+            self.scheduler.begin()
+            self.profiler.reset()
             pygame.display.flip()
+            self.profiler.mark("flip")
+            self.scheduler.end()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.run = False
                 elif event.type == pygame.KEYDOWN:
-                    for callback in self.keydown_callbacks:
-                        callback(event.key)
-                    if event.key in (pygame.K_ESCAPE, pygame.K_q):
-                        self.run = False
+                    self.keydown(event.key)
+            self.profiler.mark("events")
 
         pygame.quit()
+        for sink in self.sinks:
+            if hasattr(sink, "close"):
+                sink.close()
+        if self.stats:
+            self.scheduler.print_stats()
+        if self.profiler.enabled:
+            self.profiler.save(self.profile)
+            print(f"Saved render profile to {self.profile}")
 
     def render(self, img):
         """
         Will warp img to fit view, and display onto window.
         """
+        self.profiler.reset()
         from_pts = np.array([
             [0, 0],
             [0, img.shape[0]],
@@ -67,16 +144,27 @@ class Display:
             matrix,
             WINDOW_RES,
         )
+        self.profiler.mark("warp")
 
+        gray = warped
         warped = cv2.cvtColor(warped, cv2.COLOR_GRAY2RGB)
+        self.profiler.mark("convert")
         warped = warped.swapaxes(0, 1)
         surface = pygame.surfarray.make_surface(warped)
+        self.profiler.mark("surface")
 
         if not self.run:
             print("Warning: render() called when display not running.")
             return
 
         self.window.blit(surface, (0, 0))
+        self.profiler.mark("blit")
+
+        if self.sinks:
+            timestamp = time.monotonic()
+            for sink in self.sinks:
+                sink(gray, timestamp)
+            self.profiler.mark("sink")
 
     def load_warp(self):
         if os.path.isfile("warp.json"):
@@ -2,10 +2,21 @@
 Utilities for drawing.
 """
 
+import os
+import sys
+from functools import lru_cache
+
 import cv2
 import numpy as np
 import pygame
 
+# The board layout is shared with the main display, see display.py. This is
+# the first module to need it, from both main.py and make_warp.py.
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC not in sys.path:
+    sys.path.append(SRC)
+from layout import for_shape
+
 DRAW_RES = (900, 300)
 
 FONT = pygame.font.Font("./Aldrich-Regular.ttf", 150)
@@ -15,20 +26,25 @@ def blank_img():
     return np.zeros(DRAW_RES[::-1], dtype=np.uint8)
 
 
+@lru_cache(maxsize=None)
+def dot_pixels(layout):
+    """
+    (x, y) pixel of each dot in the image, shape (rows, cols, 2), with one dot of margin.
+    """
+    grid_y, grid_x = layout.positions
+    px_x = np.interp(grid_x, [-1, layout.cols], [0, DRAW_RES[0]])
+    px_y = np.interp(grid_y, [-1, layout.rows], [0, DRAW_RES[1]])
+    return np.stack((px_x, px_y), axis=-1).astype(int)
+
+
 def draw_dots(dots, radius=4):
     """
-    dots: ndarray bool, shape (27, 81)
+    dots: ndarray bool, shape layout.shape, default (27, 81)
     """
     img = blank_img()
 
-    for y in range(dots.shape[0]):
-        for x in range(dots.shape[1]):
-            if dots[y, x]:
-                px_x = np.interp(x, [-1, dots.shape[1]], [0, DRAW_RES[0]])
-                grid_y = y + (0.5 if x % 2 == 0 else 0)
-                px_y = np.interp(grid_y, [-1, dots.shape[0]], [0, DRAW_RES[1]])
-
-                cv2.circle(img, (int(px_x), int(px_y)), radius, 255, -1, cv2.LINE_AA)
+    for px_x, px_y in dot_pixels(for_shape(dots.shape))[dots].tolist():
+        cv2.circle(img, (px_x, px_y), radius, 255, -1, cv2.LINE_AA)
 
     return img
 
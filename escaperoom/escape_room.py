@@ -53,7 +53,7 @@ def screensaver(display):
     """
     global STATE
 
-    board = np.full((27, 81), False, dtype=bool)
+    board = display.layout.zeros()
     anim_thread = Thread(target=screensaver_main, args=(display, board))
     anim_thread.start()
 
@@ -95,7 +95,7 @@ def show_key(display):
             img = pygame.surfarray.array3d(surf).swapaxes(0, 1)
             img = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
 
-            dots_border = np.full((27, 81), False, dtype=bool)
+            dots_border = display.layout.zeros()
             dots_border[0] = True
             dots_border[-1] = True
             dots_border[:, 0] = True
@@ -7,7 +7,8 @@ import pygame
 pygame.init()
 
 import escape_room
-from display import Display
+from control import ControlServer
+from display import Display, NpySink
 from draw import draw_dots
 from make_warp import make_warp_coords
 
@@ -15,7 +16,7 @@ from make_warp import make_warp_coords
 def test_random(display: Display):
     while display.run:
         time.sleep(0.5)
-        dots = np.random.rand(27, 81) > 0.5
+        dots = np.random.rand(*display.layout.shape) > 0.5
         img = draw_dots(dots)
         display.render(img)
 
@@ -23,9 +24,21 @@ def test_random(display: Display):
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--warp", action="store_true", help="Enter interactive warp mode.")
+    parser.add_argument("--fps", type=float, default=60)
+    parser.add_argument("--vsync", action="store_true", help="Sync flips to the display refresh.")
+    parser.add_argument("--stats", action="store_true", help="Print frame time statistics at exit.")
+    parser.add_argument("--profile", nargs="?", const="profile.json", help="Time render stages, and write a summary to this file at exit.")
+    parser.add_argument("--headless", action="store_true", help="Render offscreen, without a window.")
+    parser.add_argument("--save-frames", metavar="DIR", help="Write each rendered frame as .npy files to DIR.")
+    parser.add_argument("--control", type=int, metavar="PORT", help="Accept key presses on this TCP port (see ../src/control.py).")
+    parser.add_argument("--control-unix", metavar="PATH", help="Accept key presses on this UNIX socket.")
+    parser.add_argument("--control-host", default="127.0.0.1",
+                        help="Address the control port listens on. It has no authentication, so only use 0.0.0.0 (any machine) on a trusted network.")
     args = parser.parse_args()
 
-    display = Display()
+    sinks = [] if args.save_frames is None else [NpySink(args.save_frames)]
+    display = Display(fps=args.fps, vsync=args.vsync, stats=args.stats, profile=args.profile,
+                      headless=args.headless, sinks=sinks)
 
     if args.warp:
         threads = [
@@ -41,9 +54,17 @@ def main():
             Thread(target=escape_room.show_unlock, args=(display,)),
         ]
 
+    control = None
+    if args.control is not None or args.control_unix is not None:
+        tcp = None if args.control is None else (args.control_host, args.control)
+        control = ControlServer(display.control, tcp, args.control_unix)
+        control.start()
+
     for thread in threads:
         thread.start()
     display.start()
+    if control is not None:
+        control.close()
 
     for thread in threads:
         thread.join()
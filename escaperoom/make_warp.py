@@ -46,17 +46,18 @@ def make_warp_coords(display: Display):
         if keys[pygame.K_RIGHT]:
             display.warp[index][0] += speed
 
-        # Make sample image.
-        dots = np.full((27, 81), True, dtype=bool)
+        # Make sample image, blinking the quarter of the selected corner.
+        dots = np.ones(display.layout.shape, dtype=bool)
+        cx, cy = display.layout.centre
         if int(time.time()) % 2 == 0:
             if corner == 0:
-                dots[2:14, 2:41] = False
+                dots[2 : cy + 1, 2 : cx + 1] = False
             elif corner == 1:
-                dots[2:14, 40:-2] = False
+                dots[2 : cy + 1, cx:-2] = False
             elif corner == 2:
-                dots[13:-2, 2:41] = False
+                dots[cy:-2, 2 : cx + 1] = False
             elif corner == 3:
-                dots[13:-2, 40:-2] = False
+                dots[cy:-2, cx:-2] = False
 
         img = draw_dots(dots)
         display.render(img)
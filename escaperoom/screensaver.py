@@ -4,9 +4,12 @@ Screensaver animations.
 
 import random
 import time
+from collections import deque
 
 import numpy as np
 
+from layout import COLS, for_shape
+
 
 class NotRandom:
     def __init__(self, max_num):
@@ -29,14 +32,16 @@ def get_coords(board):
     return coords
 
 
-def blank_board():
+def blank_board(shape):
     """Generate a blank board."""
-    return np.zeros((27, 81), dtype=bool)
+    return for_shape(shape).zeros()
 
 
 def sequential_fill(board, coords, value, sleep=0.0006):
-    """Fill sequentially from given (x, y) coords."""
-    for x, y in coords:
+    """Fill sequentially from given (x, y) coords, layout.step at a time."""
+    step = for_shape(board.shape).step
+    for i in range(0, len(coords), step):
+        x, y = coords[i : i + step].T
         board[y, x] = value
         time.sleep(sleep)
 
@@ -44,8 +49,7 @@ def sequential_fill(board, coords, value, sleep=0.0006):
 # Animations that fill all squares.
 def random_fill(board, value=False):
     """Fill all coords with value in a random order."""
-    coords = list(get_coords(np.logical_not(blank_board())))
-    random.shuffle(coords)
+    coords = np.random.permutation(get_coords(np.logical_not(blank_board(board.shape))))
     sequential_fill(board, coords, value)
 
 
@@ -58,13 +62,13 @@ def left_to_right_fill(board, value=False):
 
 def circle_fill(board, value=False):
     """Fill squares with increasing radius."""
+    layout = for_shape(board.shape)
+    # Grow as fast relative to the board on any size.
+    scale = layout.cols / COLS
     r = 0
-    while r < 50:
-        r += 0.7
-        for x in range(81):
-            for y in range(27):
-                if ((x - 40) ** 2 + (y - 13) ** 2) ** 0.5 <= r:
-                    board[y, x] = value
+    while r < 50 * scale:
+        r += 0.7 * scale
+        board[layout.distance <= r] = value
 
         time.sleep(0.03)
 
@@ -72,22 +76,13 @@ def circle_fill(board, value=False):
 def radial_fill(board, value=False):
     """Fill squares with increasing angle."""
     streaks = random.randint(1, 5)
+    angle = for_shape(board.shape).angle
+    angle = np.where(angle < 0, angle + 2 * np.pi, angle)
+    angle = (angle * streaks) % (2 * np.pi)
     angle_thres = 0
     while angle_thres < 2 * np.pi:
         angle_thres += 0.1
-        for x in range(81):
-            for y in range(27):
-                dx = x - 40
-                dy = y - 13
-                if dx == 0 and dy == 0:
-                    board[y, x] = value
-                else:
-                    angle = np.arctan2(dy, dx)
-                    if angle < 0:
-                        angle += 2 * np.pi
-                    angle = (angle * streaks) % (2 * np.pi)
-                    if angle <= angle_thres:
-                        board[y, x] = value
+        board[angle <= angle_thres] = value
 
         time.sleep(0.02)
 
@@ -95,8 +90,7 @@ def radial_fill(board, value=False):
 # Animations that create patterns.
 def random_fill_pattern(board, pattern):
     """Fill pattern with True in a random order."""
-    coords = list(get_coords(pattern))
-    random.shuffle(coords)
+    coords = np.random.permutation(get_coords(pattern))
     sequential_fill(board, coords, True, sleep=0.003)
 
 
@@ -104,8 +98,8 @@ def matrix(board, mask):
     density = random.uniform(0.05, 0.1)
     iters = random.randint(120, 200)
 
-    streaks = np.zeros((81,), dtype=int)
-    matrix_board = blank_board()
+    streaks = np.zeros((board.shape[1],), dtype=int)
+    matrix_board = blank_board(board.shape)
 
     for i in range(iters):
         if i >= iters - 50:
@@ -114,11 +108,9 @@ def matrix(board, mask):
         matrix_board = np.roll(matrix_board, 1, axis=0)
         matrix_board[0, :] = False
 
-        for x in range(81):
-            if random.random() <= density:
-                streaks[x] = random.randint(3, 7)
-            if streaks[x] > 0:
-                matrix_board[0, x] = True
+        new = np.random.random(len(streaks)) <= density
+        streaks[new] = np.random.randint(3, 8, size=new.sum())
+        matrix_board[0, streaks > 0] = True
         streaks -= 1
 
         board[:] = np.logical_and(matrix_board, mask)
@@ -131,29 +123,27 @@ def falling_columns(board, pattern, disappear):
         if pattern[:, x].any():
             max_y = np.max(np.where(pattern[:, x]))
             for y_offset in range(max_y + 1):
+                # Column of pattern shifted up by shift.
+                shift = y_offset + 1 if disappear else max_y - y_offset
                 board[:, x] = False
-                for y in range(pattern.shape[0]):
-                    y_text = y + y_offset + 1 if disappear else y + max_y - y_offset
-                    if 0 <= y_text < pattern.shape[0]:
-                        board[y, x] = pattern[y_text, x]
-                    else:
-                        break
+                board[: pattern.shape[0] - shift, x] = pattern[shift:, x]
 
                 time.sleep(0.015)
 
 
 def floodfill(board, pattern, disappear=False, bfs=False):
     count = pattern.sum()
-    sleep = min(5 / count, 0.01)
+    step = for_shape(pattern.shape).step
+    sleep = min(5 / count, 0.01) * step
 
     pattern = pattern.copy()
+    filled = 0
     while pattern.any():
-        stack = []
+        stack = deque()
         where = np.where(pattern)
         stack.append((where[0][0], where[1][0]))
         while stack:
-            index = 0 if bfs else -1
-            y, x = stack.pop(index)
+            y, x = stack.popleft() if bfs else stack.pop()
             if pattern[y, x]:
                 pattern[y, x] = False
                 board[y, x] = not disappear
@@ -165,48 +155,48 @@ def floodfill(board, pattern, disappear=False, bfs=False):
             else:
                 continue
 
-            time.sleep(sleep)
+            filled += 1
+            if filled % step == 0:
+                time.sleep(sleep)
 
 
 def pixel_slide_in(board, pattern, disappear=False, steps=100):
+    rows, cols = board.shape
     coords = np.argwhere(pattern)
-    # Generate starting locs (y, x)
+    count = coords.shape[0]
+    # Generate starting locs (y, x): a random point just off the left or right
+    # edge, or the top or bottom edge.
     start = np.empty_like(coords)
-    for i in range(coords.shape[0]):
-        if random.random() < 0.5:
-            start[i] = (random.randint(0, board.shape[0] - 1), -5 if random.random() < 0.5 else board.shape[1] + 5)
-        else:
-            start[i] = (-5 if random.random() < 0.5 else board.shape[0] + 5, random.randint(0, board.shape[1] - 1))
+    sides = np.random.random(count) < 0.5
+    before = np.random.random(count) < 0.5
+    start[:, 0] = np.where(sides, np.random.randint(0, rows, count), np.where(before, -5, rows + 5))
+    start[:, 1] = np.where(sides, np.where(before, -5, cols + 5), np.random.randint(0, cols, count))
 
     # Pixel specific duration
-    duration = np.random.randint(int(0.7 * steps), steps, size=coords.shape[0])
+    duration = np.random.randint(int(0.7 * steps), steps, size=count)
     for i in range(steps):
         board[:] = False
-        for j in range(coords.shape[0]):
-            if i >= duration[j]:
-                loc = start[j] if disappear else coords[j]
-            else:
-                fac = i / duration[j]
-                if disappear:
-                    fac = 1 - fac
-                loc = (fac * coords[j] + (1 - fac) * start[j]).astype(int)
-            y, x = loc
-            if 0 <= y < board.shape[0] and 0 <= x < board.shape[1]:
-                board[y, x] = True
+        done = i >= duration
+        fac = (i / duration)[:, None]
+        if disappear:
+            fac = 1 - fac
+        locs = (fac * coords + (1 - fac) * start).astype(int)
+        locs[done] = start[done] if disappear else coords[done]
+        inside = (0 <= locs[:, 0]) & (locs[:, 0] < rows) & (0 <= locs[:, 1]) & (locs[:, 1] < cols)
+        board[locs[inside, 0], locs[inside, 1]] = True
 
         time.sleep(0.02)
 
 
 # Other
 def generate_border(text: np.ndarray) -> np.ndarray:
+    # Any of the 8 neighbors set, by ORing shifted copies.
+    padded = np.pad(text, 1)
     border = np.zeros((text.shape[0], text.shape[1]), dtype=bool)
-    for x in range(text.shape[1]):
-        for y in range(text.shape[0]):
-            for dx in [-1, 0, 1]:
-                for dy in [-1, 0, 1]:
-                    if (0 <= x + dx < text.shape[1]) and (0 <= y + dy < text.shape[0]) and not (dx == 0 and dy == 0):
-                        if text[y + dy, x + dx]:
-                            border[y, x] = True
+    for dx in [-1, 0, 1]:
+        for dy in [-1, 0, 1]:
+            if not (dx == 0 and dy == 0):
+                border |= padded[1 + dy : padded.shape[0] - 1 + dy, 1 + dx : padded.shape[1] - 1 + dx]
 
     border = np.logical_and(border, np.logical_not(text))
     return border
@@ -214,15 +204,16 @@ def generate_border(text: np.ndarray) -> np.ndarray:
 
 def screensaver_main(display, board):
     """
-    board: ndarray shape (27, 81), dtype bool
+    board: ndarray shape display.layout.shape, dtype bool
         Shared object to indicate which dots are lit.
     """
-    # Load patterns
-    pat_arrniey = np.load("arrniey.npy")
-    pat_boomland = np.load("boom.npy")
-    pat_i = np.load("I.npy")
-    pat_toast = np.load("toast.npy")
-    pat_ultimate = np.load("ultimate.npy")
+    # Load patterns, made for the 27x81 board.
+    resize = display.layout.resize
+    pat_arrniey = resize(np.load("arrniey.npy"))
+    pat_boomland = resize(np.load("boom.npy"))
+    pat_i = resize(np.load("I.npy"))
+    pat_toast = resize(np.load("toast.npy"))
+    pat_ultimate = resize(np.load("ultimate.npy"))
     pat_ulti_border = generate_border(pat_ultimate)
     pat_ulti_and_i = np.logical_and(
         np.logical_or(pat_ultimate, pat_i),
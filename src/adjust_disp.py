@@ -6,10 +6,11 @@ Use ASXZ to select the four corners.
 Use arrow keys to drag the selected corner.
 Hold shift to move slower, and ctrl to move faster.
 Use RF to increase and decrease radius, respectively.
+With --tiles, use number keys to select the tile (1 is the top left, row by row),
+which is saved to its own disp_ROW_COL.json.
 """
 
 import argparse
-import time
 
 import numpy as np
 import pygame
@@ -17,10 +18,20 @@ import pygame
 from display import Display
 
 selection = 0
+tile = 0
+
+
+def current(disp: Display):
+    """
+    Params being adjusted, and the file they're saved to.
+    """
+    if disp.tiles is None:
+        return disp.params, "disp.json"
+    return disp.tiles[tile].params, disp.tiles[tile].params_path
 
 
 def key_handler(disp: Display, key):
-    global selection
+    global selection, tile
 
     if key == pygame.K_a:
         selection = 0
@@ -30,14 +41,18 @@ def key_handler(disp: Display, key):
         selection = 2
     elif key == pygame.K_z:
         selection = 3
+    elif disp.tiles is not None and pygame.K_1 <= key < pygame.K_1 + min(len(disp.tiles), 9):
+        tile = key - pygame.K_1
 
-    disp.params.save("disp.json")
+    params, path = current(disp)
+    params.save(path)
 
 
 def draw_daemon(disp: Display):
     iter = 0
     while disp.run:
         disp.board = np.ones_like(disp.board, dtype=bool)
+        board = disp.board if disp.tiles is None else disp.board[disp.tiles[tile].rows, disp.tiles[tile].cols]
         if selection == 0:
             index = (0, 0)
         elif selection == 1:
@@ -48,10 +63,11 @@ def draw_daemon(disp: Display):
             index = (-1, 0)
         else:
             raise ValueError("Invalid selection")
-        disp.board[index] = iter % 2
+        board[index] = iter % 2
+        disp.commit()
 
         iter += 1
-        time.sleep(0.2)
+        disp.sleep(0.2)
 
 
 def keypress_daemon(disp: Display):
@@ -60,9 +76,11 @@ def keypress_daemon(disp: Display):
         shift = keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT]
         ctrl = keys[pygame.K_LCTRL] or keys[pygame.K_RCTRL]
 
+        params = current(disp)[0]
+
         # Drag
         attr = ["tl", "tr", "br", "bl"][selection]
-        value = getattr(disp.params, attr)
+        value = getattr(params, attr)
         delta = np.array([0, 0], dtype=float)
         if keys[pygame.K_UP]:
             delta[0] += -1
@@ -77,7 +95,7 @@ def keypress_daemon(disp: Display):
         if ctrl:
             delta *= 10
         value = value + delta
-        setattr(disp.params, attr, (value[0], value[1]))
+        setattr(params, attr, (value[0], value[1]))
 
         # Radius
         delta = 0
@@ -89,17 +107,18 @@ def keypress_daemon(disp: Display):
             delta *= 0.1
         if ctrl:
             delta *= 10
-        disp.params.radius += delta
+        params.radius += delta
 
-        time.sleep(0.05)
+        disp.sleep(0.05)
 
 
 def main():
-    parser = argparse.ArgumentParser()
+    parser = argparse.ArgumentParser(add_help=False)
     parser.add_argument("--reset", action="store_true")
-    args = parser.parse_args()
+    args = parser.parse_known_args()[0]
 
     disp = Display(load_params=not args.reset)
+    disp.parser.add_argument("--reset", action="store_true", help="Start from default params.")
 
     disp.add_daemon(draw_daemon, (disp,))
     disp.add_daemon(keypress_daemon, (disp,))
@@ -4,22 +4,27 @@ Display spectrogram of audio.
 
 import argparse
 import math
+import os
 import subprocess
-import time
+import tempfile
 import wave
 
 import numpy as np
 
-from display import Display
+from display import Display, load_asset
+
+# Daemons only use what process daemons get, so --processes works (see Display.add_daemon).
+PROCESS_SAFE = True
 
 
 def display_spectrogram(disp: Display, audio: np.ndarray, sample_rate: float, min_freq=100, max_freq=1000):
     """
     Display spectrogram of a single audio sample.
     """
+    rows, cols = disp.layout.shape
     dft = []
-    freq_step = (max_freq / min_freq) ** (1 / 80)
-    for i in range(81):
+    freq_step = (max_freq / min_freq) ** (1 / (cols - 1))
+    for i in range(cols):
         freq = min_freq * (freq_step ** i)
         x = np.linspace(0, len(audio) / sample_rate, len(audio)) * 2 * np.pi * freq
         amp = math.hypot(np.mean(audio * np.sin(x)), np.mean(audio * np.cos(x)))
@@ -27,13 +32,12 @@ def display_spectrogram(disp: Display, audio: np.ndarray, sample_rate: float, mi
         dft.append(amp)
 
     dft = np.array(dft) / 1e-3
-    dft = np.clip(dft, 0, 27)
+    dft = np.clip(dft, 0, rows)
     dft = dft.astype(int)
 
-    disp.board[:] = False
-    for i in range(81):
-        if dft[i] > 0:
-            disp.board[-dft[i]:, i] = True
+    # Bars of height dft from the bottom.
+    disp.board[:] = disp.layout.grid[0] >= rows - dft
+    disp.commit()
 
 
 def display_audio(disp: Display, audio: np.ndarray, sample_rate: float, fps=15, repeat=False):
@@ -47,32 +51,52 @@ def display_audio(disp: Display, audio: np.ndarray, sample_rate: float, fps=15,
                 break
             chunk = audio[i:i + chunk_size]
             display_spectrogram(disp, chunk, sample_rate)
-            time.sleep(1 / fps)
+            disp.sleep(1 / fps)
 
         if not repeat or not disp.run:
             break
 
 
-def main():
-    disp = Display()
-    disp.parser.add_argument("file", type=str)
-    args = disp.parser.parse_args()
-
-    subprocess.run([
-        "ffmpeg", "-y",
-        "-i", args.file,
-        "-c:a", "pcm_s16le",
-        "/tmp/apt33_audio.wav"
-    ], check=True)
-
-    with wave.open("/tmp/apt33_audio.wav", "rb") as wf:
-        sample_rate = wf.getframerate()
-        n_frames = wf.getnframes()
-        audio = wf.readframes(n_frames)
-        audio = np.frombuffer(audio, dtype=np.int16)
-        audio = audio / 32768.0
+def decode_audio(path):
+    """
+    Decode any audio file with ffmpeg. Returns (samples in [-1, 1), sample rate).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        wav = os.path.join(tmp, "audio.wav")
+        subprocess.run([
+            "ffmpeg", "-y",
+            "-i", path,
+            "-c:a", "pcm_s16le",
+            wav
+        ], check=True)
+
+        with wave.open(wav, "rb") as wf:
+            sample_rate = wf.getframerate()
+            n_frames = wf.getnframes()
+            audio = wf.readframes(n_frames)
+            audio = np.frombuffer(audio, dtype=np.int16)
+            audio = audio / 32768.0
+
+    return audio, sample_rate
+
 
+def add_args(parser):
+    parser.add_argument("file", type=str)
+
+
+def preload(args):
+    return load_asset(("audio", os.path.abspath(args.file)), decode_audio, args.file)
+
+
+def setup(disp: Display, args):
+    audio, sample_rate = preload(args)
     disp.add_daemon(display_audio, (disp, audio, sample_rate, 15, True))
+
+
+def main():
+    disp = Display()
+    add_args(disp.parser)
+    setup(disp, disp.parser.parse_args())
     disp.start()
 
 
@@ -3,7 +3,6 @@ Clock.
 """
 
 import argparse
-import time
 from datetime import datetime
 
 import numpy as np
@@ -11,25 +10,33 @@ import numpy as np
 from display import Display
 from text import render_text
 
+# Daemons only use what process daemons get, so --processes works (see Display.add_daemon).
+PROCESS_SAFE = True
+
 
 def clock_daemon(disp: Display):
     while disp.run:
-        now = datetime.now()
-        text = now.strftime("%H:%M:%S")
-        if time.time() % 1 < 0.5:
+        now = disp.time()
+        text = datetime.fromtimestamp(now).strftime("%H:%M:%S")
+        if now % 1 < 0.5:
             text = text.replace(":", " ")
 
-        text = render_text(text)
+        text = render_text(text, height=disp.layout.rows)[:, : disp.layout.cols]
         disp.board[:] = False
-        pad = (81 - text.shape[1]) // 2
+        pad = (disp.layout.cols - text.shape[1]) // 2
         disp.board[:, pad : pad + text.shape[1]] = text
+        disp.commit()
+
+        disp.sleep(0.05)
 
-        time.sleep(0.05)
+
+def setup(disp: Display, args):
+    disp.add_daemon(clock_daemon, (disp,))
 
 
 def main():
     disp = Display()
-    disp.add_daemon(clock_daemon, (disp,))
+    setup(disp, disp.parser.parse_args())
     disp.start()
 
 
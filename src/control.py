@@ -0,0 +1,167 @@
+"""
+Control socket: send key presses and commands to a running display from
+another program, a phone or another machine.
+
+The protocol is lines of text over TCP or a UNIX stream socket, e.g. with
+`nc HOST PORT`. Each line is one command, and gets a reply line "ok",
+"ok <text>" or "error <message>" once it has been carried out. Commands
+of Display (others are added by programs with disp.command_hooks):
+    key NAME [NAME...]  Press keys, by pygame name, e.g. "up", "return" or "a".
+    limit SECONDS       Stop SECONDS from now; "limit none" removes the limit.
+    quit
+
+Run this file for an interactive client, e.g.
+python control.py --tcp 127.0.0.1:9100
+"""
+
+import argparse
+import os
+import select
+import socket
+import stat
+import sys
+import traceback
+from threading import Thread
+
+from ingest import parse_address
+
+
+class ControlServer:
+    """
+    Accepts connections on a TCP port and/or a UNIX socket on a thread, and
+    calls handle(line) for each line received. handle returns a reply (or
+    None), or raises ValueError with the error to reply.
+    """
+
+    def __init__(self, handle, tcp=None, unix=None):
+        """
+        tcp: (host, port) to listen on.
+        unix: Path of the UNIX socket to create.
+        """
+        self.handle = handle
+        self.unix = unix
+        self.listeners = []
+        if tcp is not None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(tcp)
+            self.listeners.append(sock)
+        if unix is not None:
+            if os.path.exists(unix):
+                # Left over from an earlier run, but never remove anything else.
+                if not stat.S_ISSOCK(os.stat(unix).st_mode):
+                    raise FileExistsError(f"{unix} exists and is not a socket")
+                os.unlink(unix)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.bind(unix)
+            self.listeners.append(sock)
+        for sock in self.listeners:
+            sock.listen()
+        # Connection -> bytes received after its last full line.
+        self.clients = {}
+        self.commands = 0
+        self.running = True
+        self.thread = None
+
+    def start(self):
+        self.thread = Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def loop(self):
+        while self.running:
+            ready = select.select(self.listeners + list(self.clients), [], [], 0.1)[0]
+            for sock in ready:
+                if sock in self.listeners:
+                    conn = sock.accept()[0]
+                    if conn.family == socket.AF_INET:
+                        # Replies are small, don't let Nagle hold them back.
+                        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    self.clients[conn] = b""
+                else:
+                    self.receive(sock)
+
+    def receive(self, conn):
+        try:
+            data = conn.recv(4096)
+        except OSError:
+            data = b""
+        if not data:
+            del self.clients[conn]
+            conn.close()
+            return
+
+        *lines, self.clients[conn] = (self.clients[conn] + data).split(b"\n")
+        replies = []
+        for line in lines:
+            line = line.decode(errors="replace").strip()
+            if not line:
+                continue
+            self.commands += 1
+            try:
+                reply = self.handle(line)
+                replies.append("ok" if not reply else f"ok {reply}")
+            except ValueError as e:
+                replies.append(f"error {e}")
+            except Exception as e:
+                # A bug in a handler shouldn't take the control socket down.
+                traceback.print_exc()
+                replies.append(f"error {type(e).__name__}: {e}")
+        if replies:
+            try:
+                conn.sendall("".join(f"{reply}\n" for reply in replies).encode())
+            except OSError:
+                pass
+
+    def close(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+        for sock in self.listeners + list(self.clients):
+            sock.close()
+        if self.unix is not None and os.path.exists(self.unix) and stat.S_ISSOCK(os.stat(self.unix).st_mode):
+            os.unlink(self.unix)
+
+
+class ControlClient:
+    def __init__(self, tcp=None, unix=None):
+        if tcp is not None:
+            self.sock = socket.create_connection(tcp)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(unix)
+        self.file = self.sock.makefile("r")
+
+    def send(self, line):
+        """
+        Send one command, and return its reply.
+        """
+        self.sock.sendall(f"{line}\n".encode())
+        return self.file.readline().strip()
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tcp", type=parse_address, help="Display's control address, as HOST:PORT.")
+    parser.add_argument("--unix", help="Display's control socket path.")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="Command to send, instead of reading them from stdin.")
+    args = parser.parse_args()
+    if args.tcp is None and args.unix is None:
+        parser.error("Give --tcp or --unix")
+
+    client = ControlClient(args.tcp, args.unix)
+    if args.command:
+        print(client.send(" ".join(args.command)))
+    else:
+        for line in sys.stdin:
+            if line.strip():
+                print(client.send(line.strip()))
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,30 @@ Implementation of pygame and display math.
 
 import argparse
 import json
+import multiprocessing
 import os
+import shlex
+import sys
 import time
-from threading import Thread
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import cached_property
+from multiprocessing import shared_memory
+from threading import Condition, Lock, Thread, current_thread, get_ident
 
 import cv2
 import numpy as np
 import pygame
 
+from control import ControlServer
+from dmx import DmxReceiver
+from frames import FrameScheduler, NpySink, Profiler, RingSink, VideoSink
+from ingest import FrameReceiver, parse_address
+from layout import BoardLayout, parse_grid
+from recording import Recorder
+from sync import SyncFollower, SyncMaster
+
 pygame.init()
 
 
@@ -55,26 +71,1389 @@ class DrawParams:
             if attr in data:
                 setattr(self, attr, data[attr])
 
+    def key(self):
+        """
+        Flat tuple of all values, used to detect changes.
+        """
+        return (
+            float(self.radius),
+            *map(float, self.tl),
+            *map(float, self.tr),
+            *map(float, self.br),
+            *map(float, self.bl),
+        )
+
+
+def geometry_key(params: DrawParams, width, height, layout: BoardLayout):
+    return params.key() + (width, height) + layout.key()
+
+
+class Geometry:
+    """
+    Cached projection geometry for one set of DrawParams, window size and
+    board layout. Only depends on those, so it is rebuilt only when they
+    change (e.g. while running adjust_disp.py).
+    """
+
+    def __init__(self, params: DrawParams, width: int, height: int, layout: BoardLayout = None):
+        layout = layout or BoardLayout()
+        self.key = geometry_key(params, width, height, layout)
+        self.width = width
+        self.height = height
+        self.set_layout(params, layout)
+
+        total_width, total_height = self.layout.extent()
+        offset_x = (width - total_width) / 2
+        offset_y = (height - total_height) / 2
+
+        # Dot centres in drawing order (x major, matching self.board.T.flat).
+        self.centres = self.layout.pixels((offset_x, offset_y)).astype(int)
+
+        # Warp perspective
+        span_x, span_y = self.layout.span()
+        min_x = offset_x
+        max_x = span_x + offset_x
+        min_y = offset_y
+        max_y = span_y + offset_y
+        from_pts = np.array([
+            [min_x, min_y],
+            [max_x, min_y],
+            [max_x, max_y],
+            [min_x, max_y],
+        ], dtype=np.float32)
+        to_pts = np.array([params.tl, params.tr, params.br, params.bl], dtype=np.float32)
+        self.trans = cv2.getPerspectiveTransform(from_pts, to_pts)
+
+        self.build_maps()
+
+    def set_layout(self, params: DrawParams, layout: BoardLayout):
+        """
+        A board too large for the window gets a smaller pitch, and dots scaled to match.
+        """
+        self.layout = layout.fit(self.width, self.height)
+        if self.layout is layout:
+            self.radius = int(params.radius)
+        else:
+            self.radius = max(int(params.radius * self.layout.pitch / layout.pitch), 1)
+
+    def build_maps(self):
+        """
+        Remap tables equivalent to cv2.warpPerspective(raw, self.trans, (height, width)).
+        Output is indexed (x, y), i.e. shape (width, height), like pygame.surfarray.
+        """
+        inv = np.linalg.inv(self.trans)
+        dst_x, dst_y = np.meshgrid(np.arange(self.height), np.arange(self.width))
+        w = inv[2, 0] * dst_x + inv[2, 1] * dst_y + inv[2, 2]
+        src_x = (inv[0, 0] * dst_x + inv[0, 1] * dst_y + inv[0, 2]) / w
+        src_y = (inv[1, 0] * dst_x + inv[1, 1] * dst_y + inv[1, 2]) / w
+        self.map1, self.map2 = cv2.convertMaps(src_x.astype(np.float32), src_y.astype(np.float32), cv2.CV_16SC2)
+
+    @cached_property
+    def centre_list(self):
+        """
+        Centres as python int tuples, ready to pass to cv2.circle.
+        """
+        return [tuple(map(int, c)) for c in self.centres]
+
+    @cached_property
+    def raw_boxes(self):
+        """
+        (x0, y0, x1, y1) of each dot in the unwarped image, including anti-aliasing.
+        """
+        pad = self.radius + 2
+        boxes = np.concatenate((self.centres - pad, self.centres + pad), axis=1)
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, self.width)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, self.height)
+        return boxes
+
+    @cached_property
+    def out_boxes(self):
+        """
+        (row0, col0, row1, col1) region of the warped output that depends on each dot.
+        """
+        # Grow by one pixel for bilinear sampling, then warp the box corners.
+        boxes = self.raw_boxes.astype(np.float32)
+        boxes[:, :2] -= 1
+        boxes[:, 2:] += 1
+        corners = boxes[:, [[0, 1], [2, 1], [2, 3], [0, 3]]]
+        warped = cv2.perspectiveTransform(corners.reshape(-1, 1, 2), self.trans).reshape(-1, 4, 2)
+        # Output is indexed (x, y), so rows come from the warped y.
+        out = np.empty((len(boxes), 4), dtype=int)
+        out[:, 0] = np.floor(warped[..., 1].min(axis=1)) - 1
+        out[:, 1] = np.floor(warped[..., 0].min(axis=1)) - 1
+        out[:, 2] = np.ceil(warped[..., 1].max(axis=1)) + 2
+        out[:, 3] = np.ceil(warped[..., 0].max(axis=1)) + 2
+        out[:, [0, 2]] = out[:, [0, 2]].clip(0, self.width)
+        out[:, [1, 3]] = out[:, [1, 3]].clip(0, self.height)
+        return out
+
+    @cached_property
+    def neighbour_pairs(self):
+        """
+        (dots, others): every pair of dots whose raw boxes overlap, including
+        each dot with itself, sorted by dot then other.
+        Dots are on a grid, so only the few nearest columns and rows are checked.
+        """
+        boxes = self.raw_boxes
+        cols, rows = self.layout.cols, self.layout.rows
+        index = np.arange(len(boxes)).reshape(cols, rows)
+        # Centres are rounded to whole pixels, and even columns are shifted by up to a row.
+        reach = 2 * (self.radius + 2) + 1
+        reach_x = min(int(reach / self.layout.x_pitch) + 1, cols - 1)
+        reach_y = min(int(reach / self.layout.pitch) + 2, rows - 1)
+        dots, others = [], []
+        for dx in range(-reach_x, reach_x + 1):
+            for dy in range(-reach_y, reach_y + 1):
+                a = index[max(-dx, 0) : cols - max(dx, 0), max(-dy, 0) : rows - max(dy, 0)].ravel()
+                b = a + dx * rows + dy
+                overlap = (
+                    (boxes[a, 0] < boxes[b, 2]) & (boxes[b, 0] < boxes[a, 2])
+                    & (boxes[a, 1] < boxes[b, 3]) & (boxes[b, 1] < boxes[a, 3])
+                )
+                if dx == 0 and dy == 0:
+                    overlap[:] = True
+                dots.append(a[overlap])
+                others.append(b[overlap])
+        dots = np.concatenate(dots)
+        others = np.concatenate(others)
+        order = np.lexsort((others, dots))
+        return dots[order], others[order]
+
+    @cached_property
+    def neighbour_starts(self):
+        """
+        Index of each dot's first pair in neighbour_pairs.
+        """
+        counts = np.bincount(self.neighbour_pairs[0], minlength=len(self.centres))
+        return np.r_[0, np.cumsum(counts)[:-1]]
+
+    @cached_property
+    def neighbours(self):
+        """
+        For each dot, indices (in drawing order) of all dots overlapping its raw box.
+        Only more than itself if the radius is large enough for dots to touch.
+        """
+        return np.split(self.neighbour_pairs[1], self.neighbour_starts[1:])
+
+    @cached_property
+    def neighbour_boxes(self):
+        """
+        Raw box of each dot grown to fully contain all its neighbours.
+        """
+        boxes = self.raw_boxes[self.neighbour_pairs[1]]
+        out = np.empty_like(self.raw_boxes)
+        out[:, :2] = np.minimum.reduceat(boxes[:, :2], self.neighbour_starts)
+        out[:, 2:] = np.maximum.reduceat(boxes[:, 2:], self.neighbour_starts)
+        return out
+
+    @cached_property
+    def overlaps(self):
+        """
+        Mask of neighbour_pairs whose dots (different ones) cover a common
+        unwarped pixel, anti-aliasing included.
+        Circles are the same at every integer centre, so this is checked once
+        per offset between centres. Dots with overlapping raw boxes are at most
+        2 * pad apart.
+        """
+        dots, others = self.neighbour_pairs
+        pad = self.radius + 2
+        reach = 2 * pad
+        centre = reach + pad
+        patch = np.zeros((2, 2 * centre + 1, 2 * centre + 1), dtype=np.uint8)
+        cv2.circle(patch[0], (centre, centre), self.radius, 255, -1, cv2.LINE_AA)
+        # overlapping[dy + reach, dx + reach]
+        overlapping = np.zeros((2 * reach + 1, 2 * reach + 1), dtype=bool)
+        for dy in range(-reach, reach + 1):
+            for dx in range(-reach, reach + 1):
+                patch[1] = 0
+                cv2.circle(patch[1], (centre + dx, centre + dy), self.radius, 255, -1, cv2.LINE_AA)
+                overlapping[dy + reach, dx + reach] = np.any((patch[0] > 0) & (patch[1] > 0))
+        offsets = (self.centres[others] - self.centres[dots]).clip(-reach, reach) + reach
+        return overlapping[offsets[:, 1], offsets[:, 0]] & (dots != others)
+
+    @cached_property
+    def footprints(self):
+        """
+        Sparse matrix mapping dots to warped output pixels.
+        Each dot's footprint is its anti-aliased circle, already warped.
+        Dots are drawn in order, lit or not, so where dots overlap, a dot is
+        partly covered by the ones drawn after it. Its footprint is drawn with
+        those on top (in black), which keeps the frame a sum of footprints.
+
+        Split into layers, where no pixel appears twice within a layer, so a
+        layer can be applied with plain assignment instead of a scatter add.
+        Almost all entries are in layer 0, stored CSR-like by dot so only lit
+        dots are touched. The rest (pixels shared by neighbouring dots) are
+        in small COO layers.
+
+        Returns (indptr, pixels, weights, extra):
+            indptr, pixels, weights: Layer 0. Dot i covers flat frame indices
+                pixels[indptr[i]:indptr[i+1]] with values weights[...].
+            extra: List of (dots, pixels, weights) for the other layers.
+        """
+        # Dots drawn over each dot, covers[cover_starts[i]:cover_starts[i + 1]].
+        pair_dots, pair_others = self.neighbour_pairs
+        later = self.overlaps & (pair_others > pair_dots)
+        covers = pair_others[later]
+        cover_starts = np.searchsorted(pair_dots[later], np.arange(len(self.centres) + 1))
+        # Circles clipped by the image edge are drawn differently, so those are
+        # drawn in place. The rest are cached by the offsets of the dots over them.
+        pad = self.radius + 2
+        boxes = self.raw_boxes
+        clipped = (boxes[:, 2] - boxes[:, 0] != 2 * pad) | (boxes[:, 3] - boxes[:, 1] != 2 * pad)
+        sprites = {}
+
+        raw_img = np.zeros((self.height, self.width), dtype=np.uint8)
+        pixels, dots, weights = [], [], []
+        for i, (x, y) in enumerate(self.centre_list):
+            dot_covers = covers[cover_starts[i] : cover_starts[i + 1]]
+            if len(dot_covers) == 0 or clipped[i] or clipped[dot_covers].any():
+                cv2.circle(raw_img, (x, y), self.radius, 255, -1, cv2.LINE_AA)
+                for j in dot_covers:
+                    cv2.circle(raw_img, self.centre_list[j], self.radius, 0, -1, cv2.LINE_AA)
+            else:
+                offsets = self.centres[dot_covers] - self.centres[i]
+                key = offsets.tobytes()
+                if key not in sprites:
+                    sprites[key] = self.covered_sprite(offsets)
+                raw_img[y - pad : y + pad, x - pad : x + pad] = sprites[key]
+            r0, c0, r1, c1 = self.out_boxes[i]
+            patch = None
+            if r1 > r0 and c1 > c0:
+                patch = cv2.remap(raw_img, self.map1[r0:r1, c0:c1], self.map2[r0:r1, c0:c1], cv2.INTER_LINEAR)
+            x0, y0, x1, y1 = self.raw_boxes[i]
+            raw_img[y0:y1, x0:x1] = 0
+            if patch is None:
+                # Warped off screen.
+                continue
+
+            rows, cols = np.nonzero(patch)
+            pixels.append((rows + r0) * self.height + cols + c0)
+            dots.append(np.full(len(rows), i))
+            weights.append(patch[rows, cols])
+        pixels = np.concatenate(pixels)
+        dots = np.concatenate(dots)
+        weights = np.concatenate(weights)
+
+        # Layer of each entry is how many earlier entries share its pixel.
+        order = np.argsort(pixels, kind="stable")
+        sorted_pixels = pixels[order]
+        group_start = np.flatnonzero(np.r_[True, sorted_pixels[1:] != sorted_pixels[:-1]])
+        group_len = np.diff(np.r_[group_start, len(pixels)])
+        layers = np.empty(len(pixels), dtype=int)
+        layers[order] = np.arange(len(pixels)) - np.repeat(group_start, group_len)
+
+        base = layers == 0
+        indptr = np.r_[0, np.cumsum(np.bincount(dots[base], minlength=len(self.centres)))]
+        extra = []
+        for layer in range(1, layers.max() + 1):
+            mask = layers == layer
+            extra.append((dots[mask], pixels[mask], weights[mask]))
+        return indptr, pixels[base], weights[base], extra
+
+    def covered_sprite(self, offsets):
+        """
+        Raw box of a dot with dots at (dx, dy) offsets drawn over it, in black.
+        """
+        pad = self.radius + 2
+        centre = 2 * (pad + self.radius + 3)
+        canvas = np.zeros((2 * centre + 1, 2 * centre + 1), dtype=np.uint8)
+        cv2.circle(canvas, (centre, centre), self.radius, 255, -1, cv2.LINE_AA)
+        for dx, dy in offsets:
+            cv2.circle(canvas, (int(centre + dx), int(centre + dy)), self.radius, 0, -1, cv2.LINE_AA)
+        return canvas[centre - pad : centre + pad, centre - pad : centre + pad]
+
+    def warp(self, raw_img, dst=None):
+        return cv2.remap(raw_img, self.map1, self.map2, cv2.INTER_LINEAR, dst=dst)
+
+    def save(self, path):
+        np.savez(
+            path,
+            key=np.array(self.key, dtype=float),
+            radius=self.radius,
+            centres=self.centres,
+            trans=self.trans,
+            map1=self.map1,
+            map2=self.map2,
+        )
+
+    @classmethod
+    def load(cls, path, params: DrawParams, width: int, height: int, layout: BoardLayout = None):
+        """
+        Returns cached geometry from path, or None if missing or stale.
+        """
+        if not os.path.isfile(path):
+            return None
+        layout = layout or BoardLayout()
+        key = geometry_key(params, width, height, layout)
+        with np.load(path) as data:
+            if data["key"].shape != (len(key),) or not np.array_equal(data["key"], np.array(key, dtype=float)):
+                return None
+            geometry = cls.__new__(cls)
+            geometry.key = key
+            geometry.width = width
+            geometry.height = height
+            geometry.set_layout(params, layout)
+            geometry.centres = data["centres"]
+            geometry.trans = data["trans"]
+            geometry.map1 = data["map1"]
+            geometry.map2 = data["map2"]
+        return geometry
+
+
+def cached_geometry(geometry, params: DrawParams, width, height, cache_path=None, layout: BoardLayout = None):
+    """
+    Returns geometry if it's still current for params, size and layout, else a rebuilt one.
+    The first build (geometry None) is loaded from, or saved to, cache_path.
+    """
+    layout = layout or BoardLayout()
+    key = geometry_key(params, width, height, layout)
+    if geometry is not None and geometry.key == key:
+        return geometry
+
+    first_build = geometry is None
+    geometry = None
+    if first_build and cache_path is not None:
+        geometry = Geometry.load(cache_path, params, width, height, layout)
+    if geometry is None:
+        geometry = Geometry(params, width, height, layout)
+        # Don't persist the many intermediate geometries while live adjusting.
+        if first_build and cache_path is not None:
+            geometry.save(cache_path)
+    return geometry
+
+
+def add_setup_args(parser):
+    """
+    Args that are needed in Display.__init__, before the program's own args are added.
+    """
+    parser.add_argument("--vsync", action="store_true", help="Sync flips to the display refresh.")
+    parser.add_argument("--processes", action="store_true", help="Run daemons in separate processes, for programs that support it.")
+    parser.add_argument("--atomic", action="store_true", help="Only show boards published with commit().")
+    parser.add_argument("--headless", action="store_true", help="Render offscreen, without a window.")
+    parser.add_argument("--tiles", type=parse_grid, metavar="COLSxROWS",
+                        help="Drive a grid of boards as one logical board, each with its own calibration file.")
+    parser.add_argument("--board", type=parse_grid, metavar="COLSxROWS",
+                        help="Dots of each board, e.g. 810x270 to stress test a board 100 times larger (default 81x27).")
+    parser.add_argument("--virtual", nargs="?", type=float, const=30, metavar="FPS",
+                        help="Run on a virtual clock as fast as possible, presenting FPS frames per simulated second (default 30).")
+
+
+def use_dummy_driver():
+    """
+    Switch SDL to its dummy video driver, so no display is needed.
+    Surfaces, events and flips still work, they just aren't shown.
+    """
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    pygame.display.quit()
+    pygame.display.init()
+
+
+def create_window(size, vsync=False, headless=False, fullscreen=True):
+    """
+    Fullscreen window. vsync needs a renderer backed window, so may not be available.
+    Headless windows are offscreen, using SDL's dummy driver.
+    fullscreen: Otherwise a borderless window at the top left of the desktop,
+        for tiled displays spanning several outputs.
+    """
+    if headless:
+        use_dummy_driver()
+        return pygame.display.set_mode(size)
+    if fullscreen:
+        flags = pygame.FULLSCREEN
+    else:
+        os.environ["SDL_VIDEO_WINDOW_POS"] = "0,0"
+        flags = pygame.NOFRAME
+    if vsync:
+        try:
+            return pygame.display.set_mode(size, flags | pygame.SCALED, vsync=1)
+        except pygame.error as e:
+            print(f"Warning: vsync not available ({e})")
+    return pygame.display.set_mode(size, flags)
+
+
+ASSETS = {}
+ASSETS_LOCK = Lock()
+
+
+def load_asset(key, loader, *args):
+    """
+    Load an asset once per process and keep it, so programs started again
+    (by show.py) start warm. Assets are shared, so don't modify them.
+    """
+    with ASSETS_LOCK:
+        if key in ASSETS:
+            return ASSETS[key]
+    value = loader(*args)
+    with ASSETS_LOCK:
+        return ASSETS.setdefault(key, value)
+
+
+def load_npy(path):
+    return load_asset(("npy", os.path.abspath(path)), np.load, path)
+
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+
+
+def tile_path(path, row, col):
+    """
+    Per tile version of a file name, e.g. disp.json -> disp_0_1.json.
+    """
+    root, ext = os.path.splitext(path)
+    return f"{root}_{row}_{col}{ext}"
+
+
+def parse_color(text):
+    """
+    "R,G,B" to tuple.
+    """
+    color = tuple(int(c) for c in text.split(","))
+    if len(color) != 3:
+        raise argparse.ArgumentTypeError(f"Expected R,G,B, got {text}")
+    return color
+
+
+def tint_palette(tint):
+    """
+    256 entry palette from black to tint, for single channel frames.
+    """
+    ramp = np.arange(256)[:, None] * np.array(tint)[None, :] // 255
+    return [tuple(c) for c in ramp.tolist()]
+
+
+def stamp_dots(raw_img, geometry: Geometry, values, indices=None, origin=(0, 0)):
+    """
+    Draw dots into raw_img, in drawing order.
+    One cv2.circle per dot: anti-aliased dots blend into what's below them,
+    so where they overlap, pasting precomputed sprites wouldn't match.
+    values: Flat board in drawing order (board.T.flat).
+    indices: Subset of dots to draw. Default all.
+    origin: (x, y) of raw_img within the full unwarped image, when drawing into a region.
+    """
+    radius = geometry.radius
+    centres = geometry.centre_list
+    if indices is None:
+        indices = range(len(centres))
+    ox, oy = origin
+    for i in indices:
+        color = WHITE if values[i] else BLACK
+        centre = centres[i]
+        if ox or oy:
+            centre = (centre[0] - ox, centre[1] - oy)
+        cv2.circle(raw_img, centre, radius, color, -1, cv2.LINE_AA)
+
+
+class Clock:
+    """
+    Real time. Display and its daemons tell time and sleep through a clock,
+    so a VirtualClock can be swapped in.
+    """
+
+    virtual = False
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds, late=False):
+        """
+        late: Only matters on a virtual clock, see VirtualClock.sleep.
+        """
+        time.sleep(max(seconds, 0))
+
+    def register(self, thread=None):
+        pass
+
+    def unregister(self, thread=None):
+        pass
+
+    def stop(self):
+        pass
+
+
+class VirtualClock(Clock):
+    """
+    Simulated time. It only advances when every registered thread is asleep,
+    and then jumps straight to the earliest wakeup: sleeps take no real time,
+    and no time passes while threads compute.
+    Threads that sleep without registering only take part while asleep.
+    Time is kept in whole microseconds, so wakeups meant for the same time coincide.
+    """
+
+    virtual = True
+
+    def __init__(self, start=None):
+        """
+        start: Wall clock time of simulated time 0. Defaults to now.
+        """
+        self.start = time.time() if start is None else start
+        self.now = 0
+        self.cond = Condition()
+        self.participants = set()
+        self.wakeups = {}
+        self.stopped = False
+
+    def time(self):
+        return self.start + self.now / 1e6
+
+    def monotonic(self):
+        return self.now / 1e6
+
+    def register(self, thread=None):
+        with self.cond:
+            self.participants.add(thread or current_thread())
+
+    def unregister(self, thread=None):
+        with self.cond:
+            self.participants.discard(thread or current_thread())
+            self.advance()
+
+    def sleep(self, seconds, late=False):
+        """
+        late: Wake only after the other threads due at the same time have gone
+            back to sleep, e.g. to see everything they did at that time.
+        """
+        thread = current_thread()
+        with self.cond:
+            if self.stopped:
+                return
+            self.wakeups[thread] = (self.now + max(round(seconds * 1e6), 0), late)
+            self.advance()
+            self.cond.wait_for(lambda: thread not in self.wakeups or self.stopped)
+            self.wakeups.pop(thread, None)
+
+    def advance(self):
+        """
+        With the lock held: if all participants are asleep, jump to the earliest
+        wakeup and wake the threads due. Until they sleep again, time can't move.
+        """
+        if self.wakeups and self.participants.issubset(self.wakeups):
+            first = min(self.wakeups.values())
+            self.now = max(self.now, first[0])
+            for thread, wakeup in list(self.wakeups.items()):
+                if wakeup <= first:
+                    del self.wakeups[thread]
+            self.cond.notify_all()
+
+    def stop(self):
+        """
+        Wake all sleepers, and make later sleeps return at once.
+        """
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+
+
+class FullRenderer:
+    """
+    Redraws every dot and warps the whole frame.
+    Output is the warped frame, indexed (x, y) like pygame.surfarray.
+    All buffers are persistent, so steady state rendering allocates nothing.
+    """
+
+    def __init__(self, channels=3, profiler=None):
+        """
+        channels: 3 for a BGR frame, or 1 for a single channel (mono) frame.
+        profiler: Profiler to mark stages in.
+        """
+        self.shape = () if channels == 1 else (channels,)
+        self.profiler = profiler or Profiler()
+        self.geometry = None
+        self.values = None
+        self.raw_img = None
+        self.frame = None
+
+    def allocate(self, geometry: Geometry):
+        self.geometry = geometry
+        self.values = np.zeros(len(geometry.centres), dtype=bool)
+        self.raw_img = np.zeros((geometry.height, geometry.width, *self.shape), dtype=np.uint8)
+        self.frame = np.zeros((geometry.width, geometry.height, *self.shape), dtype=np.uint8)
+
+    def load_values(self, board, values):
+        """
+        Copy board into values (flat, drawing order) without allocating.
+        """
+        np.copyto(values.reshape(board.shape[::-1]), board.T)
+
+    def redraw(self):
+        self.raw_img.fill(0)
+        stamp_dots(self.raw_img, self.geometry, self.values)
+        self.profiler.mark("stamp")
+        self.geometry.warp(self.raw_img, self.frame)
+        self.profiler.mark("warp")
+
+    def render(self, board, geometry: Geometry):
+        if geometry is not self.geometry:
+            self.allocate(geometry)
+        self.load_values(board, self.values)
+        self.redraw()
+        return self.frame
+
+
+class DirtyRenderer(FullRenderer):
+    """
+    Keeps the last presented board and frame, and only restamps and rewarps
+    the regions around dots that changed.
+    Falls back to a full redraw when the geometry changes or most dots changed.
+    """
+
+    # Fraction of dots changed above which a full redraw is cheaper.
+    full_thres = 0.15
+
+    def allocate(self, geometry: Geometry):
+        super().allocate(geometry)
+        self.prev_values = np.zeros_like(self.values)
+        self.changed = np.zeros_like(self.values)
+
+    def render(self, board, geometry: Geometry):
+        if geometry is not self.geometry:
+            self.allocate(geometry)
+            self.load_values(board, self.values)
+            self.redraw()
+            return self.frame
+
+        self.values, self.prev_values = self.prev_values, self.values
+        self.load_values(board, self.values)
+        np.not_equal(self.values, self.prev_values, out=self.changed)
+        changed = np.flatnonzero(self.changed)
+        self.profiler.mark("diff")
+        if len(changed) > self.full_thres * len(self.values):
+            self.redraw()
+        else:
+            for i in changed:
+                self.update_dot(i, self.values)
+            self.profiler.mark("update")
+        return self.frame
+
+    def update_dot(self, i, values):
+        geometry = self.geometry
+        # Clear and redraw everything touching this dot, then copy back only its box.
+        # Neighbours are drawn unclipped, as anti-aliased circles change when clipped.
+        x0, y0, x1, y1 = geometry.raw_boxes[i]
+        nx0, ny0, nx1, ny1 = geometry.neighbour_boxes[i]
+        scratch = self.raw_img[ny0:ny1, nx0:nx1].copy()
+        scratch[y0 - ny0 : y1 - ny0, x0 - nx0 : x1 - nx0] = 0
+        stamp_dots(scratch, geometry, values, geometry.neighbours[i], (nx0, ny0))
+        self.raw_img[y0:y1, x0:x1] = scratch[y0 - ny0 : y1 - ny0, x0 - nx0 : x1 - nx0]
+
+        r0, c0, r1, c1 = geometry.out_boxes[i]
+        if r1 <= r0 or c1 <= c0:
+            # Warped off screen.
+            return
+        self.frame[r0:r1, c0:c1] = cv2.remap(
+            self.raw_img,
+            geometry.map1[r0:r1, c0:c1],
+            geometry.map2[r0:r1, c0:c1],
+            cv2.INTER_LINEAR,
+        )
+
+
+class SparseRenderer:
+    """
+    The warped frame is a linear function of the board, so render it as one
+    sparse matrix-vector product with the precomputed dot footprints.
+    Output is always a single channel frame.
+    Matches FullRenderer to within rounding, overlapping dots included (the
+    rounding adds up to a few levels where many dots overlap).
+    """
+
+    def __init__(self, channels=1, profiler=None):
+        self.profiler = profiler or Profiler()
+        self.geometry = None
+        self.frame = None
+
+    def render(self, board, geometry: Geometry):
+        indptr, pixels, weights, extra = geometry.footprints
+        if geometry is not self.geometry:
+            self.geometry = geometry
+            self.frame = np.zeros((geometry.width, geometry.height), dtype=np.uint8)
+
+        values = board.T.ravel()
+        frame = self.frame.reshape(-1)
+        frame[:] = 0
+
+        # Gather the CSR ranges of all lit dots.
+        lit = np.flatnonzero(values)
+        starts = indptr[lit]
+        counts = indptr[lit + 1] - starts
+        index = np.arange(counts.sum()) + np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        frame[pixels[index]] = weights[index]
+
+        for dots, layer_pixels, layer_weights in extra:
+            mask = values[dots]
+            layer_pixels = layer_pixels[mask]
+            total = frame[layer_pixels] + layer_weights[mask].astype(np.uint16)
+            frame[layer_pixels] = np.minimum(total, 255)
+
+        self.profiler.mark("matvec")
+        return self.frame
+
+
+RENDERERS = {
+    "full": FullRenderer,
+    "dirty": DirtyRenderer,
+    "sparse": SparseRenderer,
+}
+
+
+class RenderWorker:
+    """
+    Composes frames on a separate thread into two alternating buffers, so the
+    main thread only uploads finished frames and flips.
+    Composing (circles, warp) is in cv2 and numpy, which release the GIL, so
+    it overlaps with presenting.
+    """
+
+    def __init__(self, display):
+        self.display = display
+        self.cond = Condition()
+        self.running = True
+
+        # Board to compose next, copied in by request().
+        self.pending = np.zeros_like(display.board)
+        self.requested = False
+
+        self.buffers = [None, None]
+        # Index of the buffer ready to present, and of the one being presented.
+        self.ready = None
+        self.in_use = None
+
+        self.thread = Thread(target=self.loop)
+        self.thread.start()
+
+    def request(self, board):
+        """
+        Ask for board to be composed. Replaces any request not yet started.
+        """
+        with self.cond:
+            np.copyto(self.pending, board)
+            self.requested = True
+            self.cond.notify_all()
+
+    def take(self):
+        """
+        Returns the newest composed frame, or None. Call release() when done with it.
+        """
+        with self.cond:
+            if self.ready is None:
+                return None
+            self.in_use, self.ready = self.ready, None
+            return self.buffers[self.in_use]
+
+    def release(self):
+        with self.cond:
+            self.in_use = None
+            self.cond.notify_all()
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self.thread.join()
+
+    def loop(self):
+        board = np.zeros_like(self.pending)
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.requested or not self.running)
+                if not self.running:
+                    return
+                np.copyto(board, self.pending)
+                self.requested = False
+
+            self.display.profiler.reset()
+            frame = self.display.compose(board)
+
+            with self.cond:
+                # Write into the buffer that isn't being presented.
+                self.cond.wait_for(lambda: self.in_use is None or self.ready is None or not self.running)
+                if not self.running:
+                    return
+                index = next(i for i in (0, 1) if i not in (self.in_use, self.ready))
+                if self.buffers[index] is None or self.buffers[index].shape != frame.shape:
+                    self.buffers[index] = np.empty_like(frame)
+                np.copyto(self.buffers[index], frame)
+                self.ready = index
+                self.display.profiler.mark("handoff")
+
+            with self.display.changed:
+                self.display.changed.notify_all()
+
+
+WINDOW_SIZE = (1280, 720)
+
+
+class Tile:
+    """
+    One physical board of a tiled display: board[rows, cols] of the logical
+    board, projected with its own DrawParams into its own area of the window.
+    """
+
+    def __init__(self, row, col, params_path="disp.json", geometry_cache=None, layout: BoardLayout = None):
+        """
+        layout: Layout of the physical board.
+        """
+        self.layout = layout or BoardLayout()
+        self.rows = slice(row * self.layout.rows, (row + 1) * self.layout.rows)
+        self.cols = slice(col * self.layout.cols, (col + 1) * self.layout.cols)
+        # (x, y, width, height) in the window.
+        self.area = (col * WINDOW_SIZE[0], row * WINDOW_SIZE[1], *WINDOW_SIZE)
+        self.params_path = tile_path(params_path, row, col)
+        self.geometry_cache = None
+        if geometry_cache is not None and os.path.isfile(self.params_path):
+            self.geometry_cache = tile_path(geometry_cache, row, col)
+        self.params = DrawParams()
+        self.geometry = None
+        self.renderer = None
+        # Params key of the last render, to tell when the geometry is stale.
+        self.key = None
+
+    def load_params(self):
+        if os.path.isfile(self.params_path):
+            self.params.load(self.params_path)
+        else:
+            print(f"Warning: {self.params_path} not found")
+
+    def render(self, board, engine, channels):
+        """
+        Render this tile's part of the logical board. Returns the tile's frame.
+        """
+        if self.renderer is None:
+            self.renderer = RENDERERS[engine](channels=channels)
+        self.geometry = cached_geometry(self.geometry, self.params, *self.area[2:], self.geometry_cache, self.layout)
+        self.key = self.params.key()
+        return self.renderer.render(board[self.rows, self.cols], self.geometry)
+
+
+class TilePool:
+    """
+    Renders the tiles of a tiled display concurrently, into one frame indexed (x, y).
+    mode "process": Each tile in its own process, writing straight into the
+        frame in shared memory. Scales with cores for all engines.
+    mode "thread": On a thread pool. Stamping dots holds the GIL, so this
+        only helps the sparse engine much.
+    """
+
+    def __init__(self, tiles, size, engine, channels, mode="process"):
+        """
+        size: (width, height) of the whole frame.
+        """
+        self.tiles = tiles
+        self.engine = engine
+        self.channels = channels
+        shape = tuple(size) + (() if channels == 1 else (channels,))
+        self.shm = None
+        self.workers = []
+        self.executor = None
+        if mode == "process":
+            self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+            self.frame = np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf)
+            self.frame.fill(0)
+            context = multiprocessing.get_context("spawn")
+            for tile in tiles:
+                conn, child = context.Pipe()
+                process = context.Process(
+                    target=run_tile_worker,
+                    args=(child, self.shm.name, shape, tile.area, tile.layout, engine, channels, tile.geometry_cache),
+                    daemon=True,
+                )
+                process.start()
+                self.workers.append((process, conn))
+        else:
+            self.frame = np.zeros(shape, dtype=np.uint8)
+            self.executor = ThreadPoolExecutor(len(tiles))
+
+    def render(self, board):
+        if self.executor is not None:
+            list(self.executor.map(lambda tile: self.render_tile(tile, board), self.tiles))
+            return self.frame
+
+        # Send every tile its work first, so they all render at once.
+        for tile, (process, conn) in zip(self.tiles, self.workers):
+            conn.send((tile.params, board[tile.rows, tile.cols]))
+        for tile, (process, conn) in zip(self.tiles, self.workers):
+            conn.recv()
+            tile.key = tile.params.key()
+        return self.frame
+
+    def render_tile(self, tile: Tile, board):
+        x, y, width, height = tile.area
+        self.frame[x : x + width, y : y + height] = tile.render(board, self.engine, self.channels)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            return
+        for process, conn in self.workers:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+        for process, conn in self.workers:
+            process.join()
+            conn.close()
+        del self.frame
+        try:
+            self.shm.close()
+        except BufferError:
+            # A presented frame still refers to it. Freed at exit.
+            pass
+        self.shm.unlink()
+
+
+def run_tile_worker(conn, name, shape, area, layout, engine, channels, geometry_cache):
+    """
+    Entry point of a tile render process. Renders each (params, board) it's
+    sent into its area of the shared frame, and replies when done.
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    x, y, width, height = area
+    renderer = RENDERERS[engine](channels=channels)
+    geometry = None
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message is None:
+                break
+            params, board = message
+            geometry = cached_geometry(geometry, params, width, height, geometry_cache, layout)
+            frame[x : x + width, y : y + height] = renderer.render(board, geometry)
+            conn.send(True)
+    finally:
+        del frame
+        shm.close()
+
+
+class DaemonMonitor:
+    """
+    Accounting for one daemon: CPU time, wakeups, requested vs actual sleep,
+    and time spent holding the board: drawing a frame, from waking (or the
+    last commit, or entering disp.frame()) until it commits.
+    Sleep and wakeups are only seen when the daemon sleeps with disp.sleep().
+    """
+
+    def __init__(self, name, clock=None):
+        self.name = name
+        self.clock = clock or Clock()
+        self.thread = None
+        self.process = None
+        self.pid = None
+        self.start_time = time.monotonic()
+        self.end_time = None
+        self.cpu = 0
+        self.wakeups = 0
+        self.requested = 0
+        self.slept = 0
+        self.max_oversleep = 0
+        self.board_time = 0
+        # When the daemon started drawing its next frame, in real time.
+        self.drawing_since = time.monotonic()
+        self.last_wake = self.clock.monotonic()
+        self.sleeping_until = None
+        # Set by the watchdog.
+        self.status = "running"
+        self.cpu_sample = (self.start_time, 0)
+
+    def run(self, func, args, registry):
+        """
+        Thread target: run func, keeping CPU time up to date. The monitor is
+        in registry under the thread's id while func runs, so disp.sleep() and
+        disp.frame() from the thread find it.
+        """
+        registry[get_ident()] = self
+        try:
+            func(*args)
+        finally:
+            registry.pop(get_ident(), None)
+            self.clock.unregister()
+            self.cpu = time.thread_time()
+            self.end_time = time.monotonic()
+            self.status = "finished"
+
+    def sleep(self, seconds):
+        """
+        Sleep on the monitor's clock. Sleep times are in its time too.
+        """
+        start = self.clock.monotonic()
+        self.sleeping_until = start + seconds
+        self.clock.sleep(seconds)
+        end = self.clock.monotonic()
+        self.sleeping_until = None
+        self.wakeups += 1
+        self.requested += seconds
+        self.slept += end - start
+        self.max_oversleep = max(self.max_oversleep, end - start - seconds)
+        self.last_wake = end
+        self.drawing_since = time.monotonic()
+        self.cpu = time.thread_time()
+
+    def alive(self):
+        return self.end_time is None
+
+    def committed(self):
+        """
+        Called from the daemon on each commit, ending the frame it was drawing.
+        """
+        now = time.monotonic()
+        self.board_time += now - self.drawing_since
+        self.drawing_since = now
+
+    def sample_cpu(self):
+        """
+        Current CPU time, read from outside the daemon.
+        """
+        if not self.alive():
+            return self.cpu
+        try:
+            if self.pid is not None:
+                with open(f"/proc/{self.pid}/stat", "r") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                self.cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+            elif self.thread is not None and self.thread.ident is not None:
+                self.cpu = time.clock_gettime(time.pthread_getcpuclockid(self.thread.ident))
+        except (OSError, AttributeError):
+            # Already exited, or not available on this platform.
+            pass
+        return self.cpu
+
+    def report(self):
+        elapsed = (self.end_time or time.monotonic()) - self.start_time
+        cpu = self.sample_cpu()
+        line = f"{self.name:24s} {self.status:9s} cpu {cpu:7.2f} s ({cpu / max(elapsed, 1e-9) * 100:5.1f}%)"
+        if self.wakeups > 0:
+            oversleep = (self.slept - self.requested) / self.wakeups
+            line += (
+                f"  wakeups {self.wakeups:6d}  slept {self.slept:7.2f}/{self.requested:7.2f} s"
+                f"  oversleep mean {oversleep * 1e3:5.2f} max {self.max_oversleep * 1e3:6.2f} ms"
+            )
+        if self.board_time > 0:
+            line += f"  holding board {self.board_time:6.2f} s"
+        return line
+
 
 class Display:
-    def __init__(self, load_params=True):
+    def __init__(
+        self,
+        load_params=True,
+        geometry_cache="disp_cache.npz",
+        engine="full",
+        mono=False,
+        tint=WHITE,
+        fps=160,
+        vsync=False,
+        pipeline=False,
+        atomic=False,
+        profile=None,
+        headless=False,
+        sinks=(),
+        tiles=None,
+        tile_pool="process",
+        layout=None,
+    ):
+        """
+        geometry_cache: Path to persist projection geometry between runs, or None.
+            Only used together with load_params, and once the calibration file exists.
+        engine: Render engine, one of RENDERERS. Can be overridden with --engine.
+        mono: Render a single channel and present it through a palette. Can be set with --mono.
+        tint: (R, G, B) color of lit dots for single channel frames. Can be set with --tint.
+        fps: Max frame rate. Can be set with --fps.
+        vsync: Sync flips to the display refresh. Can be set with --vsync.
+        pipeline: Compose frames on a worker thread. Can be set with --pipeline.
+        atomic: Double buffer the board. Writers draw into self.board, and only
+            frames published with commit() are shown. Can be set with --atomic.
+            Otherwise every write to self.board is visible as it happens.
+        profile: Path to write per stage timings to at exit, or None to not profile.
+            Can be set with --profile.
+        headless: Render offscreen without a window. Can be set with --headless.
+        sinks: Frame sinks, called with each presented frame. See RingSink.
+            With --virtual, frames are passed at exact simulated timestamps.
+        tiles: (cols, rows) of boards driven as one logical board, each a Tile
+            with its own calibration file (disp_ROW_COL.json) and area of the
+            window. Can be set with --tiles.
+        tile_pool: How tiles are rendered concurrently, "process" or "thread".
+            Can be set with --tile-pool.
+        layout: BoardLayout of the board, or of each board when tiled. A
+            default layout of another size can be set with --board.
+            self.layout is the layout of self.board, all tiles together.
+        """
         self.parser = argparse.ArgumentParser()
         self.parser.add_argument("--limit", type=float)
+        self.parser.add_argument("--engine", choices=RENDERERS.keys())
+        self.parser.add_argument("--mono", action="store_true", help="Render a single channel.")
+        self.parser.add_argument("--tint", type=parse_color, help="Color of lit dots, as R,G,B.")
+        self.parser.add_argument("--refresh", type=float, default=1, help="Max seconds between redraws of an unchanged board.")
+        self.parser.add_argument("--fps", type=float, help="Max frame rate.")
+        self.parser.add_argument("--stats", action="store_true", help="Print frame time and daemon statistics at exit, and watch for misbehaving daemons.")
+        self.parser.add_argument("--pipeline", action="store_true", help="Compose frames on a worker thread.")
+        self.parser.add_argument("--tile-pool", choices=("process", "thread"), help="Render tiles in processes (default) or threads.")
+        self.parser.add_argument("--profile", nargs="?", const="profile.json", help="Time render stages, and write a summary to this file at exit.")
+        self.parser.add_argument("--overlay", action="store_true", help="Show profiling overlay outside the projected area.")
+        self.parser.add_argument("--save-frames", metavar="DIR", help="Write each presented frame as .npy files to DIR.")
+        self.parser.add_argument("--video", metavar="PATH", help="Write presented frames to a video file.")
+        self.parser.add_argument("--record", metavar="PATH", help="Record shown boards, for replay.py.")
+        self.parser.add_argument("--udp", type=int, metavar="PORT", help="Receive packed boards on this UDP port (see ingest.py).")
+        self.parser.add_argument("--udp-host", default="127.0.0.1",
+                                 help="Address the UDP port listens on. Anything that can reach it can draw on the board, so only use 0.0.0.0 (any machine) on a trusted network.")
+        self.parser.add_argument("--unix", metavar="PATH", help="Receive packed boards on this UNIX datagram socket.")
+        self.parser.add_argument("--control", type=int, metavar="PORT", help="Accept keys and commands on this TCP port (see control.py).")
+        self.parser.add_argument("--control-unix", metavar="PATH", help="Accept keys and commands on this UNIX socket.")
+        self.parser.add_argument("--control-host", default="127.0.0.1",
+                                 help="Address the control port listens on. It has no authentication, so only use 0.0.0.0 (any machine) on a trusted network.")
+        self.parser.add_argument("--sync-master", type=int, metavar="PORT", help="Send boards to sync followers, which sync clocks on this UDP port (see sync.py).")
+        self.parser.add_argument("--sync-follow", type=parse_address, metavar="HOST:PORT", help="Show boards from this sync master.")
+        self.parser.add_argument("--sync-delay", type=float, default=0.1, help="Seconds from a commit on the master to followers presenting it.")
+        self.parser.add_argument("--artnet", action="store_true", help="Receive Art-Net DMX (see dmx.py).")
+        self.parser.add_argument("--sacn", action="store_true", help="Receive sACN (E1.31) DMX.")
+        self.parser.add_argument("--dmx-universe", type=int, default=1, help="First DMX universe mapped to the board.")
+        self.parser.add_argument("--dmx-channel", type=int, default=1, help="First channel in it, from 1.")
+        self.parser.add_argument("--dmx-width", type=int, default=512, help="Channels used per universe.")
+        self.parser.add_argument("--dmx-threshold", type=int, default=128, help="Channel value that lights a dot.")
+        self.parser.add_argument("--dmx-timeout", type=float, default=2.5, help="Blank the board after this long without DMX.")
+        add_setup_args(self.parser)
+        setup_parser = argparse.ArgumentParser(add_help=False)
+        add_setup_args(setup_parser)
+        setup_args = setup_parser.parse_known_args()[0]
+        vsync = vsync or setup_args.vsync
+        # Frames are presented at exact multiples of virtual_period of simulated time.
+        self.clock = Clock() if setup_args.virtual is None else VirtualClock()
+        self.virtual_period = None if setup_args.virtual is None else 1 / setup_args.virtual
+        # The main loop takes part in virtual time from the start, so daemons can't run ahead of it.
+        self.clock.register()
 
-        self.board = np.zeros((27, 81), dtype=bool)
+        tiles = tiles or setup_args.tiles
+        cols, rows = tiles or (1, 1)
+        if layout is None:
+            layout = BoardLayout() if setup_args.board is None else BoardLayout(setup_args.board[1], setup_args.board[0])
+        self.layout = layout.tiled(cols, rows) if tiles is not None else layout
+        # Back buffer, written by daemons.
+        self._board = self.layout.zeros()
+        # Front buffer, read by the renderer. Same array unless atomic.
+        self.atomic = atomic or setup_args.atomic
+        self.front = self._board.copy() if self.atomic else self._board
+        self.board_lock = Lock()
+        self.snapshot_board = np.zeros_like(self._board)
+        # Number of commits, and recent commit times for the content frame rate.
+        self.commits = 0
+        self.commit_times = deque(maxlen=100)
         self.run = True
 
-        self.window = pygame.display.set_mode((1280, 720), pygame.FULLSCREEN)
+        # Bumped by notify(). The main loop sleeps on self.changed until it changes.
+        self.version = 0
+        self.changed = Condition()
+        self.drawn_version = -1
+        self.drawn_board = np.zeros_like(self._board)
+        self.drawn_time = 0
+        self.refresh = 1
+        self.pipeline = pipeline
+        self.worker = None
+
+        self.headless = headless or setup_args.headless
+        self.window = create_window((WINDOW_SIZE[0] * cols, WINDOW_SIZE[1] * rows), vsync, self.headless, tiles is None)
+        self.sinks = list(sinks)
+        self.last_frame = None
+        self.recorder = None
+        self.receiver = None
+        self.dmx = None
+        self.control_server = None
+        self.sync = None
+        self.scheduler = FrameScheduler(fps, vsync=vsync)
+        self.profile = profile
+        self.profiler = Profiler(enabled=profile is not None)
+        self.overlay = False
+        self.overlay_surfaces = []
+        self.overlay_time = 0
         self.params = DrawParams()
         if load_params:
             if os.path.isfile("disp.json"):
                 self.params.load("disp.json")
             else:
                 print("Warning: disp.json not found")
+        geometry_cache = geometry_cache if load_params else None
+        # Only persist calibrated geometry, rather than leaving a cache of the
+        # defaults wherever a program is run.
+        self.geometry_cache = geometry_cache if os.path.isfile("disp.json") else None
+        self.geometry = None
+        # Tiled display: params, geometry and renderer are per tile instead.
+        self.tiles = None
+        self.tile_pool = tile_pool
+        self.tile_renderer = None
+        if tiles is not None:
+            self.tiles = [Tile(row, col, "disp.json", geometry_cache, layout) for row in range(rows) for col in range(cols)]
+            if load_params:
+                for tile in self.tiles:
+                    tile.load_params()
+        self.engine = engine
+        self.mono = mono
+        self.tint = tint
+        self.renderer = None
+        self.rgb = None
+        self.surface = None
 
         self.daemons = []
+        # DaemonMonitor of each daemon, and of each running daemon thread by thread id.
+        self.monitors = []
+        self.thread_monitors = {}
+        self.daemons_lock = Lock()
+        # Monitors of finished daemons that were pruned, e.g. by switching shows, for the report.
+        self.finished_monitors = deque(maxlen=100)
+        # Default for add_daemon(process=...)
+        # Process daemons can't share a virtual clock.
+        self.process_daemons = setup_args.processes and not self.clock.virtual
+        # Board is moved to shared memory when the first process daemon is added.
+        self.shared = None
+        # Last sequence seen, or in atomic mode commit sequence.
+        self.shared_sequence = 0
+        # Atomic mode: where committed shared boards are read to, and the lock process daemons commit with.
+        self.shared_frame = None
+        self.shared_commit_lock = None
         # Append to this externally. Each func is called with (self, event.key)
         self.keydown_hooks = []
+        # Keys also come from the control socket's thread.
+        self.key_lock = Lock()
+        # Append to this externally. Each func is called with (self, words) for
+        # control socket commands, and returns None if it doesn't handle the
+        # command, or else a reply string. Raise ValueError for errors.
+        self.command_hooks = []
+        # Created by the first add_layer().
+        self.compositor = None
+
+    @property
+    def board(self):
+        return self._board
+
+    @board.setter
+    def board(self, value):
+        """
+        Assigning copies into the existing board, and commits it.
+        """
+        self._board[...] = value
+        self.commit()
+
+    def commit(self):
+        """
+        Publish self.board as a finished frame.
+        In atomic mode this copies it to the front buffer; otherwise it's the
+        same as notify(). Either way it counts a content frame.
+        """
+        if self.atomic:
+            with self.board_lock:
+                np.copyto(self.front, self._board)
+        monitor = self.thread_monitors.get(get_ident())
+        if monitor is not None:
+            monitor.committed()
+        self.count_commit()
+
+    def count_commit(self):
+        self.commits += 1
+        self.commit_times.append(self.clock.monotonic())
+        self.notify()
+
+    @contextmanager
+    def frame(self):
+        """
+        with disp.frame() as board: draw into board, then commit on exit.
+        """
+        monitor = self.thread_monitors.get(get_ident())
+        if monitor is not None:
+            monitor.drawing_since = time.monotonic()
+        yield self._board
+        self.commit()
+
+    def sleep(self, seconds):
+        """
+        Daemons should sleep with this instead of time.sleep, for accounting
+        and so they follow the virtual clock.
+        """
+        monitor = self.thread_monitors.get(get_ident())
+        if monitor is None:
+            self.clock.sleep(seconds)
+        else:
+            monitor.sleep(seconds)
+
+    def time(self):
+        """
+        Daemons should tell time with this instead of time.time, so they follow the virtual clock.
+        """
+        return self.clock.time()
+
+    def content_fps(self):
+        """
+        Rate of recent commits.
+        """
+        if len(self.commit_times) < 2:
+            return 0
+        return (len(self.commit_times) - 1) / (self.commit_times[-1] - self.commit_times[0])
+
+    def snapshot(self):
+        """
+        Consistent copy of the front buffer, for rendering.
+        """
+        with self.board_lock:
+            np.copyto(self.snapshot_board, self.front)
+        return self.snapshot_board
+
+    def notify(self):
+        """
+        Call after changing self.board, so the main loop redraws immediately.
+        Writers that don't call this are still picked up, at the next event poll.
+        """
+        with self.changed:
+            self.version += 1
+            self.changed.notify_all()
+
+    def needs_present(self):
+        """
+        Whether the last drawn (or requested) frame is out of date.
+        """
+        if self.version != self.drawn_version:
+            return True
+        if self.clock.time() - self.drawn_time > self.refresh:
+            return True
+        if self.geometry_stale():
+            return True
+        return not np.array_equal(self.front, self.drawn_board)
+
+    def poll_shared(self):
+        """
+        Turn changes made by process daemons into a commit. In atomic mode,
+        only boards they committed, never one they're still writing.
+        """
+        if self.shared is None:
+            return
+        if self.atomic:
+            sequence = self.shared.read_committed(self.shared_frame, self.shared_sequence)
+            if sequence is not None:
+                self.shared_sequence = sequence
+                with self.board_lock:
+                    np.copyto(self.front, self.shared_frame)
+                self.count_commit()
+        elif self.shared.sequence != self.shared_sequence:
+            self.shared_sequence = self.shared.sequence
+            self.commit()
+
+    def has_work(self):
+        """
+        Whether the main loop should wake up before the next event poll.
+        """
+        self.poll_shared()
+        if self.worker is not None and self.worker.ready is not None:
+            return True
+        return self.version != self.drawn_version
+
+    def mark_drawn(self, version, board):
+        self.drawn_version = version
+        np.copyto(self.drawn_board, board)
+        self.drawn_time = self.clock.time()
+        if self.recorder is not None:
+            self.recorder(board, self.clock.monotonic())
 
     def save_board(self, path):
         np.save(path, self.board)
@@ -88,78 +1467,732 @@ class Display:
         """
         args = self.parser.parse_args()
         self.time_limit = args.limit
-        self.time_start = time.time()
+        self.refresh = args.refresh
+        if args.fps is not None:
+            self.scheduler.period = 1 / args.fps
+        if args.engine is not None:
+            self.engine = args.engine
+        if args.mono:
+            self.mono = True
+        if args.tint is not None:
+            self.set_tint(args.tint)
+        if args.pipeline:
+            self.pipeline = True
+        if args.tile_pool is not None:
+            self.tile_pool = args.tile_pool
+        if args.stats and not self.clock.virtual:
+            Thread(target=self.watchdog, daemon=True).start()
+        if args.profile is not None:
+            self.profile = args.profile
+            self.profiler.enabled = True
+        self.overlay = args.overlay
+        if args.save_frames is not None:
+            self.sinks.append(NpySink(args.save_frames))
+        if args.record is not None:
+            self.recorder = Recorder(args.record, self._board.shape)
+        if args.udp is not None or args.unix is not None:
+            udp = None if args.udp is None else (args.udp_host, args.udp)
+            self.receiver = FrameReceiver(self, udp, args.unix)
+            self.receiver.start()
+        if args.artnet or args.sacn:
+            self.dmx = DmxReceiver(
+                self, args.artnet, args.sacn, args.dmx_universe, args.dmx_channel,
+                args.dmx_width, args.dmx_threshold, args.dmx_timeout,
+            )
+            self.dmx.start()
+        if args.sync_master is not None:
+            self.sync = SyncMaster(self, args.sync_master, args.sync_delay)
+            self.sync.start()
+        elif args.sync_follow is not None:
+            self.sync = SyncFollower(self, args.sync_follow)
+            self.sync.start()
+        if args.video is not None:
+            video_fps = 30 if self.virtual_period is None else 1 / self.virtual_period
+            self.sinks.append(VideoSink(args.video, video_fps))
+        if self.pipeline:
+            self.worker = RenderWorker(self)
+        self.time_start = self.clock.time()
+        if args.control is not None or args.control_unix is not None:
+            tcp = None if args.control is None else (args.control_host, args.control)
+            self.control_server = ControlServer(self.control, tcp, args.control_unix)
+            self.control_server.start()
 
+        scheduler = self.scheduler
+        profiler = self.profiler
+        profiler.reset()
+        poll_time = min(scheduler.period, 1 / 100)
+        if self.clock.virtual:
+            self.virtual_loop()
         while self.run:
-            time.sleep(1 / 160)
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.run = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key in (pygame.K_ESCAPE, pygame.K_q):
-                        self.run = False
-                    for hook in self.keydown_hooks:
-                        hook(self, event.key)
-
-            self.draw_board()
-            pygame.display.flip()
+            # Wait for the frame deadline, then sleep until the board changes or it's time to poll events.
+            scheduler.wait()
+            with self.changed:
+                self.changed.wait_for(self.has_work, timeout=poll_time)
+            profiler.mark("wait")
 
-            if self.time_limit is not None and time.time() - self.time_start > self.time_limit:
-                print("Time limit reached")
-                self.run = False
+            self.handle_events()
+            profiler.mark("events")
+
+            if self.worker is not None:
+                # Only upload and flip here, composing is on the worker.
+                if self.needs_present():
+                    version = self.version
+                    board = self.snapshot()
+                    self.worker.request(board)
+                    self.mark_drawn(version, board)
+                frame = self.worker.take()
+                if frame is not None:
+                    scheduler.begin()
+                    self.present(frame)
+                    self.draw_overlay()
+                    pygame.display.flip()
+                    profiler.mark("flip")
+                    self.worker.release()
+                    scheduler.end()
+                else:
+                    scheduler.idle()
+
+            elif self.needs_present():
+                scheduler.begin()
+                version = self.version
+                board = self.snapshot()
+                self.present(self.compose(board))
+                self.draw_overlay()
+                pygame.display.flip()
+                profiler.mark("flip")
+                self.mark_drawn(version, board)
+                scheduler.end()
+            else:
+                scheduler.idle()
+
+            self.check_limit()
 
+        self.clock.stop()
+        if self.worker is not None:
+            self.worker.stop()
+        if self.tile_renderer is not None:
+            self.last_frame = None
+            self.tile_renderer.close()
         pygame.quit()
-        for daemon in self.daemons:
+        for sink in self.sinks:
+            if hasattr(sink, "close"):
+                sink.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.receiver is not None:
+            self.receiver.close()
+        if self.dmx is not None:
+            self.dmx.close()
+        if self.control_server is not None:
+            self.control_server.close()
+        if self.sync is not None:
+            self.sync.close()
+        if args.stats and not self.clock.virtual:
+            scheduler.print_stats()
+            print(f"Content frames: {self.commits}, recently {self.content_fps():.1f} per second.")
+            if self.receiver is not None:
+                self.receiver.print_stats()
+            if self.dmx is not None:
+                self.dmx.print_stats()
+            if self.sync is not None:
+                self.sync.print_stats()
+        if self.profiler.enabled:
+            self.profiler.save(self.profile)
+            print(f"Saved render profile to {self.profile}")
+        if self.shared is not None:
+            self.shared.run = False
+        for monitor, daemon in zip(self.monitors, self.daemons):
+            monitor.sample_cpu()
             daemon.join()
+            if monitor.alive():
+                monitor.end_time = time.monotonic()
+                monitor.status = "finished"
+        if args.stats:
+            self.print_daemon_report()
+        if self.shared is not None:
+            self._board = self._board.copy()
+            if not self.atomic:
+                self.front = self._board
+            self.shared.close()
+            self.shared.unlink()
+
+    def handle_events(self):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.run = False
+            elif event.type == pygame.KEYDOWN:
+                self.keydown(event.key)
+
+    def keydown(self, key):
+        """
+        Handle a key press, from the keyboard or the control socket.
+        """
+        with self.key_lock:
+            if key in (pygame.K_ESCAPE, pygame.K_q):
+                self.run = False
+            elif key == pygame.K_F2:
+                self.print_daemon_report()
+            for hook in self.keydown_hooks:
+                hook(self, key)
+
+    def control(self, line):
+        """
+        Run one control socket command. Returns the reply.
+        """
+        words = shlex.split(line)
+        if words[0] == "key":
+            keys = [pygame.key.key_code(name) for name in words[1:]]
+            for key in keys:
+                self.keydown(key)
+        elif words[0] == "limit":
+            if len(words) != 2:
+                raise ValueError("Usage: limit SECONDS|none")
+            if words[1] == "none":
+                self.time_limit = None
+            else:
+                self.time_limit = self.clock.time() - self.time_start + float(words[1])
+        elif words[0] == "quit":
+            self.run = False
+        else:
+            for hook in self.command_hooks:
+                reply = hook(self, words)
+                if reply is not None:
+                    return reply
+            raise ValueError(f"Unknown command {words[0]}")
+
+    def check_limit(self):
+        if self.time_limit is not None and self.clock.time() - self.time_start > self.time_limit:
+            print("Time limit reached")
+            self.run = False
+
+    def virtual_loop(self):
+        """
+        Main loop on a virtual clock: present a frame at every multiple of
+        virtual_period of simulated time, as fast as they can be rendered.
+        Unchanged frames are passed to the sinks again without rendering.
+        Stops at the time limit, or once all daemons have finished.
+        """
+        clock = self.clock
+        wall_start = time.monotonic()
+        index = 0
+        while self.run:
+            clock.sleep(index * self.virtual_period - clock.monotonic(), late=True)
+            self.handle_events()
+            if self.needs_present():
+                version = self.version
+                board = self.snapshot()
+                self.present(self.compose(board))
+                self.mark_drawn(version, board)
+            elif self.last_frame is not None:
+                self.emit(self.last_frame)
+            pygame.display.flip()
+            index += 1
+
+            self.check_limit()
+            if self.time_limit is None and self.daemons and not any(monitor.alive() for monitor in self.monitors):
+                print("All daemons finished")
+                self.run = False
+
+        print(f"Presented {index} frames, {clock.monotonic():.1f} s of virtual time in {time.monotonic() - wall_start:.1f} s.")
+
+    def get_geometry(self):
+        """
+        Returns cached Geometry, rebuilding only if params or window size changed.
+        """
+        self.geometry = cached_geometry(self.geometry, self.params, *self.window.get_size(), self.geometry_cache, self.layout)
+        return self.geometry
+
+    def geometry_stale(self):
+        """
+        Whether params or the window changed since the last frame was composed.
+        """
+        if self.tiles is not None:
+            return any(tile.key != tile.params.key() for tile in self.tiles)
+        return self.geometry is None or self.geometry.key != geometry_key(self.params, *self.window.get_size(), self.layout)
+
+    def compose(self, board):
+        """
+        Render board to a warped frame, indexed (x, y). Doesn't touch the window.
+        """
+        if self.tiles is not None:
+            if self.tile_renderer is None:
+                channels = 1 if self.mono or self.engine == "sparse" else 3
+                self.tile_renderer = TilePool(self.tiles, self.window.get_size(), self.engine, channels, self.tile_pool)
+            frame = self.tile_renderer.render(board)
+            self.profiler.mark("tiles")
+            return frame
+
+        geometry = self.get_geometry()
+        if self.renderer is None:
+            self.renderer = RENDERERS[self.engine](channels=1 if self.mono else 3, profiler=self.profiler)
+        return self.renderer.render(board, geometry)
 
     def draw_board(self):
-        params = self.params
-        width = self.window.get_width()
-        height = self.window.get_height()
-
-        y_ival = 9
-        x_ival = y_ival * 3**0.5 / 2
-        total_width = 81 * x_ival
-        total_height = 27 * y_ival
-        offset_x = (width - total_width) / 2
-        offset_y = (height - total_height) / 2
+        self.present(self.compose(self.snapshot()))
 
-        raw_img = np.zeros((height, width, 3), dtype=np.uint8)
-        for grid_x in range(81):
-            px_x = grid_x * x_ival + offset_x
-            for grid_y in range(27):
-                px_y = grid_y * y_ival + offset_y
-                if grid_x % 2 == 0:
-                    px_y += y_ival // 2
+    def present(self, img):
+        """
+        Upload a warped frame (indexed (x, y)) to the window.
+        Reuses the same buffer and surface every frame.
+        Single channel frames are copied as is into an 8 bit surface, and
+        colored by its palette when blitting.
+        """
+        size = img.shape[:2]
+        mono = img.ndim == 2
+        if self.surface is None or self.surface.get_size() != size or (self.surface.get_bitsize() == 8) != mono:
+            if mono:
+                self.surface = pygame.Surface(size, depth=8)
+                self.surface.set_palette(tint_palette(self.tint))
+            else:
+                self.rgb = np.zeros((*size, 3), dtype=np.uint8)
+                self.surface = pygame.Surface(size)
 
-                color = (255, 255, 255) if self.board[grid_y, grid_x] else (0, 0, 0)
-                cv2.circle(raw_img, (int(px_x), int(px_y)), int(params.radius), color, -1, cv2.LINE_AA)
+        if mono:
+            pygame.pixelcopy.array_to_surface(self.surface, img)
+        else:
+            cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=self.rgb)
+            self.profiler.mark("convert")
+            pygame.pixelcopy.array_to_surface(self.surface, self.rgb)
+        self.profiler.mark("upload")
+        self.window.blit(self.surface, (0, 0))
+        self.profiler.mark("blit")
 
-        # Warp perspective
-        min_x = offset_x
-        max_x = 80 * x_ival + offset_x
-        min_y = offset_y
-        max_y = 26 * y_ival + offset_y
-        from_pts = np.array([
-            [min_x, min_y],
-            [max_x, min_y],
-            [max_x, max_y],
-            [min_x, max_y],
-        ], dtype=np.float32)
-        to_pts = np.array([params.tl, params.tr, params.br, params.bl], dtype=np.float32)
-        trans = cv2.getPerspectiveTransform(from_pts, to_pts)
-        img = cv2.warpPerspective(raw_img, trans, (height, width))
+        self.last_frame = img
+        if self.sinks:
+            self.emit(img)
+            self.profiler.mark("sink")
+
+    def emit(self, img):
+        """
+        Pass a warped frame (indexed (x, y)) to the sinks, indexed (y, x).
+        """
+        timestamp = self.clock.monotonic()
+        frame = img.swapaxes(0, 1)
+        for sink in self.sinks:
+            sink(frame, timestamp)
+
+    def draw_overlay(self):
+        """
+        Draw profiling stats in a corner of the window outside the projected area.
+        Text is only rerendered twice a second.
+        """
+        if not self.overlay:
+            return
+        if time.time() - self.overlay_time > 0.5:
+            self.overlay_time = time.time()
+            font = pygame.font.Font(None, 18)
+            stats = self.scheduler.stats()
+            lines = [f"frame    {stats['mean'] * 1e3:6.2f} ms  p95 {stats['p95'] * 1e3:6.2f}  missed {stats['missed']}"]
+            lines += self.profiler.lines()
+            self.overlay_surfaces = [font.render(line, True, (255, 0, 0)) for line in lines]
+        if not self.overlay_surfaces:
+            return
+
+        width = max(surface.get_width() for surface in self.overlay_surfaces)
+        height = sum(surface.get_height() for surface in self.overlay_surfaces)
+        x, y = self.overlay_corner(width, height)
+        for surface in self.overlay_surfaces:
+            self.window.blit(surface, (x, y))
+            y += surface.get_height()
+        self.profiler.mark("overlay")
+
+    def overlay_corner(self, width, height):
+        """
+        Top left of a width x height box in a window corner not overlapping the projected board.
+        """
+        # Tiled: in the first tile's area.
+        params = self.params if self.tiles is None else self.tiles[0].params
+        win_x, win_y, win_w, win_h = (0, 0, *self.window.get_size()) if self.tiles is None else self.tiles[0].area
+        # Params are (y, x).
+        corners = np.array([params.tl, params.tr, params.br, params.bl], dtype=float)
+        min_y, min_x = corners.min(axis=0)
+        max_y, max_x = corners.max(axis=0)
+        for x, y in ((0, 0), (win_w - width, 0), (0, win_h - height), (win_w - width, win_h - height)):
+            if x + width < min_x or x > max_x or y + height < min_y or y > max_y:
+                return win_x + x, win_y + y
+        return win_x, win_y
 
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        #img = img.swapaxes(0, 1)
-        img = pygame.surfarray.make_surface(img)
-        self.window.blit(img, (0, 0))
+    def set_tint(self, tint):
+        """
+        Change color of lit dots. Free for single channel frames, as only the palette changes.
+        """
+        self.tint = tuple(tint)
+        if self.surface is not None and self.surface.get_bitsize() == 8:
+            self.surface.set_palette(tint_palette(self.tint))
 
-    def add_daemon(self, func, args):
+    def add_layer(self, blend="or", generator=None, rate=10):
+        """
+        Add a layer on top of the others; see Compositor.add_layer.
+        Once there are layers, they own self.board.
+        """
+        if self.compositor is None:
+            self.compositor = Compositor(self)
+        return self.compositor.add_layer(blend, generator, rate)
+
+    def add_daemon(self, func, args, process=None):
         """
         Handles creating and starting thread, and joining at end of self.start()
+        process: Run in a separate process instead, so it doesn't compete with
+            rendering for the GIL. The board is moved to shared memory, and the
+            daemon gets a SharedDisplay in place of this Display, which only has
+            board, layout, run, notify(), commit(), frame(), sleep() and time().
+            Default False. With --processes, True for programs that declare
+            PROCESS_SAFE = True, and an error for the rest.
         """
-        daemon = Thread(target=func, args=args)
-        daemon.start()
-        self.daemons.append(daemon)
+        name = getattr(func, "__name__", str(func))
+        if process is None:
+            # Daemons given layers run in a thread regardless, see below.
+            process = self.process_daemons and not any(isinstance(arg, Layer) for arg in args)
+            module = sys.modules.get(getattr(func, "__module__", None))
+            if process and not getattr(module, "PROCESS_SAFE", False):
+                self.parser.error(
+                    f"--processes: {name} uses more of the display than process daemons get "
+                    "(e.g. key hooks), run it without --processes"
+                )
+        if process and self.clock.virtual:
+            print("Warning: process daemons can't follow the virtual clock, running in a thread.")
+            process = False
+        if process and any(isinstance(arg, Layer) for arg in args):
+            # Layers live in this process.
+            process = False
+        monitor = DaemonMonitor(name, self.clock)
+
+        if process:
+            context = multiprocessing.get_context("spawn")
+            if self.shared is None:
+                self.shared = SharedBoard(self._board.shape)
+                self.shared.board[:] = self._board
+                self._board = self.shared.board
+                if self.atomic:
+                    self.shared_frame = np.zeros_like(self._board)
+                    self.shared_commit_lock = context.Lock()
+                else:
+                    self.front = self._board
+            args = tuple(DisplayPlaceholder() if arg is self else arg for arg in args)
+            commit_lock = self.shared_commit_lock if self.atomic else None
+            daemon = context.Process(
+                target=run_shared_daemon,
+                args=(self.shared.name, self.layout, os.getpid(), commit_lock, func, args),
+            )
+            daemon.start()
+            monitor.process = daemon
+            monitor.pid = daemon.pid
+        else:
+            daemon = Thread(target=monitor.run, args=(func, args, self.thread_monitors))
+            monitor.thread = daemon
+            self.clock.register(daemon)
+            daemon.start()
+        with self.daemons_lock:
+            self.prune_daemons()
+            self.monitors.append(monitor)
+            self.daemons.append(daemon)
         return daemon
+
+    def prune_daemons(self):
+        """
+        Forget finished daemons, so a long running show host doesn't collect them.
+        Call with daemons_lock held.
+        """
+        finished = [not daemon.is_alive() for daemon in self.daemons]
+        if not any(finished):
+            return
+        for monitor, done in zip(self.monitors, finished):
+            if done:
+                if monitor.alive():
+                    monitor.end_time = time.monotonic()
+                    monitor.status = "finished"
+                self.finished_monitors.append(monitor)
+        # New lists rather than removing in place, as the watchdog iterates them.
+        self.monitors = [monitor for monitor, done in zip(self.monitors, finished) if not done]
+        self.daemons = [daemon for daemon, done in zip(self.daemons, finished) if not done]
+
+    def watchdog(self, interval=1, stall_time=10, hog_share=0.5, hog_time=5):
+        """
+        Flag daemons that haven't woken up for stall_time seconds longer than
+        they asked to sleep, or that used over hog_share of a core for hog_time seconds.
+        """
+        while self.run:
+            time.sleep(interval)
+            now = time.monotonic()
+            for monitor in self.monitors:
+                if not monitor.alive():
+                    continue
+                if monitor.process is not None:
+                    if not monitor.process.is_alive():
+                        monitor.end_time = now
+                        monitor.status = "finished"
+                        continue
+
+                status = "running"
+                wake_due = monitor.sleeping_until if monitor.sleeping_until is not None else monitor.last_wake
+                if monitor.pid is None and now - wake_due > stall_time:
+                    status = "stalled"
+
+                sample_time, sample_cpu = monitor.cpu_sample
+                if now - sample_time >= hog_time:
+                    cpu = monitor.sample_cpu()
+                    if (cpu - sample_cpu) / (now - sample_time) > hog_share:
+                        status = "hogging"
+                    monitor.cpu_sample = (now, cpu)
+                elif monitor.status == "hogging":
+                    status = "hogging"
+
+                if status != monitor.status and status != "running":
+                    print(f"Warning: daemon {monitor.name} is {status}")
+                monitor.status = status
+
+    def print_daemon_report(self):
+        print("Daemons:")
+        for monitor in [*self.finished_monitors, *self.monitors]:
+            print("  " + monitor.report())
+
+
+class Layer:
+    """
+    One layer of a Compositor. Stands in for Display for the layer's daemons:
+    they draw into layer.board and commit() as usual, at their own rate.
+    """
+
+    def __init__(self, compositor, blend):
+        self.compositor = compositor
+        self.blend = blend
+        self._board = np.zeros_like(compositor.disp.board)
+        # Last committed board, read when compositing.
+        self.front = np.zeros_like(self._board)
+
+    @property
+    def board(self):
+        return self._board
+
+    @board.setter
+    def board(self, value):
+        self._board[...] = value
+        self.commit()
+
+    def commit(self):
+        self.compositor.update(self)
+
+    def notify(self):
+        self.commit()
+
+    @contextmanager
+    def frame(self):
+        yield self._board
+        self.commit()
+
+    def set_blend(self, blend):
+        self.blend = blend
+        self.compositor.update(self)
+
+    def generate(self, generator, rate):
+        """
+        Daemon: call generator(board) rate times per second, committing each time.
+        """
+        while self.run:
+            generator(self._board)
+            self.commit()
+            self.sleep(1 / rate)
+
+    def __getattr__(self, name):
+        # run, sleep(), time(), params...
+        return getattr(self.compositor.disp, name)
+
+
+class Compositor:
+    """
+    Stacks layers into Display.board, bottom first. Each layer is blended onto
+    the ones below it:
+        or: Light the layer's dots.
+        and_not: Clear the layer's dots.
+        xor: Invert the layer's dots.
+        mask: Keep only dots lit in the layer.
+    The result of each step is cached, so a commit only recombines its layer
+    and the ones above it.
+    """
+
+    BLENDS = {
+        "or": np.logical_or,
+        "and_not": np.greater,
+        "xor": np.logical_xor,
+        "mask": np.logical_and,
+    }
+
+    def __init__(self, disp: Display):
+        self.disp = disp
+        self.layers = []
+        # composites[i] is layers 0 to i blended together.
+        self.composites = []
+        self.empty = np.zeros_like(disp.board)
+        self.lock = Lock()
+
+    def add_layer(self, blend="or", generator=None, rate=10):
+        """
+        blend: One of BLENDS.
+        generator: Optional func(board) called rate times per second to update the layer.
+            Otherwise, run daemons on the returned layer, e.g.
+            disp.add_daemon(clock_daemon, (layer,))
+        """
+        if blend not in self.BLENDS:
+            raise ValueError(f"Unknown blend {blend}")
+        layer = Layer(self, blend)
+        with self.lock:
+            self.layers.append(layer)
+            self.composites.append(np.zeros_like(self.empty))
+        if generator is not None:
+            self.disp.add_daemon(layer.generate, (generator, rate), process=False)
+        return layer
+
+    def update(self, layer: Layer):
+        with self.lock:
+            np.copyto(layer.front, layer.board)
+            start = self.layers.index(layer)
+            below = self.composites[start - 1] if start > 0 else self.empty
+            for i in range(start, len(self.layers)):
+                self.BLENDS[self.layers[i].blend](below, self.layers[i].front, out=self.composites[i])
+                below = self.composites[i]
+            self.disp.board = below
+
+
+class SharedBoard:
+    """
+    Board in shared memory, with a sequence number bumped on every change and a run flag.
+    For atomic mode, also a committed copy of the board, guarded seqlock style
+    by a commit sequence number that's odd while a commit is being copied.
+    Layout: uint64 sequence, uint8 run flag, padding, uint64 commit sequence,
+    padding, then the bool board and the committed board.
+    """
+
+    header_size = 32
+
+    def __init__(self, shape, name=None):
+        """
+        name: Attach to an existing SharedBoard. Default creates a new one.
+        """
+        board_size = int(np.prod(shape))
+        size = self.header_size + 2 * board_size
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self.name = self.shm.name
+        self.header = np.ndarray((self.header_size,), dtype=np.uint8, buffer=self.shm.buf)
+        self.sequence_view = self.header[:8].view(np.uint64)
+        self.commit_view = self.header[16:24].view(np.uint64)
+        self.board = np.ndarray(shape, dtype=bool, buffer=self.shm.buf, offset=self.header_size)
+        self.committed = np.ndarray(shape, dtype=bool, buffer=self.shm.buf, offset=self.header_size + board_size)
+        if name is None:
+            self.header[:] = 0
+            self.run = True
+
+    @property
+    def sequence(self):
+        return int(self.sequence_view[0])
+
+    def bump(self):
+        self.sequence_view[0] += 1
+
+    def publish(self):
+        """
+        Copy board to the committed board. Only one process may publish at a time.
+        """
+        self.commit_view[0] += 1
+        np.copyto(self.committed, self.board)
+        self.commit_view[0] += 1
+
+    def read_committed(self, out, last):
+        """
+        Copy the committed board to out, if there's a commit after sequence last.
+        Returns its commit sequence, or None if there's no new commit, or one
+        was being copied (out may then be torn, so try again later).
+        """
+        sequence = int(self.commit_view[0])
+        if sequence == last or sequence % 2:
+            return None
+        np.copyto(out, self.committed)
+        if int(self.commit_view[0]) != sequence:
+            return None
+        return sequence
+
+    @property
+    def run(self):
+        return bool(self.header[8])
+
+    @run.setter
+    def run(self, value):
+        self.header[8] = value
+
+    def close(self):
+        # Views into the buffer must be gone before closing.
+        del self.header, self.sequence_view, self.commit_view, self.board, self.committed
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+class DisplayPlaceholder:
+    """
+    Stands in for the Display in a process daemon's args, as it can't be pickled.
+    """
+
+
+class SharedDisplay:
+    """
+    What a process daemon sees in place of Display.
+    Writes go straight to the shared board. In atomic mode, commit() copies
+    it to the committed board, which is all the parent shows.
+    """
+
+    def __init__(self, name, layout: BoardLayout, parent_pid, commit_lock=None):
+        """
+        commit_lock: Atomic mode, the lock all process daemons commit with. None otherwise.
+        """
+        self.shared = SharedBoard(layout.shape, name)
+        self.layout = layout
+        self.parent_pid = parent_pid
+        self.commit_lock = commit_lock
+
+    @property
+    def board(self):
+        return self.shared.board
+
+    @board.setter
+    def board(self, value):
+        self.shared.board[...] = value
+        self.commit()
+
+    @property
+    def run(self):
+        return self.shared.run and os.getppid() == self.parent_pid
+
+    def notify(self):
+        self.shared.bump()
+
+    def commit(self):
+        """
+        The parent commits when it sees the (commit) sequence number change.
+        """
+        if self.commit_lock is not None:
+            with self.commit_lock:
+                self.shared.publish()
+        self.notify()
+
+    def sleep(self, seconds):
+        time.sleep(max(seconds, 0))
+
+    def time(self):
+        return time.time()
+
+    @contextmanager
+    def frame(self):
+        yield self.board
+        self.commit()
+
+
+def run_shared_daemon(name, layout, parent_pid, commit_lock, func, args):
+    """
+    Entry point of a process daemon.
+    """
+    disp = SharedDisplay(name, layout, parent_pid, commit_lock)
+    args = tuple(disp if isinstance(arg, DisplayPlaceholder) else arg for arg in args)
+    try:
+        func(*args)
+    finally:
+        disp.shared.close()
@@ -0,0 +1,268 @@
+"""
+Art-Net and sACN (E1.31) receiver, so lighting consoles can drive the board.
+
+Dots are mapped to DMX channels in row order, one channel per dot, from a
+start universe and channel, filling each universe up to channels_per_universe.
+A dot is lit when its channel is at least threshold. With the defaults the
+board takes 2187 channels: universes 1 to 5 (4 full ones and 139 channels).
+
+Frames are committed once every mapped universe has been received, when a
+universe repeats before that, or, if the console sends sync packets
+(ArtSync, or E1.31 data with a sync address), only on sync. If no data arrives
+for timeout seconds, the board is blanked.
+"""
+
+import select
+import socket
+import struct
+import time
+from threading import Thread
+
+import numpy as np
+
+ARTNET_PORT = 6454
+ARTNET_ID = b"Art-Net\0"
+OP_DMX = 0x5000
+OP_SYNC = 0x5200
+# An ArtSync keeps a node in synchronous mode for this long.
+ARTNET_SYNC_TIMEOUT = 4
+
+SACN_PORT = 5568
+ACN_ID = b"ASC-E1.17\0\0\0"
+VECTOR_ROOT_DATA = 0x00000004
+VECTOR_ROOT_EXTENDED = 0x00000008
+VECTOR_FRAMING_DATA = 0x00000002
+VECTOR_FRAMING_SYNC = 0x00000001
+OPTION_PREVIEW = 0x80
+OPTION_TERMINATED = 0x40
+# A console sends all its universes in one burst, so give the socket room for them.
+RECEIVE_BUFFER = 1 << 22
+# Offsets into E1.31 packets.
+SACN_ROOT_VECTOR = 18
+SACN_FRAMING_VECTOR = 40
+SACN_SYNC_ADDRESS = 109
+SACN_OPTIONS = 112
+SACN_UNIVERSE = 113
+SACN_PROPERTY_COUNT = 123
+SACN_START_CODE = 125
+SACN_DATA = 126
+SACN_SYNC_PACKET_ADDRESS = 45
+
+
+def sacn_group(universe):
+    return f"239.255.{universe >> 8}.{universe & 0xff}"
+
+
+class DmxReceiver:
+    """
+    Listens for Art-Net and/or sACN on a thread, and commits frames to disp.board.
+    """
+
+    def __init__(
+        self,
+        disp,
+        artnet=True,
+        sacn=False,
+        universe=1,
+        channel=1,
+        channels_per_universe=512,
+        threshold=128,
+        timeout=2.5,
+        bind="0.0.0.0",
+        artnet_port=ARTNET_PORT,
+        sacn_port=SACN_PORT,
+    ):
+        """
+        universe: First universe used. Art-Net universes are 15 bit port addresses.
+        channel: First channel used in it, counting from 1.
+        """
+        self.disp = disp
+        self.shape = disp.board.shape
+        self.threshold = threshold
+        self.timeout = timeout
+
+        # Channel -> dot table, as flat indices into self.dmx.
+        slots = channel - 1 + np.arange(self.shape[0] * self.shape[1])
+        universes = slots // channels_per_universe
+        self.first_universe = universe
+        self.universes = int(universes[-1]) + 1
+        self.table = universes * 512 + slots % channels_per_universe
+        self.dmx = np.zeros((self.universes, 512), dtype=np.uint8)
+        self.board = np.zeros(self.shape, dtype=bool)
+
+        self.pending = set()
+        self.artnet_sync_time = None
+        self.sacn_sync_address = 0
+        self.last_data = None
+
+        self.sockets = {}
+        if artnet:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((bind, artnet_port))
+            self.sockets[sock] = self.handle_artnet
+        if sacn:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((bind, sacn_port))
+            for u in range(universe, universe + self.universes):
+                membership = socket.inet_aton(sacn_group(u)) + socket.inet_aton("0.0.0.0")
+                try:
+                    sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+                except OSError as e:
+                    # No multicast route, or over the kernel's membership limit
+                    # (net.ipv4.igmp_max_memberships). Unicast still works.
+                    print(f"Warning: can't join sACN multicast group {sacn_group(u)} ({e})")
+                    break
+            self.sockets[sock] = self.handle_sacn
+        for sock in self.sockets:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+            sock.setblocking(False)
+
+        self.packets = 0
+        self.ignored = 0
+        self.frames = 0
+        self.syncs = 0
+        self.timeouts = 0
+        self.thread = None
+
+    def start(self):
+        self.thread = Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def loop(self):
+        sockets = list(self.sockets)
+        while self.disp.run:
+            ready = select.select(sockets, [], [], 0.1)[0]
+            for sock in ready:
+                while True:
+                    try:
+                        data = sock.recv(1024)
+                    except (BlockingIOError, InterruptedError):
+                        break
+                    self.packets += 1
+                    self.sockets[sock](data)
+
+            if self.last_data is not None and time.monotonic() - self.last_data > self.timeout:
+                self.stale()
+
+    def handle_artnet(self, data):
+        if len(data) < 10 or data[:8] != ARTNET_ID:
+            self.ignored += 1
+            return
+        opcode = struct.unpack_from("<H", data, 8)[0]
+        if opcode == OP_SYNC:
+            self.artnet_sync_time = time.monotonic()
+            self.sync()
+        elif opcode == OP_DMX and len(data) >= 18:
+            universe = struct.unpack_from("<H", data, 14)[0]
+            length = struct.unpack_from(">H", data, 16)[0]
+            synced = self.artnet_sync_time is not None and time.monotonic() - self.artnet_sync_time < ARTNET_SYNC_TIMEOUT
+            self.receive(universe, data, 18, min(length, len(data) - 18), synced)
+        else:
+            self.ignored += 1
+
+    def handle_sacn(self, data):
+        if len(data) < 49 or data[4:16] != ACN_ID:
+            self.ignored += 1
+            return
+        root_vector = struct.unpack_from(">I", data, SACN_ROOT_VECTOR)[0]
+        framing_vector = struct.unpack_from(">I", data, SACN_FRAMING_VECTOR)[0]
+        if root_vector == VECTOR_ROOT_EXTENDED and framing_vector == VECTOR_FRAMING_SYNC:
+            address = struct.unpack_from(">H", data, SACN_SYNC_PACKET_ADDRESS)[0]
+            if address == self.sacn_sync_address:
+                self.sync()
+        elif root_vector == VECTOR_ROOT_DATA and framing_vector == VECTOR_FRAMING_DATA and len(data) >= SACN_DATA:
+            options = data[SACN_OPTIONS]
+            if options & OPTION_PREVIEW or data[SACN_START_CODE] != 0:
+                self.ignored += 1
+                return
+            if options & OPTION_TERMINATED:
+                self.stale()
+                return
+            self.sacn_sync_address = struct.unpack_from(">H", data, SACN_SYNC_ADDRESS)[0]
+            universe = struct.unpack_from(">H", data, SACN_UNIVERSE)[0]
+            length = struct.unpack_from(">H", data, SACN_PROPERTY_COUNT)[0] - 1
+            self.receive(universe, data, SACN_DATA, min(length, len(data) - SACN_DATA), self.sacn_sync_address != 0)
+        else:
+            self.ignored += 1
+
+    def receive(self, universe, data, offset, length, synced):
+        """
+        Store a universe's channels, and commit when a frame is complete (unless synced).
+        """
+        index = universe - self.first_universe
+        if not 0 <= index < self.universes:
+            self.ignored += 1
+            return
+        self.last_data = time.monotonic()
+        if not synced and index in self.pending:
+            # The console started its next frame.
+            self.commit()
+        length = min(length, 512)
+        self.dmx[index, :length] = np.frombuffer(data, dtype=np.uint8, count=length, offset=offset)
+        self.pending.add(index)
+        if not synced and len(self.pending) == self.universes:
+            self.commit()
+
+    def sync(self):
+        self.syncs += 1
+        if self.pending:
+            self.commit()
+
+    def commit(self):
+        np.greater_equal(self.dmx.ravel()[self.table].reshape(self.shape), self.threshold, out=self.board)
+        self.disp.board = self.board
+        self.pending.clear()
+        self.frames += 1
+
+    def stale(self):
+        """
+        The source stopped: blank the board.
+        """
+        self.timeouts += 1
+        self.last_data = None
+        self.pending.clear()
+        self.artnet_sync_time = None
+        self.sacn_sync_address = 0
+        self.dmx[:] = 0
+        self.commit()
+
+    def print_stats(self):
+        print(
+            f"DMX: {self.packets} packets, {self.ignored} ignored, {self.frames} frames, "
+            f"{self.syncs} syncs, {self.timeouts} timeouts."
+        )
+
+    def close(self):
+        for sock in self.sockets:
+            sock.close()
+
+
+def artdmx_packet(universe, channels, sequence=0):
+    """
+    ArtDmx packet, for testing.
+    """
+    channels = bytes(channels)
+    return ARTNET_ID + struct.pack("<HBBBBH", OP_DMX, 0, 14, sequence, 0, universe)[:8] \
+        + struct.pack(">H", len(channels)) + channels
+
+
+def artsync_packet():
+    return ARTNET_ID + struct.pack("<H", OP_SYNC) + bytes([0, 14, 0, 0])
+
+
+def e131_packet(universe, channels, sequence=0, sync_address=0, cid=bytes(16), name=b"apt33"):
+    """
+    E1.31 data packet, for testing.
+    """
+    channels = bytes([0]) + bytes(channels)
+    dmp = struct.pack(">HBBHHH", 0x7000 | (10 + len(channels)), 0x02, 0xa1, 0, 1, len(channels)) + channels
+    framing = struct.pack(">HI64sBHBBH", 0x7000 | (77 + len(dmp)), VECTOR_FRAMING_DATA, name, 100, sync_address, sequence, 0, universe) + dmp
+    root = struct.pack(">HH12sHI16s", 0x0010, 0, ACN_ID, 0x7000 | (22 + len(framing)), VECTOR_ROOT_DATA, cid) + framing
+    return root
+
+
+def e131_sync_packet(sync_address, sequence=0, cid=bytes(16)):
+    framing = struct.pack(">HIBHH", 0x7000 | 11, VECTOR_FRAMING_SYNC, sequence, sync_address, 0)
+    return struct.pack(">HH12sHI16s", 0x0010, 0, ACN_ID, 0x7000 | (22 + len(framing)), VECTOR_ROOT_EXTENDED, cid) + framing
@@ -0,0 +1,261 @@
+"""
+Frame pacing, per stage profiling and frame sinks, shared by display.py and
+the escape room's display.
+"""
+
+import json
+import math
+import os
+import time
+from collections import deque
+from threading import local
+
+import cv2
+import numpy as np
+
+
+class FrameScheduler:
+    """
+    Paces frames to absolute deadlines on a monotonic clock, so the frame rate
+    doesn't drift with how long each frame took. Also keeps rolling frame time
+    statistics.
+
+    Usage per frame: wait(), begin(), draw and flip, end().
+    """
+
+    def __init__(self, fps=60, vsync=False, skip=True, history=1000):
+        """
+        vsync: Flip already blocks until vertical blank, so don't sleep.
+        skip: When behind, drop the missed frames instead of rendering them back to back.
+        history: Number of recent frames kept for statistics.
+        """
+        self.period = 1 / fps
+        self.vsync = vsync
+        self.skip = skip
+        self.deadline = time.monotonic()
+        self.frame_start = None
+        self.frame_times = deque(maxlen=history)
+        self.frames = 0
+        self.missed = 0
+
+    def wait(self):
+        """
+        Sleep until the next frame's deadline.
+        """
+        remaining = self.deadline - time.monotonic()
+        if remaining > 0 and not self.vsync:
+            time.sleep(remaining)
+
+    def idle(self):
+        """
+        Call when no frame was drawn, so time spent idle isn't counted as missed frames.
+        """
+        self.deadline = max(self.deadline, time.monotonic())
+
+    def begin(self):
+        self.frame_start = time.monotonic()
+
+    def end(self):
+        now = time.monotonic()
+        self.frame_times.append(now - self.frame_start)
+        self.frames += 1
+
+        self.deadline += self.period
+        if now > self.deadline:
+            behind = math.ceil((now - self.deadline) / self.period)
+            self.missed += behind
+            if self.skip:
+                self.deadline += behind * self.period
+
+    def stats(self):
+        """
+        Frame time statistics (in seconds) over recent frames.
+        """
+        times = np.array(self.frame_times)
+        if len(times) == 0:
+            times = np.zeros(1)
+        return {
+            "frames": self.frames,
+            "missed": self.missed,
+            "target": self.period,
+            "mean": float(times.mean()),
+            "p95": float(np.percentile(times, 95)),
+            "p99": float(np.percentile(times, 99)),
+            "max": float(times.max()),
+        }
+
+    def print_stats(self):
+        stats = self.stats()
+        print(
+            f"Frames: {stats['frames']}, missed deadlines: {stats['missed']}. "
+            f"Frame time mean {stats['mean'] * 1e3:.2f} ms, p95 {stats['p95'] * 1e3:.2f} ms, "
+            f"p99 {stats['p99'] * 1e3:.2f} ms, max {stats['max'] * 1e3:.2f} ms "
+            f"(budget {stats['target'] * 1e3:.2f} ms)."
+        )
+
+
+class Profiler:
+    """
+    Times stages of each frame with perf_counter_ns, as laps: mark(stage)
+    records the time since the previous mark (or reset()) on the same thread.
+    Keeps recent samples and a histogram with power of two buckets per stage.
+    Does nothing unless enabled.
+    """
+
+    def __init__(self, enabled=False, history=1000):
+        self.enabled = enabled
+        self.history = history
+        self.samples = {}
+        self.buckets = {}
+        self.counts = {}
+        self.totals = {}
+        self.local = local()
+
+    def reset(self):
+        if self.enabled:
+            self.local.last = time.perf_counter_ns()
+
+    def mark(self, stage):
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        last = getattr(self.local, "last", now)
+        self.local.last = now
+        self.record(stage, now - last)
+
+    def record(self, stage, ns):
+        if stage not in self.samples:
+            self.samples[stage] = deque(maxlen=self.history)
+            self.buckets[stage] = [0] * 64
+            self.counts[stage] = 0
+            self.totals[stage] = 0
+        self.samples[stage].append(ns)
+        self.buckets[stage][min(ns.bit_length(), 63)] += 1
+        self.counts[stage] += 1
+        self.totals[stage] += ns
+
+    def summary(self):
+        """
+        Per stage statistics, times in microseconds. Percentiles are over recent samples.
+        Histogram keys are bucket upper bounds in microseconds.
+        """
+        summary = {}
+        for stage in list(self.samples):
+            recent = np.array(self.samples[stage]) / 1e3
+            summary[stage] = {
+                "count": self.counts[stage],
+                "mean": self.totals[stage] / self.counts[stage] / 1e3,
+                "p50": float(np.percentile(recent, 50)),
+                "p95": float(np.percentile(recent, 95)),
+                "p99": float(np.percentile(recent, 99)),
+                "max": float(recent.max()),
+                "histogram": {
+                    f"{2**i / 1e3:g}": count for i, count in enumerate(self.buckets[stage]) if count > 0
+                },
+            }
+        return summary
+
+    def lines(self):
+        """
+        One short line per stage, for printing or an overlay.
+        """
+        return [
+            f"{stage:8s} {stats['p50'] / 1e3:6.2f} ms  p95 {stats['p95'] / 1e3:6.2f}  p99 {stats['p99'] / 1e3:6.2f}"
+            for stage, stats in self.summary().items()
+        ]
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=4)
+
+
+class RingSink:
+    """
+    Frame sink keeping the most recent frames and their timestamps in memory.
+    Frames are copied into a preallocated buffer, so nothing is allocated per frame.
+
+    Any callable taking (frame, timestamp) can be used as a sink. frame is
+    indexed (y, x), BGR or single channel (before tint), and only valid during the call.
+    """
+
+    def __init__(self, size=16):
+        self.size = size
+        self.frames = None
+        self.times = np.zeros(size)
+        self.count = 0
+
+    def __call__(self, frame, timestamp):
+        if self.frames is None or self.frames.shape[1:] != frame.shape:
+            self.frames = np.empty((self.size, *frame.shape), dtype=frame.dtype)
+            self.count = 0
+        i = self.count % self.size
+        self.frames[i] = frame
+        self.times[i] = timestamp
+        self.count += 1
+
+    def latest(self, n=None):
+        """
+        Returns (frames, timestamps) of the last n kept frames, oldest first.
+        """
+        if self.frames is None:
+            return np.zeros((0,)), self.times[:0]
+        kept = min(self.count, self.size)
+        n = kept if n is None else min(n, kept)
+        order = np.arange(self.count - n, self.count) % self.size
+        return self.frames[order], self.times[order]
+
+
+class NpySink:
+    """
+    Frame sink writing each frame to DIR/NNNNNN.npy, and timestamps to DIR/times.txt.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.count = 0
+        self.times = open(os.path.join(directory, "times.txt"), "w")
+
+    def __call__(self, frame, timestamp):
+        np.save(os.path.join(self.directory, f"{self.count:06d}.npy"), frame)
+        self.times.write(f"{timestamp:.6f}\n")
+        self.count += 1
+
+    def close(self):
+        self.times.close()
+
+
+class VideoSink:
+    """
+    Frame sink encoding a constant frame rate video with OpenCV. Frames are
+    placed by timestamp, and repeated until the next one arrives.
+    """
+
+    def __init__(self, path, fps=30, fourcc="mp4v"):
+        self.path = path
+        self.fps = fps
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self.writer = None
+        self.last = None
+        self.start = None
+        self.written = 0
+
+    def __call__(self, frame, timestamp):
+        if self.writer is None:
+            height, width = frame.shape[:2]
+            self.writer = cv2.VideoWriter(self.path, self.fourcc, self.fps, (width, height))
+            self.last = np.zeros((height, width, 3), dtype=np.uint8)
+            self.start = timestamp
+        index = round((timestamp - self.start) * self.fps)
+        while self.written < index:
+            self.writer.write(self.last)
+            self.written += 1
+        if frame.ndim == 2:
+            cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR, dst=self.last)
+        else:
+            np.copyto(self.last, frame)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.write(self.last)
+            self.writer.release()
@@ -3,33 +3,28 @@ Testing script: Random black and white pixels
 """
 
 import argparse
-import time
 
 import numpy as np
 
 from display import Display
 
+# Daemons only use what process daemons get, so --processes works (see Display.add_daemon).
+PROCESS_SAFE = True
+
 
 def game_step(board):
     """
     board: Modifies in place.
     """
-    old_board = board.copy()
-    for y in range(board.shape[0]):
-        for x in range(board.shape[1]):
-            neighbors = 0
-            for dx in [-1, 0, 1]:
-                for dy in [-1, 0, 1]:
-                    if dx == 0 and dy == 0:
-                        continue
-                    if 0 <= x + dx < board.shape[1] and 0 <= y + dy < board.shape[0]:
-                        neighbors += old_board[y + dy, x + dx]
-            if old_board[y, x] == 1:
-                if neighbors < 2 or neighbors > 3:
-                    board[y, x] = 0
-            else:
-                if neighbors == 3:
-                    board[y, x] = 1
+    # Count neighbors by summing shifted copies, with dead cells around the edge.
+    padded = np.pad(board, 1).astype(np.uint8)
+    neighbors = sum(
+        padded[1 + dy : padded.shape[0] - 1 + dy, 1 + dx : padded.shape[1] - 1 + dx]
+        for dy in (-1, 0, 1)
+        for dx in (-1, 0, 1)
+        if dx != 0 or dy != 0
+    )
+    board[:] = (neighbors == 3) | (board & (neighbors == 2))
 
 
 def game_daemon(disp: Display):
@@ -39,13 +34,18 @@ def game_daemon(disp: Display):
             iters = 0
             disp.board[:] = np.random.randint(0, 2, size=(disp.board.shape[0], disp.board.shape[1])) == 0
         game_step(disp.board)
+        disp.commit()
         iters += 1
-        time.sleep(0.1)
+        disp.sleep(0.1)
+
+
+def setup(disp: Display, args):
+    disp.add_daemon(game_daemon, (disp,))
 
 
 def main():
     disp = Display()
-    disp.add_daemon(game_daemon, (disp,))
+    setup(disp, disp.parser.parse_args())
     disp.start()
 
 
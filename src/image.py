@@ -2,18 +2,22 @@
 Display image or video on the board.
 """
 
-import time
+import os
 
 import cv2
 import numpy as np
 
-from display import Display
+from display import Display, load_asset
+from layout import COLS, ROWS
+
+# Daemons only use what process daemons get, so --processes works (see Display.add_daemon).
+PROCESS_SAFE = True
 
 IMG_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".tiff")
 VID_EXTS = (".mp4", ".avi", ".mov")
 
 
-def display_image(disp: Display, img: np.ndarray, thres=0.5, keep_aspect=True, highpass=False):
+def image_to_board(img: np.ndarray, shape=(ROWS, COLS), thres=0.5, keep_aspect=True, highpass=False):
     """
     img: Shape (H, W, C). Channels are averaged and values normalized to (0, 1).
     keep_aspect: If True, pads zeros to keep original image aspect.
@@ -21,7 +25,7 @@ def display_image(disp: Display, img: np.ndarray, thres=0.5, keep_aspect=True, h
     """
     if keep_aspect:
         aspect = img.shape[1] / img.shape[0]
-        target_aspect = disp.board.shape[1] / disp.board.shape[0]
+        target_aspect = shape[1] / shape[0]
         if aspect > target_aspect:
             new_img = np.zeros((int(img.shape[1] / target_aspect), img.shape[1], img.shape[2]))
         else:
@@ -29,7 +33,7 @@ def display_image(disp: Display, img: np.ndarray, thres=0.5, keep_aspect=True, h
         new_img[: img.shape[0], : img.shape[1]] = img
         img = new_img
 
-    img = cv2.resize(img, (disp.board.shape[1], disp.board.shape[0]))
+    img = cv2.resize(img, (shape[1], shape[0]))
     if highpass:
         kernel = np.array([
             [-1, -1, -1],
@@ -40,32 +44,68 @@ def display_image(disp: Display, img: np.ndarray, thres=0.5, keep_aspect=True, h
 
     img = img.mean(axis=2)
     img = np.interp(img, (img.min(), img.max()), (0, 1))
-    img = img > thres
-    disp.board[:] = img
+    return img > thres
+
+
+def display_image(disp: Display, img: np.ndarray, thres=0.5, keep_aspect=True, highpass=False):
+    disp.board[:] = image_to_board(img, disp.board.shape, thres, keep_aspect, highpass)
+    disp.commit()
+
+
+def decode_video(path, shape=(ROWS, COLS)):
+    """
+    Decode a whole video to boards, which are tiny, so playing it costs nothing.
+    Returns (boards, fps).
+    """
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    boards = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        boards.append(image_to_board(frame, shape))
+    return np.array(boards, dtype=bool).reshape(-1, *shape), fps
 
 
 def disp_daemon(disp: Display, args):
     if args.file.endswith(IMG_EXTS):
-        img = cv2.imread(args.file)
+        img = preload(args)
         display_image(disp, img)
 
     elif args.file.endswith(VID_EXTS):
-        cap = cv2.VideoCapture(args.file)
-        interval = 1 / cap.get(cv2.CAP_PROP_FPS)
-        while disp.run:
-            ret, frame = cap.read()
-            if not ret:
+        boards, fps = preload(args)
+        for board in boards:
+            if not disp.run:
                 break
-            display_image(disp, frame)
-            time.sleep(interval)
+            # Decoded ahead of time for the standard board.
+            disp.board[:] = disp.layout.resize(board)
+            disp.commit()
+            disp.sleep(1 / fps)
 
 
-def main():
-    disp = Display()
-    disp.parser.add_argument("file", type=str)
-    args = disp.parser.parse_args()
+def add_args(parser):
+    parser.add_argument("file", type=str)
 
+
+def preload(args):
+    """
+    Decode images and videos ahead of time.
+    """
+    if args.file.endswith(IMG_EXTS):
+        return load_asset(("image", os.path.abspath(args.file)), cv2.imread, args.file)
+    elif args.file.endswith(VID_EXTS):
+        return load_asset(("video", os.path.abspath(args.file)), decode_video, args.file)
+
+
+def setup(disp: Display, args):
     disp.add_daemon(disp_daemon, (disp, args))
+
+
+def main():
+    disp = Display()
+    add_args(disp.parser)
+    setup(disp, disp.parser.parse_args())
     disp.start()
 
 
@@ -0,0 +1,211 @@
+"""
+Receive boards from other processes, over UDP or a UNIX datagram socket.
+
+Each datagram is one frame:
+    uint64 session (little endian), picked by the sender when it starts,
+        e.g. its start time in ns.
+    uint64 sequence number, incremented by the sender per frame.
+    uint64 send time, sender's time.monotonic_ns(). Only used for latency stats
+        on one machine, may be 0.
+    The board, np.packbits of the bool array in row order: 274 bytes for 27x81.
+
+Frames older than the newest one applied are dropped, and when several
+frames are waiting only the newest is applied. A new session (a restarted
+sender) starts the sequence over.
+
+Run this file to send frames to a display, e.g.
+python ingest.py --udp 127.0.0.1:9000 --fps 60
+"""
+
+import argparse
+import os
+import select
+import socket
+import stat
+import struct
+import time
+from collections import deque
+from threading import Thread
+
+import numpy as np
+
+from layout import COLS, ROWS, BoardLayout, parse_grid
+from recording import pack
+
+HEADER = struct.Struct("<QQQ")
+
+
+def parse_address(text):
+    host, port = text.rsplit(":", 1)
+    return host, int(port)
+
+
+class FrameReceiver:
+    """
+    Listens on a UDP port and/or a UNIX datagram socket on a thread, and
+    commits received frames to disp.board.
+    """
+
+    def __init__(self, disp, udp=None, unix=None, history=1000):
+        """
+        udp: (host, port) to listen on.
+        unix: Path of the UNIX socket to create.
+        """
+        self.disp = disp
+        self.shape = disp.board.shape
+        self.frame_size = HEADER.size + (self.shape[0] * self.shape[1] + 7) // 8
+        self.board = np.zeros(self.shape, dtype=bool)
+        self.sockets = []
+        self.unix = unix
+        if udp is not None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(udp)
+            self.sockets.append(sock)
+        if unix is not None:
+            if os.path.exists(unix):
+                # Left over from an earlier run, but never remove anything else.
+                if not stat.S_ISSOCK(os.stat(unix).st_mode):
+                    raise FileExistsError(f"{unix} exists and is not a socket")
+                os.unlink(unix)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.bind(unix)
+            self.sockets.append(sock)
+        for sock in self.sockets:
+            sock.setblocking(False)
+
+        self.session = None
+        self.sequence = None
+        self.received = 0
+        self.applied = 0
+        self.dropped = 0
+        self.invalid = 0
+        # Send to apply latency in seconds, for senders on this machine.
+        self.latencies = deque(maxlen=history)
+        self.thread = None
+
+    def start(self):
+        self.thread = Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def loop(self):
+        while self.disp.run:
+            ready = select.select(self.sockets, [], [], 0.1)[0]
+            newest = None
+            for sock in ready:
+                # Drain everything waiting, keeping only the newest frame.
+                while True:
+                    try:
+                        # One byte spare, so oversized frames show up as invalid.
+                        data = sock.recv(self.frame_size + 1)
+                    except (BlockingIOError, InterruptedError):
+                        break
+                    if self.accept(data):
+                        newest = data
+            if newest is not None:
+                self.apply(newest)
+
+    def accept(self, data):
+        """
+        Whether data is a valid frame newer than any seen so far.
+        """
+        self.received += 1
+        if len(data) != self.frame_size:
+            self.invalid += 1
+            return False
+        session, sequence = HEADER.unpack_from(data)[:2]
+        if session != self.session:
+            self.session = session
+            self.sequence = None
+        if self.sequence is not None and sequence <= self.sequence:
+            self.dropped += 1
+            return False
+        self.sequence = sequence
+        return True
+
+    def apply(self, data):
+        sent = HEADER.unpack_from(data)[2]
+        packed = np.frombuffer(data, dtype=np.uint8, offset=HEADER.size)
+        bits = np.unpackbits(packed, count=self.board.size).reshape(self.shape)
+        np.copyto(self.board, bits, casting="unsafe")
+        self.disp.board = self.board
+        self.applied += 1
+        if sent:
+            self.latencies.append((time.monotonic_ns() - sent) / 1e9)
+
+    def stats(self):
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            "received": self.received,
+            "applied": self.applied,
+            "dropped": self.dropped,
+            "invalid": self.invalid,
+            "latency_p50": float(np.percentile(latencies, 50)),
+            "latency_p99": float(np.percentile(latencies, 99)),
+        }
+
+    def print_stats(self):
+        stats = self.stats()
+        print(
+            f"Ingest: {stats['received']} received, {stats['applied']} applied, "
+            f"{stats['dropped']} late, {stats['invalid']} invalid. Latency p50 "
+            f"{stats['latency_p50'] * 1e3:.2f} ms, p99 {stats['latency_p99'] * 1e3:.2f} ms."
+        )
+
+    def close(self):
+        for sock in self.sockets:
+            sock.close()
+        if self.unix is not None and os.path.exists(self.unix) and stat.S_ISSOCK(os.stat(self.unix).st_mode):
+            os.unlink(self.unix)
+
+
+class FrameSender:
+    """
+    Reference sender.
+    """
+
+    def __init__(self, udp=None, unix=None):
+        if udp is not None:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.address = udp
+        else:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self.address = unix
+        self.session = time.time_ns()
+        self.sequence = 0
+
+    def send(self, board):
+        self.sequence += 1
+        data = HEADER.pack(self.session, self.sequence, time.monotonic_ns()) + pack(board).tobytes()
+        try:
+            self.sock.sendto(data, self.address)
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Nobody listening (yet). Frames are fire and forget.
+            pass
+
+    def close(self):
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--udp", type=parse_address, help="Display's address, as HOST:PORT.")
+    parser.add_argument("--unix", help="Display's UNIX socket path.")
+    parser.add_argument("--fps", type=float, default=60)
+    parser.add_argument("--board", type=parse_grid, default=(COLS, ROWS), metavar="COLSxROWS", help="Display's board size.")
+    args = parser.parse_args()
+    if args.udp is None and args.unix is None:
+        parser.error("Give --udp or --unix")
+
+    # Scrolling diagonal stripes.
+    sender = FrameSender(args.udp, args.unix)
+    y, x = BoardLayout(args.board[1], args.board[0]).grid
+    i = 0
+    while True:
+        sender.send((x + y + i) % 8 < 2)
+        i += 1
+        time.sleep(1 / args.fps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Several programs at once, as compositor layers.
+"""
+
+import argparse
+
+import numpy as np
+
+from clock import clock_daemon
+from display import Display, load_npy
+from game_of_life import game_daemon
+from screensaver import matrix
+
+
+def matrix_daemon(disp: Display):
+    while disp.run:
+        matrix(disp, np.zeros_like(disp.board))
+
+
+def add_args(parser):
+    parser.add_argument("--matrix", action="store_true", help="Matrix masked by the Ultimate logo, instead of the clock over game of life.")
+
+
+def setup(disp: Display, args):
+    if args.matrix:
+        disp.add_daemon(matrix_daemon, (disp.add_layer(),))
+        disp.add_layer("mask").board = disp.layout.resize(load_npy("ultimate.npy"))
+    else:
+        disp.add_daemon(game_daemon, (disp.add_layer(),))
+        disp.add_daemon(clock_daemon, (disp.add_layer("xor"),))
+
+
+def main():
+    disp = Display()
+    add_args(disp.parser)
+    setup(disp, disp.parser.parse_args())
+    disp.start()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Board layout: how many dots the board has, and where they are.
+
+The board is rows x cols dots, indexed board[y, x]. Dots are packed
+hexagonally: columns are pitch * sqrt(3) / 2 apart, and the even columns
+(counting from 0) are shifted down by stagger rows. Coordinate tables are
+computed once per layout, so code using them doesn't loop over dots.
+"""
+
+import argparse
+from functools import cached_property, lru_cache
+
+import cv2
+import numpy as np
+
+# The board this was built for.
+ROWS = 27
+COLS = 81
+
+
+class BoardLayout:
+    def __init__(self, rows=ROWS, cols=COLS, stagger=0.5, pitch=9):
+        """
+        stagger: Rows the even columns are shifted down by.
+        pitch: Pixels between dots of a column, in the unwarped image.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.stagger = stagger
+        self.pitch = pitch
+        self.x_pitch = pitch * 3**0.5 / 2
+        self.shape = (rows, cols)
+        self.size = rows * cols
+        # (x, y) of the middle dot.
+        self.centre = (cols // 2, rows // 2)
+        # Dots per step for animations that step one dot at a time, so they
+        # take as long on a larger board as on the 27x81 one.
+        self.step = max(1, round(self.size / (ROWS * COLS)))
+
+    def __repr__(self):
+        return f"BoardLayout(rows={self.rows}, cols={self.cols}, stagger={self.stagger}, pitch={self.pitch})"
+
+    def key(self):
+        return (self.rows, self.cols, float(self.stagger), float(self.pitch))
+
+    def __eq__(self, other):
+        return isinstance(other, BoardLayout) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def zeros(self):
+        return np.zeros(self.shape, dtype=bool)
+
+    @cached_property
+    def grid(self):
+        """
+        (y, x) index of each dot, both shape (rows, cols).
+        """
+        y, x = np.mgrid[: self.rows, : self.cols]
+        y.flags.writeable = False
+        x.flags.writeable = False
+        return y, x
+
+    @cached_property
+    def offsets(self):
+        """
+        Stagger of each column, in rows.
+        """
+        offsets = np.where(np.arange(self.cols) % 2 == 0, float(self.stagger), 0.0)
+        offsets.flags.writeable = False
+        return offsets
+
+    @cached_property
+    def positions(self):
+        """
+        (y, x) of each dot in grid units, including the stagger, both shape (rows, cols).
+        """
+        y, x = self.grid
+        y = y + self.offsets
+        y.flags.writeable = False
+        return y, x
+
+    @cached_property
+    def distance(self):
+        """
+        Distance of each dot from the middle one, in dots, shape (rows, cols).
+        """
+        y, x = self.grid
+        distance = np.hypot(x - self.centre[0], y - self.centre[1])
+        distance.flags.writeable = False
+        return distance
+
+    @cached_property
+    def angle(self):
+        """
+        Angle of each dot around the middle one, atan2 in [-pi, pi], shape (rows, cols).
+        """
+        y, x = self.grid
+        angle = np.arctan2(y - self.centre[1], x - self.centre[0])
+        angle.flags.writeable = False
+        return angle
+
+    def extent(self):
+        """
+        (width, height) of the board in pixels of the unwarped image.
+        """
+        return self.cols * self.x_pitch, self.rows * self.pitch
+
+    def span(self):
+        """
+        (width, height) from the first dot's centre to the last one's, before stagger.
+        """
+        return (self.cols - 1) * self.x_pitch, (self.rows - 1) * self.pitch
+
+    def pixels(self, origin=(0, 0)):
+        """
+        (x, y) of each dot's centre in the unwarped image, with dot (0, 0)
+        before stagger at origin. Shape (cols * rows, 2), x major: the order
+        dots are drawn in, board.T.flat. Stagger is rounded down to whole pixels.
+        """
+        grid_x, grid_y = np.meshgrid(np.arange(self.cols), np.arange(self.rows), indexing="ij")
+        px_x = grid_x * self.x_pitch + origin[0]
+        px_y = grid_y * self.pitch + origin[1]
+        px_y += (self.offsets * self.pitch // 1)[:, None]
+        return np.stack((px_x, px_y), axis=-1).reshape(-1, 2)
+
+    def fit(self, width, height):
+        """
+        This layout, with the pitch reduced if needed so the board fits in width x height pixels.
+        """
+        board_width, board_height = self.extent()
+        factor = min(width / board_width, height / board_height)
+        if factor >= 1:
+            return self
+        return BoardLayout(self.rows, self.cols, self.stagger, self.pitch * factor)
+
+    def tiled(self, cols, rows):
+        """
+        Layout of a grid of cols x rows of these boards, as one logical board.
+        """
+        return BoardLayout(self.rows * rows, self.cols * cols, self.stagger, self.pitch)
+
+    def resize(self, board):
+        """
+        board (e.g. a pattern made for another size) resized to this layout, nearest neighbour.
+        """
+        if board.shape == self.shape:
+            return board
+        resized = cv2.resize(board.astype(np.uint8), (self.cols, self.rows), interpolation=cv2.INTER_NEAREST)
+        return resized.astype(bool)
+
+
+def parse_grid(text):
+    """
+    "COLSxROWS" to (cols, rows).
+    """
+    try:
+        cols, rows = (int(n) for n in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected COLSxROWS, got {text}")
+    if cols < 1 or rows < 1:
+        raise argparse.ArgumentTypeError(f"Expected at least 1x1, got {text}")
+    return cols, rows
+
+
+@lru_cache(maxsize=None)
+def for_shape(shape):
+    """
+    Shared default layout for boards of this shape, for code that only has the board.
+    """
+    return BoardLayout(*shape)
@@ -3,7 +3,6 @@ Interactively make pixel art.
 """
 
 import os
-import time
 
 import numpy as np
 import pygame
@@ -11,12 +10,17 @@ import pygame
 from display import Display
 
 cursor = [0, 0]
-if os.path.isfile("board.npy"):
-    board = np.load("board.npy")
-    assert board.shape == (27, 81)
-    assert board.dtype == bool
-else:
-    board = np.zeros((27, 81), dtype=bool)
+board = None
+
+
+def load_board(disp: Display):
+    global board
+    if os.path.isfile("board.npy"):
+        board = np.load("board.npy")
+        assert board.shape == disp.layout.shape
+        assert board.dtype == bool
+    else:
+        board = disp.layout.zeros()
 
 
 def key_handler(disp: Display, key):
@@ -39,14 +43,16 @@ def key_handler(disp: Display, key):
 def draw_daemon(disp: Display):
     i = 0
     while disp.run:
-        time.sleep(0.2)
+        disp.sleep(0.2)
         disp.board[:] = board
         disp.board[cursor[1], cursor[0]] = i % 2
+        disp.commit()
         i += 1
 
 
 def main():
     disp = Display()
+    load_board(disp)
     disp.keydown_hooks.append(key_handler)
     disp.add_daemon(draw_daemon, (disp,))
     disp.start()
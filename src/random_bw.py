@@ -4,22 +4,29 @@ Also template for other scripts.
 """
 
 import argparse
-import time
 
 import numpy as np
 
 from display import Display
 
+# Daemons only use what process daemons get, so --processes works (see Display.add_daemon).
+PROCESS_SAFE = True
+
 
 def random_bw(disp: Display):
     while disp.run:
-        time.sleep(1)
+        disp.sleep(1)
         disp.board[:] = np.random.randint(0, 2, size=disp.board.shape, dtype=bool)
+        disp.commit()
+
+
+def setup(disp: Display, args):
+    disp.add_daemon(random_bw, (disp,))
 
 
 def main():
     disp = Display()
-    disp.add_daemon(random_bw, (disp,))
+    setup(disp, disp.parser.parse_args())
     disp.start()
 
 
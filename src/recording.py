@@ -0,0 +1,157 @@
+"""
+Compact board recordings.
+
+Boards are bit packed (27x81 -> 274 bytes). Frames are stored as XOR deltas
+against the previous frame, keeping only the bytes that changed, with a full
+keyframe every keyframe_interval frames (or when a delta wouldn't be smaller).
+
+File layout:
+    Header: magic, rows, cols, keyframe interval.
+    Frame data, back to back.
+    Index: one INDEX_DTYPE entry per frame.
+    Trailer: index offset, frame count, magic.
+
+The whole file can be memory mapped. Any frame is found in O(1) through the
+index, and decoded from its keyframe with at most keyframe_interval deltas.
+"""
+
+import struct
+
+import numpy as np
+
+from layout import COLS, ROWS
+
+MAGIC = b"APTREC1\0"
+INDEX_MAGIC = b"APTIDX1\0"
+HEADER = struct.Struct("<8sHHI")
+TRAILER = struct.Struct("<QQ8s")
+INDEX_DTYPE = np.dtype([
+    ("time", "<f8"),
+    ("offset", "<u8"),
+    ("length", "<u4"),
+    # Frame number of the keyframe this frame is decoded from. Equal to its own for keyframes.
+    ("keyframe", "<u4"),
+])
+
+
+def pack(board):
+    return np.packbits(board, axis=None)
+
+
+def unpack(packed, shape, out=None):
+    bits = np.unpackbits(packed, count=shape[0] * shape[1]).reshape(shape)
+    if out is None:
+        return bits.astype(bool)
+    np.copyto(out, bits, casting="unsafe")
+    return out
+
+
+class Recorder:
+    """
+    Writes boards to a recording. Call with (board, timestamp) for each frame;
+    frames identical to the previous one are skipped.
+    """
+
+    def __init__(self, path, shape=(ROWS, COLS), keyframe_interval=100):
+        self.shape = shape
+        self.keyframe_interval = keyframe_interval
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, shape[0], shape[1], keyframe_interval))
+        self.offset = HEADER.size
+        self.index = []
+        self.prev = None
+        self.keyframe = 0
+
+    def __call__(self, board, timestamp):
+        packed = pack(board)
+        count = len(self.index)
+        if self.prev is not None:
+            changed = np.flatnonzero(packed != self.prev)
+            if len(changed) == 0:
+                return
+
+        # Delta: little endian uint16 byte positions, then the XORed bytes.
+        if self.prev is None or count - self.keyframe >= self.keyframe_interval or 3 * len(changed) >= len(packed):
+            data = packed.tobytes()
+            self.keyframe = count
+        else:
+            data = changed.astype("<u2").tobytes() + (packed[changed] ^ self.prev[changed]).tobytes()
+
+        self.file.write(data)
+        self.index.append((timestamp, self.offset, len(data), self.keyframe))
+        self.offset += len(data)
+        self.prev = packed
+
+    def close(self):
+        index = np.array(self.index, dtype=INDEX_DTYPE)
+        self.file.write(index.tobytes())
+        self.file.write(TRAILER.pack(self.offset, len(index), INDEX_MAGIC))
+        self.file.close()
+
+
+class Recording:
+    """
+    Memory mapped recording, for reading.
+    """
+
+    def __init__(self, path):
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, rows, cols, self.keyframe_interval = HEADER.unpack(self.data[:HEADER.size].tobytes())
+        index_offset, count, index_magic = TRAILER.unpack(self.data[-TRAILER.size:].tobytes())
+        if magic != MAGIC or index_magic != INDEX_MAGIC:
+            raise ValueError(f"{path} is not a complete recording")
+        self.shape = (rows, cols)
+        self.packed_size = (rows * cols + 7) // 8
+        self.index = np.frombuffer(self.data, dtype=INDEX_DTYPE, count=count, offset=index_offset)
+        self.times = self.index["time"]
+
+    def __len__(self):
+        return len(self.index)
+
+    def duration(self):
+        return float(self.times[-1] - self.times[0]) if len(self) > 0 else 0.0
+
+    def apply(self, packed, i):
+        """
+        Decode frame i on top of packed, which holds frame i - 1 (unless i is a keyframe).
+        """
+        entry = self.index[i]
+        data = self.data[entry["offset"]:entry["offset"] + entry["length"]]
+        if entry["keyframe"] == i:
+            packed[:] = data
+        else:
+            n = len(data) // 3
+            positions = data[:2 * n].view("<u2")
+            packed[positions] ^= data[2 * n:]
+
+    def packed(self, i):
+        """
+        Packed frame i, decoded from its keyframe.
+        """
+        packed = np.empty(self.packed_size, dtype=np.uint8)
+        for j in range(self.index[i]["keyframe"], i + 1):
+            self.apply(packed, j)
+        return packed
+
+    def board(self, i):
+        return unpack(self.packed(i), self.shape)
+
+    def find(self, t):
+        """
+        Number of the frame showing at time t since the start.
+        """
+        i = np.searchsorted(self.times, self.times[0] + t, side="right") - 1
+        return max(int(i), 0)
+
+    def frames(self, start=0):
+        """
+        Yield (time since the start, board) from frame start on, decoding incrementally.
+        The board is reused between frames.
+        """
+        packed = self.packed(start)
+        board = unpack(packed, self.shape)
+        for i in range(start, len(self)):
+            if i > start:
+                self.apply(packed, i)
+                unpack(packed, self.shape, out=board)
+            yield float(self.times[i] - self.times[0]), board
@@ -0,0 +1,66 @@
+"""
+Replay a recording made with --record.
+"""
+
+import argparse
+import os
+
+from display import Display, load_asset
+from recording import Recording
+
+# Daemons only use what process daemons get, so --processes works (see Display.add_daemon).
+PROCESS_SAFE = True
+
+
+def replay_daemon(disp: Display, recording: Recording, speed=1, start=0, loop=False):
+    """
+    Show each frame at its recorded time (divided by speed), starting start seconds in.
+    """
+    while disp.run:
+        first = recording.find(start)
+        offset = float(recording.times[first] - recording.times[0])
+        begin = disp.time()
+        for t, board in recording.frames(first):
+            disp.sleep((t - offset) / speed - (disp.time() - begin))
+            if not disp.run:
+                return
+            with disp.frame() as frame:
+                frame[:] = board
+
+        if not loop:
+            break
+        start = 0
+
+
+def add_args(parser):
+    parser.add_argument("file", type=str)
+    parser.add_argument("--speed", type=float, default=1, help="Playback speed.")
+    parser.add_argument("--start", type=float, default=0, help="Seconds into the recording to start at.")
+    parser.add_argument("--loop", action="store_true")
+
+
+def preload(args):
+    return load_asset(("recording", os.path.abspath(args.file)), Recording, args.file)
+
+
+def setup(disp: Display, args):
+    recording = preload(args)
+    if recording.shape != disp.board.shape:
+        raise ValueError(f"Recording is {recording.shape}, board is {disp.board.shape}")
+    if len(recording) == 0:
+        print("Recording is empty")
+        return
+    print(f"{len(recording)} frames, {recording.duration():.1f} s")
+
+    disp.add_daemon(replay_daemon, (disp, recording, args.speed, args.start, args.loop))
+
+
+def main():
+    disp = Display()
+    add_args(disp.parser)
+    setup(disp, disp.parser.parse_args())
+    disp.start()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,45 +5,49 @@ Cool repeating text animations of Ultimate and I.
 import argparse
 import math
 import random
-import time
+from collections import deque
 
 import numpy as np
 
-from display import Display
+from display import Display, load_npy
+from layout import COLS
+
+# Daemons only use what process daemons get, so --processes works (see Display.add_daemon).
+PROCESS_SAFE = True
 
 
 def generate_border(text: np.ndarray) -> np.ndarray:
+    # Any of the 8 neighbors set, by ORing shifted copies.
+    padded = np.pad(text, 1)
     border = np.zeros((text.shape[0], text.shape[1]), dtype=bool)
-    for x in range(text.shape[1]):
-        for y in range(text.shape[0]):
-            for dx in [-1, 0, 1]:
-                for dy in [-1, 0, 1]:
-                    if (0 <= x + dx < text.shape[1]) and (0 <= y + dy < text.shape[0]) and not (dx == 0 and dy == 0):
-                        if text[y + dy, x + dx]:
-                            border[y, x] = True
+    for dx in [-1, 0, 1]:
+        for dy in [-1, 0, 1]:
+            if not (dx == 0 and dy == 0):
+                border |= padded[1 + dy : padded.shape[0] - 1 + dy, 1 + dx : padded.shape[1] - 1 + dx]
 
     border = np.logical_and(border, np.logical_not(text))
     return border
 
 
 def erase(disp: Display, fill=False):
+    layout = disp.layout
     choice = random.random()
     if choice < 0.2:
-        # Sweep erase
-        for x in range(disp.board.shape[1]):
-            for y in range(disp.board.shape[0]):
-                disp.board[y, x] = fill
-                time.sleep(1.5e-3)
-                if not disp.run:
-                    return
+        # Sweep erase, column by column.
+        for i in range(0, layout.size, layout.step):
+            disp.board.T.flat[i : i + layout.step] = fill
+            disp.commit()
+            disp.sleep(1.5e-3)
+            if not disp.run:
+                return
 
     elif choice < 0.4:
         # Random erase
-        coords = [(x, y) for x in range(disp.board.shape[1]) for y in range(disp.board.shape[0])]
-        random.shuffle(coords)
-        for x, y in coords:
-            disp.board[y, x] = fill
-            time.sleep(1e-3)
+        order = np.random.permutation(layout.size)
+        for i in range(0, layout.size, layout.step):
+            disp.board.flat[order[i : i + layout.step]] = fill
+            disp.commit()
+            disp.sleep(1e-3)
             if not disp.run:
                 return
 
@@ -51,12 +55,10 @@ def erase(disp: Display, fill=False):
         # Radial erase
         radius = 0
         while True:
-            for x in range(disp.board.shape[1]):
-                for y in range(disp.board.shape[0]):
-                    if math.hypot(x - disp.board.shape[1] // 2, y - disp.board.shape[0] // 2) < radius:
-                        disp.board[y, x] = fill
-            radius += 1
-            time.sleep(0.06)
+            disp.board[layout.distance < radius] = fill
+            radius += layout.cols / COLS
+            disp.commit()
+            disp.sleep(0.06)
             if not disp.run:
                 return
 
@@ -70,15 +72,12 @@ def erase(disp: Display, fill=False):
         num_streaks = random.randint(1, 5)
         angle_thres = 0
         interval = np.interp(num_streaks, [1, 5], [0.03, 0.06])
+        angles = ((layout.angle * num_streaks) % (2 * math.pi)) / num_streaks
         while True:
-            for x in range(disp.board.shape[1]):
-                for y in range(disp.board.shape[0]):
-                    angle = math.atan2(y - disp.board.shape[0] // 2, x - disp.board.shape[1] // 2)
-                    angle = ((angle * num_streaks) % (2 * math.pi)) / num_streaks
-                    if angle < angle_thres:
-                        disp.board[y, x] = fill
+            disp.board[angles < angle_thres] = fill
             angle_thres += 0.05
-            time.sleep(interval)
+            disp.commit()
+            disp.sleep(interval)
             if not disp.run:
                 return
 
@@ -99,10 +98,10 @@ def erase(disp: Display, fill=False):
             locs += vel
             vel[:, 0] += 0.04
             disp.board[:] = fill
-            for i in range(locs.shape[0]):
-                if 0 <= locs[i, 0] < disp.board.shape[0] and 0 <= locs[i, 1] < disp.board.shape[1]:
-                    disp.board[int(locs[i, 0]), int(locs[i, 1])] = not fill
-            time.sleep(0.03)
+            inside = (0 <= locs[:, 0]) & (locs[:, 0] < layout.rows) & (0 <= locs[:, 1]) & (locs[:, 1] < layout.cols)
+            disp.board[locs[inside, 0].astype(int), locs[inside, 1].astype(int)] = not fill
+            disp.commit()
+            disp.sleep(0.03)
             if not disp.run:
                 return
 
@@ -117,27 +116,25 @@ def falling_columns(disp: Display, text, interval=0.015, disappear=False):
         if text[:, x].any():
             max_y = np.max(np.where(text[:, x]))
             for y_offset in range(max_y + 1):
+                # Column of text shifted up by shift.
+                shift = y_offset + 1 if disappear else max_y - y_offset
                 disp.board[:, x] = False
-                for y in range(text.shape[0]):
-                    y_text = y + y_offset + 1 if disappear else y + max_y - y_offset
-                    if 0 <= y_text < text.shape[0]:
-                        disp.board[y, x] = text[y_text, x]
-                    else:
-                        break
+                disp.board[: text.shape[0] - shift, x] = text[shift:, x]
+                disp.commit()
                 if not disp.run:
                     return
-                time.sleep(interval)
+                disp.sleep(interval)
 
 
 def floodfill(disp: Display, text, interval=0.03, disappear=False, bfs=False):
     text = text.copy()
+    filled = 0
     while text.any():
-        stack = []
+        stack = deque()
         where = np.where(text)
         stack.append((where[0][0], where[1][0]))
         while stack:
-            index = 0 if bfs else -1
-            y, x = stack.pop(index)
+            y, x = stack.popleft() if bfs else stack.pop()
             if text[y, x]:
                 text[y, x] = False
                 disp.board[y, x] = not disappear
@@ -148,44 +145,49 @@ def floodfill(disp: Display, text, interval=0.03, disappear=False, bfs=False):
                                 stack.append((y + dy, x + dx))
             else:
                 continue
-            time.sleep(interval)
+            filled += 1
+            if filled % disp.layout.step:
+                continue
+            disp.commit()
+            disp.sleep(interval)
             if not disp.run:
                 return
 
 
 def pixel_slide_in(disp: Display, text, steps=100, interval=0.03, disappear=False):
+    rows, cols = disp.layout.shape
     coords = np.argwhere(text)
-    # Generate starting locs (y, x)
+    count = coords.shape[0]
+    # Generate starting locs (y, x): a random point just off the left or right
+    # edge, or the top or bottom edge.
     start = np.empty_like(coords)
-    for i in range(coords.shape[0]):
-        if random.random() < 0.5:
-            start[i] = (random.randint(0, disp.board.shape[0] - 1), -5 if random.random() < 0.5 else disp.board.shape[1] + 5)
-        else:
-            start[i] = (-5 if random.random() < 0.5 else disp.board.shape[0] + 5, random.randint(0, disp.board.shape[1] - 1))
+    sides = np.random.random(count) < 0.5
+    before = np.random.random(count) < 0.5
+    start[:, 0] = np.where(sides, np.random.randint(0, rows, count), np.where(before, -5, rows + 5))
+    start[:, 1] = np.where(sides, np.where(before, -5, cols + 5), np.random.randint(0, cols, count))
 
     # Pixel specific duration
-    duration = np.random.randint(int(0.7 * steps), steps, size=coords.shape[0])
+    duration = np.random.randint(int(0.7 * steps), steps, size=count)
     for i in range(steps):
         disp.board[:] = False
-        for j in range(coords.shape[0]):
-            if i >= duration[j]:
-                loc = start[j] if disappear else coords[j]
-            else:
-                fac = i / duration[j]
-                if disappear:
-                    fac = 1 - fac
-                loc = (fac * coords[j] + (1 - fac) * start[j]).astype(int)
-            y, x = loc
-            if 0 <= y < disp.board.shape[0] and 0 <= x < disp.board.shape[1]:
-                disp.board[y, x] = True
+        done = i >= duration
+        fac = (i / duration)[:, None]
+        if disappear:
+            fac = 1 - fac
+        locs = (fac * coords + (1 - fac) * start).astype(int)
+        locs[done] = start[done] if disappear else coords[done]
+        inside = (0 <= locs[:, 0]) & (locs[:, 0] < rows) & (0 <= locs[:, 1]) & (locs[:, 1] < cols)
+        disp.board[locs[inside, 0], locs[inside, 1]] = True
+        disp.commit()
 
-        time.sleep(interval)
+        disp.sleep(interval)
 
 
 def elastic_slide(disp: Display, text, force=1e-2, dampening=0.07, interval=0.03, steps=200):
     # (y, x)
     loc = np.array([-text.shape[0], -text.shape[1]], dtype=float)
     velocity = np.random.uniform(-1, 1, size=2)
+    coords = np.argwhere(text)
 
     for i in range(steps):
         if i > steps * 0.8:
@@ -196,13 +198,13 @@ def elastic_slide(disp: Display, text, force=1e-2, dampening=0.07, interval=0.03
             loc += velocity
 
         disp.board[:] = False
-        for y, x in np.argwhere(text):
-            loc_y = int(loc[0] + y)
-            loc_x = int(loc[1] + x)
-            if 0 <= loc_y < disp.board.shape[0] and 0 <= loc_x < disp.board.shape[1]:
-                disp.board[loc_y, loc_x] = True
+        loc_y = (loc[0] + coords[:, 0]).astype(int)
+        loc_x = (loc[1] + coords[:, 1]).astype(int)
+        inside = (0 <= loc_y) & (loc_y < disp.board.shape[0]) & (0 <= loc_x) & (loc_x < disp.board.shape[1])
+        disp.board[loc_y[inside], loc_x[inside]] = True
+        disp.commit()
 
-        time.sleep(interval)
+        disp.sleep(interval)
 
 
 def matrix(disp: Display, text_negative, interval=0.05):
@@ -220,25 +222,24 @@ def matrix(disp: Display, text_negative, interval=0.05):
 
         image = np.roll(image, 1, axis=0)
         image[0, :] = False
-        for x in range(len(source)):
-            if source[x] > 0:
-                image[0, x] = True
-            source[x] = max(0, source[x] - 1)
-            if random.random() < density:
-                source[x] = random.randint(2, 5)
+        image[0, source > 0] = True
+        np.maximum(source - 1, 0, out=source)
+        new = np.random.random(len(source)) < density
+        source[new] = np.random.randint(2, 6, size=new.sum())
 
         disp.board = np.logical_and(image, np.logical_not(text_negative))
-        time.sleep(interval)
+        disp.sleep(interval)
         if not disp.run:
             return
 
 
+def preload(args):
+    return [load_npy(path) for path in ("ultimate.npy", "I.npy", "toast.npy", "boom.npy", "arrniey.npy")]
+
+
 def text(disp: Display):
-    ulti = np.load("ultimate.npy")
-    illinois = np.load("I.npy")
-    toast = np.load("toast.npy")
-    boom = np.load("boom.npy")
-    arrniey = np.load("arrniey.npy")
+    # Patterns are made for the 27x81 board.
+    ulti, illinois, toast, boom, arrniey = (disp.layout.resize(pattern) for pattern in preload(None))
     ulti_border = generate_border(ulti)
     ulti_and_i = np.logical_and(np.logical_or(ulti, illinois), np.logical_not(np.logical_and(ulti_border, illinois)))
 
@@ -262,14 +263,14 @@ def text(disp: Display):
             # Matrix
             mask = random.choice(matrix_masks)
             matrix(disp, mask)
-            time.sleep(2)
+            disp.sleep(2)
             erase(disp)
 
         elif choice < 0.45:
             # Floodfill
             text = random.choice(text_masks)
             floodfill(disp, text, bfs=random.random() < 0.5)
-            time.sleep(2)
+            disp.sleep(2)
             if random.random() < 0.3:
                 floodfill(disp, text, disappear=True, bfs=random.random() < 0.5)
             else:
@@ -279,7 +280,7 @@ def text(disp: Display):
             # Falling columns
             text = random.choice(text_masks)
             falling_columns(disp, text)
-            time.sleep(2)
+            disp.sleep(2)
             if random.random() < 0.3:
                 falling_columns(disp, text, disappear=True)
             else:
@@ -289,7 +290,7 @@ def text(disp: Display):
             # Pixel slide in
             text = random.choice(text_masks)
             pixel_slide_in(disp, text)
-            time.sleep(2)
+            disp.sleep(2)
             if random.random() < 0.3:
                 pixel_slide_in(disp, text, disappear=True)
             else:
@@ -299,15 +300,19 @@ def text(disp: Display):
             # Elastic slide in
             text = random.choice(text_masks)
             elastic_slide(disp, text)
-            time.sleep(2)
+            disp.sleep(2)
             erase(disp)
 
-        time.sleep(2)
+        disp.sleep(2)
+
+
+def setup(disp: Display, args):
+    disp.add_daemon(text, (disp,))
 
 
 def main():
     disp = Display()
-    disp.add_daemon(text, (disp,))
+    setup(disp, disp.parser.parse_args())
     disp.start()
 
 
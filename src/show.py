@@ -0,0 +1,333 @@
+"""
+Show host: one Display that switches between programs without restarting.
+
+Programs are loaded as plugins. A program module has setup(disp, args),
+which adds its daemons and keydown hooks, and optionally add_args(parser)
+for its own args and preload(args) to load its assets ahead of time.
+Modules and assets stay loaded, so switching back to a program is instant.
+
+python show.py [program [args...]]
+python show.py --playlist show.json
+
+Playlists are JSON or YAML (needs PyYAML): a list of entries, or
+{"loop": true, "entries": [...]}. Each entry is
+    {"program": "clock", "args": ["--flag", ...] or "--flag ...", "duration": 60, "until": "done"}
+and ends after duration seconds, or with until "done" once the program's
+daemons have finished (the default without a duration), whichever is first.
+While one entry runs, the next one's assets are loaded in the background.
+
+Type commands on stdin, or send them to the control socket (--control):
+    program [args...]   Switch to a program, e.g. `clock` or `text --text Hello`.
+    preload program [args...]
+    stop                Stop the current program and blank the board.
+    list
+    quit
+Other control socket commands go to the current program.
+"""
+
+import argparse
+import importlib
+import itertools
+import json
+import shlex
+import sys
+import time
+from contextlib import contextmanager
+from threading import Lock, Thread
+
+import numpy as np
+
+from display import Display
+
+PROGRAMS = ("audio", "clock", "game_of_life", "image", "random_bw", "replay", "screensaver", "snake", "text")
+
+
+class Act:
+    """
+    One run of a program, in place of the Display it would get.
+    Forwards to the host's Display while current. Once stopped, run is False,
+    so the program's daemons wind down, and until they do, their writes go
+    to a scratch board instead of the display.
+    """
+
+    def __init__(self, disp: Display, name):
+        self.disp = disp
+        self.name = name
+        self.current = True
+        self.scratch = np.zeros_like(disp.board)
+        self.keydown_hooks = []
+        self.command_hooks = []
+        self.daemons = []
+
+    @property
+    def board(self):
+        return self.disp.board if self.current else self.scratch
+
+    @board.setter
+    def board(self, value):
+        if self.current:
+            self.disp.board = value
+        else:
+            self.scratch[...] = value
+
+    @property
+    def run(self):
+        return self.current and self.disp.run
+
+    def commit(self):
+        if self.current:
+            self.disp.commit()
+
+    def notify(self):
+        if self.current:
+            self.disp.notify()
+
+    @contextmanager
+    def frame(self):
+        if self.current:
+            with self.disp.frame() as board:
+                yield board
+        else:
+            yield self.scratch
+
+    def add_daemon(self, func, args, process=None):
+        # Process daemons would get the host's Display instead of the act.
+        daemon = self.disp.add_daemon(func, args, process=False)
+        self.daemons.append(daemon)
+        return daemon
+
+    def done(self):
+        return not any(daemon.is_alive() for daemon in self.daemons)
+
+    def stop(self):
+        self.current = False
+
+    def __getattr__(self, name):
+        return getattr(self.disp, name)
+
+
+def load_playlist(path):
+    """
+    Returns (entries, loop).
+    """
+    with open(path, "r") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            playlist = yaml.safe_load(f)
+        else:
+            playlist = json.load(f)
+    if isinstance(playlist, list):
+        playlist = {"entries": playlist}
+    return playlist["entries"], playlist.get("loop", False)
+
+
+def entry_command(entry):
+    args = entry.get("args", [])
+    if isinstance(args, str):
+        args = shlex.split(args)
+    return [entry["program"], *map(str, args)]
+
+
+class Host:
+    def __init__(self, disp: Display):
+        self.disp = disp
+        self.act = None
+        self.lock = Lock()
+        disp.keydown_hooks.append(self.keydown)
+        disp.command_hooks.append(self.control)
+
+    def keydown(self, disp, key):
+        act = self.act
+        if act is not None:
+            for hook in act.keydown_hooks:
+                hook(act, key)
+
+    def control(self, disp, words):
+        if words[0] in ("stop", "list", "preload") or words[0] in PROGRAMS:
+            return self.run_command(words)
+        act = self.act
+        if act is not None:
+            for hook in act.command_hooks:
+                reply = hook(act, words)
+                if reply is not None:
+                    return reply
+        return None
+
+    def load(self, command):
+        """
+        Import the program and parse its args. Returns (module, args).
+        """
+        name, *argv = command
+        if name not in PROGRAMS:
+            raise ValueError(f"Unknown program {name}")
+        module = importlib.import_module(name)
+        parser = argparse.ArgumentParser(prog=name)
+        if hasattr(module, "add_args"):
+            module.add_args(parser)
+        return module, parser.parse_args(argv)
+
+    def preload(self, command):
+        module, args = self.load(command)
+        if hasattr(module, "preload"):
+            module.preload(args)
+
+    def prefetch(self, command):
+        """
+        Preload in the background. Returns the thread.
+        """
+        thread = Thread(target=self.preload, args=(command,), daemon=True)
+        thread.start()
+        return thread
+
+    def play(self, disp: Display, entries, loop=False):
+        """
+        Daemon: run the playlist entries in order, prefetching the next one's assets.
+        Entries that fail to start are skipped. Stops the display at the end, unless looping.
+        """
+        commands = [entry_command(entry) for entry in entries]
+        order = itertools.cycle(range(len(entries))) if loop else range(len(entries))
+        prefetch = self.prefetch(commands[0])
+        failed = set()
+        for i in order:
+            if not disp.run or len(failed) == len(commands):
+                break
+            start = time.monotonic()
+            prefetch.join()
+            if time.monotonic() - start > 1e-3:
+                print(f"Waited {(time.monotonic() - start) * 1e3:.0f} ms for {commands[i][0]} assets")
+            if loop or i + 1 < len(commands):
+                prefetch = self.prefetch(commands[(i + 1) % len(commands)])
+            try:
+                self.run_command(commands[i])
+            except ValueError as e:
+                print(f"Skipping playlist entry {i}: {e}")
+                failed.add(i)
+                continue
+            failed.discard(i)
+            self.wait(disp, entries[i])
+
+        self.switch([])
+        disp.run = False
+
+    def check(self, entries):
+        """
+        Load every entry's program and parse its args, so a bad playlist fails
+        before the show starts. Raises ValueError on the first bad entry.
+        """
+        if not entries:
+            raise ValueError("Playlist has no entries")
+        for i, entry in enumerate(entries):
+            try:
+                self.load(entry_command(entry))
+            except KeyError as e:
+                raise ValueError(f"Playlist entry {i}: missing {e}")
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Playlist entry {i}: {e}")
+            except SystemExit:
+                # argparse exits on bad args, after printing them.
+                raise ValueError(f"Playlist entry {i}: bad arguments {entry.get('args')}")
+
+    def wait(self, disp: Display, entry):
+        """
+        Sleep until the entry's duration is over, or its program is done.
+        """
+        duration = entry.get("duration")
+        until_done = entry.get("until") == "done" or duration is None
+        end = disp.time() + (duration if duration is not None else float("inf"))
+        while disp.run and disp.time() < end:
+            if until_done and self.act is not None and self.act.done():
+                break
+            disp.sleep(min(end - disp.time(), 0.05) if until_done else end - disp.time())
+
+    def switch(self, command):
+        """
+        Stop the current program, and start the one in command (name and args), or none if empty.
+        """
+        module, args = self.load(command) if command else (None, None)
+        with self.lock:
+            start = time.monotonic()
+            if self.act is not None:
+                self.act.stop()
+                self.act = None
+            self.disp.board = np.zeros_like(self.disp.board)
+            if module is not None:
+                act = Act(self.disp, command[0])
+                module.setup(act, args)
+                self.act = act
+                print(f"Started {act.name} in {(time.monotonic() - start) * 1e3:.1f} ms")
+
+    def run_command(self, words):
+        """
+        Run a show command, other than quit. Returns the reply. Raises ValueError on errors.
+        """
+        try:
+            if words[0] == "stop":
+                self.switch([])
+            elif words[0] == "list":
+                return " ".join(PROGRAMS)
+            elif words[0] == "preload":
+                self.preload(words[1:])
+            else:
+                self.switch(words)
+        except OSError as e:
+            raise ValueError(e)
+        except SystemExit:
+            # argparse exits on bad args, after printing them.
+            raise ValueError(f"Bad arguments: {shlex.join(words)}")
+        return ""
+
+    def command(self, line):
+        """
+        Run one command line. Returns False on quit.
+        """
+        words = shlex.split(line)
+        if not words:
+            return True
+        if words[0] == "quit":
+            return False
+        try:
+            reply = self.run_command(words)
+            if reply:
+                print(reply)
+        except ValueError as e:
+            print(f"Error: {e}")
+        return True
+
+    def read_commands(self, stream):
+        """
+        Run commands from stream until quit. At the end of the stream (e.g.
+        stdin from /dev/null, or under a service manager) the show keeps running.
+        """
+        for line in stream:
+            if not self.disp.run:
+                return
+            if not self.command(line):
+                self.disp.run = False
+                return
+
+
+def main():
+    disp = Display()
+    disp.parser.add_argument("--playlist", help="Playlist file to run.")
+    disp.parser.add_argument("program", nargs=argparse.REMAINDER, help="Program (and its args) to start with.")
+    args = disp.parser.parse_args()
+
+    host = Host(disp)
+    # Warm up imports, so the first switch to any program is fast.
+    for name in PROGRAMS:
+        importlib.import_module(name)
+    if args.playlist is not None:
+        entries, loop = load_playlist(args.playlist)
+        try:
+            host.check(entries)
+        except ValueError as e:
+            sys.exit(f"Error: {e}")
+        disp.add_daemon(host.play, (disp, entries, loop), process=False)
+    elif args.program:
+        host.switch(args.program)
+    Thread(target=host.read_commands, args=(sys.stdin,), daemon=True).start()
+    disp.start()
+
+
+if __name__ == "__main__":
+    main()
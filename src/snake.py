@@ -4,7 +4,6 @@ Play snake game.
 
 import argparse
 import random
-import time
 
 import numpy as np
 import pygame
@@ -67,7 +66,7 @@ def snake_daemon(disp: Display, auto: bool):
 
     # Head last
     snake = DEFAULT_SNAKE.copy()
-    last_food_time = time.time()
+    last_food_time = disp.time()
     while disp.run:
         # Highlight border
         disp.board[0, :] = True
@@ -75,11 +74,11 @@ def snake_daemon(disp: Display, auto: bool):
         disp.board[:, 0] = True
         disp.board[:, -1] = True
 
-        if time.time() - last_food_time > 10 or food_loc is None:
+        if disp.time() - last_food_time > 10 or food_loc is None:
             if food_loc is not None:
                 disp.board[food_loc[1], food_loc[0]] = False
             food_loc = np.array([np.random.randint(4, disp.board.shape[1] - 5), np.random.randint(4, disp.board.shape[0] - 5)])
-            last_food_time = time.time()
+            last_food_time = disp.time()
 
         delta = [(0, -1), (1, 0), (0, 1), (-1, 0)][snake_dir]
         if (snake[-1] == food_loc).all():
@@ -105,9 +104,10 @@ def snake_daemon(disp: Display, auto: bool):
             game_running = False
             period = 0.1
 
-            time.sleep(1)
+            disp.commit()
+            disp.sleep(1)
             erase(disp, fill=True)
-            time.sleep(1)
+            disp.sleep(1)
             erase(disp, fill=False)
             draw_scrolling_text(disp, f"YOUR SCORE: {len(snake)}")
 
@@ -162,7 +162,8 @@ def snake_daemon(disp: Display, auto: bool):
                 set_snake_dir(new_dir)
 
         global_iter += 1
-        time.sleep(period)
+        disp.commit()
+        disp.sleep(period)
 
 
 def food_daemon(disp: Display):
@@ -171,20 +172,34 @@ def food_daemon(disp: Display):
         if food_loc is not None and game_running:
             tmp = food_loc.copy()
             disp.board[tmp[1], tmp[0]] = False
-            time.sleep(0.2)
+            disp.commit()
+            disp.sleep(0.2)
             disp.board[tmp[1], tmp[0]] = True
-        time.sleep(0.32)
+            disp.commit()
+        disp.sleep(0.32)
 
 
-def main():
-    disp = Display()
-    disp.parser.add_argument("--auto", action="store_true")
-    args = disp.parser.parse_args()
+def add_args(parser):
+    parser.add_argument("--auto", action="store_true")
+
+
+def setup(disp: Display, args):
+    global game_running, food_loc, snake_dir
+    # Start fresh when run again by show.py.
+    game_running = True
+    food_loc = None
+    snake_dir = 1
 
     if not args.auto:
         disp.keydown_hooks.append(key_handler)
     disp.add_daemon(snake_daemon, (disp, args.auto))
     disp.add_daemon(food_daemon, (disp,))
+
+
+def main():
+    disp = Display()
+    add_args(disp.parser)
+    setup(disp, disp.parser.parse_args())
     disp.start()
 
 
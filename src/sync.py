@@ -0,0 +1,335 @@
+"""
+Multi-node sync: one master computes the board, and followers (a small
+computer per projector, or processes on one machine) render it, all
+presenting each frame at the same time.
+
+Run the show on the master with --sync-master PORT, and a display on each
+node with --sync-follow MASTER:PORT, e.g. `python show.py --sync-follow 10.0.0.1:9300`.
+Followers find the master by syncing clocks with it, and it sends each
+committed board to every follower heard from in the last few seconds.
+
+Protocol, UDP datagrams, little endian. Times are nanoseconds of the
+sender's time.monotonic_ns().
+    Header: 4 byte magic b"APTS", uint8 type, 3 padding bytes.
+    Sync request (follower to master): type 1, uint64 t0, follower's send time.
+    Sync reply: type 2, uint64 t0, t1 (master's receive time), t2 (master's send time).
+    Frame: type 3, uint64 epoch (the master's start time), uint64 sequence,
+        uint64 present time (master's clock), uint16 rows, uint16 cols, then
+        the board, np.packbits in row order.
+Followers estimate the master's clock NTP style, from the reply with the
+shortest round trip among recent ones. A new epoch means the master
+restarted: followers start its sequence over and resync their clocks. Frames are sent delay seconds ahead
+of their present time, and the last one is resent periodically, so new or
+lossy followers catch up.
+"""
+
+import select
+import socket
+import struct
+import time
+from collections import deque
+from threading import Thread
+
+import numpy as np
+
+from recording import pack
+
+MAGIC = b"APTS"
+HEADER = struct.Struct("<4sB3x")
+SYNC_REQUEST = 1
+SYNC_REPLY = 2
+FRAME = 3
+TIMES = struct.Struct("<QQQ")
+FRAME_HEADER = struct.Struct("<QQQHH")
+
+
+class SyncMaster:
+    """
+    Sends committed boards to followers, and answers their clock sync requests.
+    """
+
+    def __init__(self, disp, port, delay=0.1, resend=0.5, follower_timeout=5):
+        """
+        delay: Seconds between a commit and when followers present it. Must
+            cover network latency and jitter.
+        resend: Resend the current frame after this many seconds without a commit.
+        follower_timeout: Forget followers not heard from in this many seconds.
+        """
+        self.disp = disp
+        self.delay = delay
+        self.resend = resend
+        self.follower_timeout = follower_timeout
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("0.0.0.0", port))
+        # Address -> last time heard from, in seconds.
+        self.followers = {}
+        self.board = np.zeros_like(disp.board)
+        self.epoch = time.time_ns()
+        self.sequence = 0
+        self.packet = None
+        self.frames = 0
+        self.requests = 0
+        self.threads = []
+
+    def start(self):
+        for target in (self.serve, self.broadcast):
+            thread = Thread(target=target, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def serve(self):
+        """
+        Answer sync requests, and remember who sent them.
+        """
+        while self.disp.run:
+            if not select.select([self.sock], [], [], 0.1)[0]:
+                continue
+            try:
+                data, address = self.sock.recvfrom(64)
+            except OSError:
+                continue
+            received = time.monotonic_ns()
+            if len(data) != HEADER.size + 8 or HEADER.unpack_from(data) != (MAGIC, SYNC_REQUEST):
+                continue
+            self.requests += 1
+            t0 = struct.unpack_from("<Q", data, HEADER.size)[0]
+            new = address not in self.followers
+            self.followers[address] = time.monotonic()
+            reply = HEADER.pack(MAGIC, SYNC_REPLY) + TIMES.pack(t0, received, time.monotonic_ns())
+            self.sock.sendto(reply, address)
+            if new and self.packet is not None:
+                # Don't make it wait for the next commit.
+                self.sock.sendto(self.packet, address)
+
+    def broadcast(self):
+        """
+        Send each commit, and resend the current frame when nothing changes.
+        """
+        disp = self.disp
+        version = -1
+        while disp.run:
+            with disp.changed:
+                disp.changed.wait_for(lambda: disp.version != version or not disp.run, timeout=self.resend)
+            if disp.version != version:
+                version = disp.version
+                self.capture()
+            elif not np.array_equal(disp.front, self.board):
+                # Written without a commit.
+                self.capture()
+            self.send()
+
+    def capture(self):
+        with self.disp.board_lock:
+            np.copyto(self.board, self.disp.front)
+        self.sequence += 1
+        present = time.monotonic_ns() + int(self.delay * 1e9)
+        rows, cols = self.board.shape
+        self.packet = (
+            HEADER.pack(MAGIC, FRAME) + FRAME_HEADER.pack(self.epoch, self.sequence, present, rows, cols)
+            + pack(self.board).tobytes()
+        )
+        self.frames += 1
+
+    def send(self):
+        if self.packet is None:
+            return
+        now = time.monotonic()
+        for address, seen in list(self.followers.items()):
+            if now - seen > self.follower_timeout:
+                del self.followers[address]
+                continue
+            try:
+                self.sock.sendto(self.packet, address)
+            except OSError:
+                pass
+
+    def print_stats(self):
+        print(f"Sync master: {self.frames} frames, {self.requests} sync requests, {len(self.followers)} followers.")
+
+    def close(self):
+        for thread in self.threads:
+            thread.join()
+        self.sock.close()
+
+
+class SyncFollower:
+    """
+    Keeps a clock offset to the master, and commits each frame it sends at
+    its present time, less lead seconds for rendering.
+    """
+
+    def __init__(self, disp, master, interval=1, samples=8, lead=None, history=1000, clock_offset=0):
+        """
+        master: (host, port) of the master.
+        interval: Seconds between clock sync requests, once synced.
+        samples: Number of recent sync replies to pick the best from.
+        lead: Seconds to commit ahead of the present time, so the frame is on
+            screen in time. Default the display's recent mean frame time.
+        clock_offset: Nanoseconds added to this node's clock, to test syncing
+            clocks that differ on one machine.
+        """
+        self.disp = disp
+        self.master = master
+        self.interval = interval
+        self.lead = lead
+        self.clock_offset = clock_offset
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("0.0.0.0", 0))
+        self.shape = disp.board.shape
+        self.board = np.zeros(self.shape, dtype=bool)
+
+        # (round trip, offset) of recent replies. Master clock = local clock + offset.
+        self.samples = deque(maxlen=samples)
+        self.offset = None
+        self.rtt = None
+        self.requests = 0
+        # Frames waiting for their time, as (present time in the master's clock, sequence, board).
+        self.pending = []
+        self.epoch = None
+        self.sequence = None
+        self.received = 0
+        self.applied = 0
+        self.dropped = 0
+        # Commit time minus target time, in seconds, and (sequence, time.monotonic_ns()) of recent commits.
+        self.lateness = deque(maxlen=history)
+        self.log = deque(maxlen=history)
+        self.thread = None
+
+    def now(self):
+        return time.monotonic_ns() + self.clock_offset
+
+    def start(self):
+        self.thread = Thread(target=self.loop, daemon=True)
+        self.thread.start()
+
+    def loop(self):
+        next_request = 0
+        while self.disp.run:
+            now = time.monotonic()
+            if now >= next_request:
+                self.request()
+                # Sync quickly at first.
+                next_request = now + (0.05 if len(self.samples) < self.samples.maxlen else self.interval)
+
+            timeout = next_request - now
+            due = self.due_time()
+            if due is not None:
+                timeout = min(timeout, due)
+            if select.select([self.sock], [], [], max(min(timeout, 0.1), 0))[0]:
+                self.receive()
+            self.apply_due()
+
+    def request(self):
+        self.requests += 1
+        data = HEADER.pack(MAGIC, SYNC_REQUEST) + struct.pack("<Q", self.now())
+        try:
+            self.sock.sendto(data, self.master)
+        except OSError:
+            pass
+
+    def receive(self):
+        try:
+            data = self.sock.recv(65536)
+        except OSError:
+            return
+        received = self.now()
+        if len(data) < HEADER.size or HEADER.unpack_from(data)[0] != MAGIC:
+            return
+        kind = HEADER.unpack_from(data)[1]
+        if kind == SYNC_REPLY and len(data) == HEADER.size + TIMES.size:
+            t0, t1, t2 = TIMES.unpack_from(data, HEADER.size)
+            rtt = (received - t0) - (t2 - t1)
+            offset = ((t1 - t0) + (t2 - received)) // 2
+            self.samples.append((rtt, offset))
+            self.rtt, self.offset = min(self.samples)
+        elif kind == FRAME:
+            epoch, sequence, present, rows, cols = FRAME_HEADER.unpack_from(data, HEADER.size)
+            offset = HEADER.size + FRAME_HEADER.size
+            if (rows, cols) != self.shape or len(data) != offset + (rows * cols + 7) // 8:
+                self.dropped += 1
+                return
+            if epoch != self.epoch:
+                self.restart(epoch)
+            if self.sequence is not None and sequence <= self.sequence:
+                # Resent or late.
+                return
+            self.sequence = sequence
+            self.received += 1
+            packed = np.frombuffer(data, dtype=np.uint8, offset=offset)
+            board = np.unpackbits(packed, count=rows * cols).reshape(self.shape).astype(bool)
+            self.pending.append((present, sequence, board))
+            self.pending.sort(key=lambda frame: frame[0])
+
+    def restart(self, epoch):
+        """
+        Forget the previous master's frames and clock, and resync.
+        """
+        if self.epoch is not None:
+            print("Sync master restarted")
+            self.samples.clear()
+            self.offset = None
+            self.rtt = None
+            self.request()
+        self.epoch = epoch
+        self.sequence = None
+        self.pending = []
+
+    def lead_ns(self):
+        if self.lead is not None:
+            return int(self.lead * 1e9)
+        times = self.disp.scheduler.frame_times
+        if not times:
+            return 0
+        recent = list(times)[-30:]
+        return int(sum(recent) / len(recent) * 1e9)
+
+    def due_time(self):
+        """
+        Seconds until the next pending frame is due, or None.
+        """
+        if not self.pending or self.offset is None:
+            return None
+        return (self.pending[0][0] - self.lead_ns() - (self.now() + self.offset)) / 1e9
+
+    def apply_due(self):
+        if self.offset is None:
+            return
+        # Only the newest due frame is shown.
+        lead = self.lead_ns()
+        master_now = self.now() + self.offset
+        due = [frame for frame in self.pending if frame[0] - lead <= master_now]
+        if not due:
+            return
+        self.pending = self.pending[len(due):]
+        present, sequence, board = due[-1]
+        np.copyto(self.board, board)
+        self.disp.board = self.board
+        self.applied += 1
+        self.lateness.append((self.now() + self.offset - (present - lead)) / 1e9)
+        self.log.append((sequence, time.monotonic_ns()))
+
+    def stats(self):
+        lateness = np.array(self.lateness) if self.lateness else np.zeros(1)
+        return {
+            "received": self.received,
+            "applied": self.applied,
+            "dropped": self.dropped,
+            "offset": (self.offset or 0) / 1e9,
+            "rtt": (self.rtt or 0) / 1e9,
+            "late_p50": float(np.percentile(lateness, 50)),
+            "late_p99": float(np.percentile(lateness, 99)),
+        }
+
+    def print_stats(self):
+        stats = self.stats()
+        print(
+            f"Sync follower: {stats['received']} received, {stats['applied']} applied, {stats['dropped']} invalid. "
+            f"Clock offset {stats['offset'] * 1e3:.3f} ms, round trip {stats['rtt'] * 1e3:.3f} ms. "
+            f"Commit lateness p50 {stats['late_p50'] * 1e3:.2f} ms, p99 {stats['late_p99'] * 1e3:.2f} ms."
+        )
+
+    def close(self):
+        if self.thread is not None:
+            self.thread.join()
+        self.sock.close()
@@ -1,98 +1,188 @@
 """
 Display text on the board.
+
+With --control, `set-text TEXT` switches to scrolling TEXT, repeating.
 """
 
 import argparse
+import itertools
 import os
 import random
-import time
+from threading import Event, Lock
 
 import cv2
 import numpy as np
 import pygame
 
-from display import Display
+from display import Display, load_asset
+from layout import ROWS
 
 DEFAULT_FONT = "./Aldrich-Regular.ttf"
 
 
-def render_text(text, font=None):
+def render_text(text, font=None, height=ROWS):
     """
     Render text as boolean array.
-    Vertical size equal to disp.board vertical size.
+    Vertical size height, pass disp.layout.rows.
     Horziontal size variable.
     """
     if font is None:
         font = DEFAULT_FONT
+    # 2 rows of padding above and below on the 27 row board.
+    pad = round(height * 2 / ROWS)
+    glyph_height = height - 2 * pad
+    size = 24 * height // ROWS
     if os.path.isfile(font):
-        font = pygame.font.Font(font, 24)
+        font = pygame.font.Font(font, size)
     else:
-        font = pygame.font.SysFont(font, 24)
+        font = pygame.font.SysFont(font, size)
 
     if len(text) == 0:
-        text = np.zeros((23, 1), dtype=bool)
+        text = np.zeros((glyph_height, 1), dtype=bool)
     else:
         text_transparent = font.render(text, True, (255, 255, 255))
         text = pygame.Surface(text_transparent.get_size())
         text.fill((0, 0, 0))
         text.blit(text_transparent, (0, 0))
         text = pygame.surfarray.array3d(text).mean(axis=2).astype(np.uint8).swapaxes(0, 1)
-        text = cv2.resize(text, (int(text.shape[1] / text.shape[0] * 23 * 0.7), 23))
+        text = cv2.resize(text, (int(text.shape[1] / text.shape[0] * glyph_height * 0.7), glyph_height))
 
-    padding = np.zeros((2, text.shape[1]), dtype=bool)
+    padding = np.zeros((pad, text.shape[1]), dtype=bool)
     text = np.concatenate((padding, text, padding), axis=0)
     text = text > 80
 
     return text
 
 
-def draw_scrolling_text(disp: Display, text, font=None):
+def draw_scrolling_text(disp: Display, text, font=None, interrupt=None):
     """
     Draw text that scrolls across screen.
+    interrupt: Event that stops scrolling early when set.
     """
-    text = render_text(text, font=font)
+    rows, cols = disp.layout.shape
+    text = load_asset(("text", text, font, rows), render_text, text, font, rows)
 
     # Pad zeros horizontally on both sides
-    zeros = np.zeros((27, 85), dtype=bool)
+    zeros = np.zeros((rows, cols + 4), dtype=bool)
     text = np.concatenate((zeros, text, zeros), axis=1)
 
     # Scrolling display
     for i in range(0, text.shape[1] - disp.board.shape[1], 2):
         disp.board[:] = text[:, i : i + disp.board.shape[1]]
-        time.sleep(0.07)
-        if not disp.run:
+        disp.commit()
+        disp.sleep(0.07)
+        if not disp.run or (interrupt is not None and interrupt.is_set()):
+            break
+
+
+class TextInterrupt:
+    """
+    Tells a running draw_daemon that args changed, or finds it has finished.
+    Both under one lock, so text set as the daemon exits isn't lost.
+    """
+
+    def __init__(self):
+        self.event = Event()
+        self.lock = Lock()
+        self.running = True
+
+    def is_set(self):
+        return self.event.is_set()
+
+    def clear(self):
+        self.event.clear()
+
+    def set(self):
+        """
+        Interrupt the daemon. Returns False if it has finished (or is about
+        to) instead, and counts it running again: start a new one.
+        """
+        with self.lock:
+            if self.running:
+                self.event.set()
+                return True
+            self.running = True
+            return False
+
+    def finish(self):
+        """
+        Called by the daemon once done. Returns False if interrupted meanwhile,
+        so it starts over instead of exiting.
+        """
+        with self.lock:
+            if self.event.is_set():
+                return False
+            self.running = False
+            return True
+
+
+def draw_daemon(disp: Display, args, interrupt: TextInterrupt = None):
+    """
+    interrupt: Set when args changed. Starts over with the new args.
+    """
+    while disp.run:
+        if interrupt is not None:
+            interrupt.clear()
+        if args.file is not None:
+            with open(args.file, "r") as f:
+                lines = f.readlines()
+            if args.shuffle:
+                random.shuffle(lines)
+        elif args.text is not None:
+            lines = [args.text]
+        else:
+            lines = []
+
+        for line in itertools.cycle(lines) if args.repeat else lines:
+            draw_scrolling_text(disp, line.strip(), args.font, interrupt)
+            if not disp.run or (interrupt is not None and interrupt.is_set()):
+                break
+        if interrupt is None or interrupt.finish():
             break
 
 
-def draw_daemon(disp: Display, args):
+def add_args(parser):
+    parser.add_argument("--text", type=str, help="Manually set single text.")
+    parser.add_argument("--file", type=str, help="Display from file.")
+    parser.add_argument("--shuffle", action="store_true", help="Whether to shuffle contents of file.")
+    parser.add_argument("--repeat", action="store_true")
+    parser.add_argument("--font", type=str)
+
+
+def preload(args):
+    """
+    Render all text ahead of time.
+    """
+    lines = [args.text] if args.text is not None else []
     if args.file is not None:
         with open(args.file, "r") as f:
             lines = f.readlines()
-        if args.shuffle:
-            random.shuffle(lines)
-        while disp.run:
-            for line in lines:
-                draw_scrolling_text(disp, line.strip(), args.font)
-            if not args.repeat:
-                break
+    for line in lines:
+        load_asset(("text", line.strip(), args.font, ROWS), render_text, line.strip(), args.font)
 
-    elif args.text is not None:
-        while disp.run:
-            draw_scrolling_text(disp, args.text, args.font)
-            if not args.repeat:
-                break
+
+def setup(disp: Display, args):
+    interrupt = TextInterrupt()
+    # The interrupt can't be shared with a process.
+    disp.add_daemon(draw_daemon, (disp, args, interrupt), process=False)
+
+    def command_hook(disp: Display, words):
+        if words[0] != "set-text":
+            return None
+        args.text = " ".join(words[1:])
+        args.file = None
+        args.repeat = True
+        if not interrupt.set():
+            disp.add_daemon(draw_daemon, (disp, args, interrupt), process=False)
+        return ""
+
+    disp.command_hooks.append(command_hook)
 
 
 def main():
     disp = Display()
-    disp.parser.add_argument("--text", type=str, help="Manually set single text.")
-    disp.parser.add_argument("--file", type=str, help="Display from file.")
-    disp.parser.add_argument("--shuffle", action="store_true", help="Whether to shuffle contents of file.")
-    disp.parser.add_argument("--repeat", action="store_true")
-    disp.parser.add_argument("--font", type=str)
-    args = disp.parser.parse_args()
-
-    disp.add_daemon(draw_daemon, (disp, args))
+    add_args(disp.parser)
+    setup(disp, disp.parser.parse_args())
     disp.start()
 
 
@@ -0,0 +1,69 @@
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from ingest import FrameReceiver, FrameSender
+
+
+def receive(receiver, frames):
+    deadline = time.monotonic() + 5
+    while receiver.applied < frames and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_sender_restart():
+    disp = SimpleNamespace(board=np.zeros((27, 81), dtype=bool), run=True)
+    receiver = FrameReceiver(disp, udp=("127.0.0.1", 0))
+    receiver.start()
+    address = receiver.sockets[0].getsockname()
+    board = np.zeros((27, 81), dtype=bool)
+    try:
+        sender = FrameSender(udp=address)
+        sender.sequence = 36000
+        sender.send(board)
+        receive(receiver, 1)
+        sender.close()
+
+        # Same sequence numbers from a new sender are not late frames.
+        sender = FrameSender(udp=address)
+        sender.session += 1
+        for i in range(3):
+            board[0, i] = True
+            sender.send(board)
+            receive(receiver, 2 + i)
+        sender.close()
+        assert receiver.dropped == 0
+        assert receiver.sequence == 3
+        assert disp.board[0, :3].all()
+    finally:
+        disp.run = False
+        receiver.thread.join()
+        receiver.close()
+
+
+def test_large_board():
+    disp = SimpleNamespace(board=np.zeros((270, 810), dtype=bool), run=True)
+    receiver = FrameReceiver(disp, udp=("127.0.0.1", 0))
+    receiver.start()
+    sender = FrameSender(udp=receiver.sockets[0].getsockname())
+    try:
+        sender.send(np.ones((270, 810), dtype=bool))
+        receive(receiver, 1)
+        assert receiver.invalid == 0
+        assert disp.board.all()
+    finally:
+        sender.close()
+        disp.run = False
+        receiver.thread.join()
+        receiver.close()
+
+
+def test_unix_path_not_a_socket(tmp_path):
+    disp = SimpleNamespace(board=np.zeros((27, 81), dtype=bool), run=True)
+    path = tmp_path / "board"
+    path.write_text("not a socket")
+    with pytest.raises(FileExistsError):
+        FrameReceiver(disp, unix=str(path))
+    assert path.read_text() == "not a socket"
@@ -0,0 +1,23 @@
+import sys
+import time
+
+from display import Display
+
+
+def test_board_time_of_committing_daemon(monkeypatch):
+    monkeypatch.setattr(sys, "argv", sys.argv[:1])
+    disp = Display(load_params=False, geometry_cache=None, headless=True)
+
+    def daemon(disp):
+        for _ in range(5):
+            disp.board[0, 0] = not disp.board[0, 0]
+            # Drawing takes a while.
+            time.sleep(0.01)
+            disp.commit()
+            disp.sleep(0.05)
+
+    disp.add_daemon(daemon, (disp,)).join()
+    monitor = disp.monitors[-1]
+    assert monitor.board_time >= 0.05
+    # Sleeping doesn't count.
+    assert monitor.board_time < monitor.slept
@@ -0,0 +1,35 @@
+import sys
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from display import Display
+
+
+@pytest.mark.parametrize("engine,mono", [("full", False), ("full", True), ("dirty", False)])
+def test_steady_state_allocation(engine, mono, monkeypatch):
+    monkeypatch.setattr(sys, "argv", sys.argv[:1])
+    disp = Display(load_params=False, geometry_cache=None, engine=engine, mono=mono, headless=True)
+    rng = np.random.default_rng(0)
+    boards = [rng.random(disp.board.shape) < 0.5 for _ in range(8)]
+
+    def draw(frames):
+        for i in range(frames):
+            disp.board[...] = boards[i % len(boards)]
+            disp.draw_board()
+
+    # Builds the geometry, buffers and surface.
+    draw(20)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        draw(100)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Well under one frame buffer (1280x720).
+    assert current - before < 4096
+    if engine == "full":
+        # Not even temporaries: every buffer is reused.
+        assert peak - before < 4096
@@ -0,0 +1,27 @@
+import numpy as np
+
+from display import SharedBoard
+
+
+def test_read_committed():
+    shared = SharedBoard((27, 81))
+    out = np.zeros((27, 81), dtype=bool)
+    try:
+        assert shared.read_committed(out, 0) is None
+
+        # Written but not committed.
+        shared.board[:] = True
+        assert shared.read_committed(out, 0) is None
+
+        shared.publish()
+        sequence = shared.read_committed(out, 0)
+        assert sequence is not None
+        assert out.all()
+        assert shared.read_committed(out, sequence) is None
+
+        # A commit in progress isn't read.
+        shared.commit_view[0] += 1
+        assert shared.read_committed(out, sequence) is None
+    finally:
+        shared.close()
+        shared.unlink()
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from display import DrawParams, FullRenderer, Geometry, SparseRenderer
+from layout import BoardLayout
+
+
+@pytest.mark.parametrize("radius", [1, 2, 3, 4, 5, 6])
+def test_sparse_matches_full(radius):
+    params = DrawParams()
+    params.radius = radius
+    # Skewed, so the warp isn't just a scale.
+    params.tr = (80, 740)
+    geometry = Geometry(params, 1280, 720)
+    full = FullRenderer(channels=1)
+    sparse = SparseRenderer()
+    rng = np.random.default_rng(radius)
+    for density in (0.1, 0.5, 0.9):
+        board = rng.random((27, 81)) < density
+        expected = full.render(board, geometry).astype(int)
+        assert np.abs(sparse.render(board, geometry).astype(int) - expected).max() <= 3
+
+
+def test_sparse_matches_full_fitted():
+    # A board too large for the window, fitted with a pitch of ~2 pixels, so
+    # every dot is overlapped by several later ones.
+    params = DrawParams()
+    params.tr = (80, 740)
+    geometry = Geometry(params, 320, 180, BoardLayout(54, 162))
+    full = FullRenderer(channels=1)
+    sparse = SparseRenderer()
+    rng = np.random.default_rng(0)
+    for density in (0.1, 0.5, 0.9):
+        board = rng.random((54, 162)) < density
+        diff = np.abs(sparse.render(board, geometry).astype(int) - full.render(board, geometry).astype(int))
+        # Rounding adds up where many dots overlap, but stays small.
+        assert diff.max() <= 6
+        assert diff.mean() < 0.2
@@ -0,0 +1,42 @@
+import socket
+from types import SimpleNamespace
+
+import numpy as np
+
+from recording import pack
+from sync import FRAME, FRAME_HEADER, HEADER, MAGIC, SyncFollower
+
+
+def frame(epoch, sequence, board):
+    rows, cols = board.shape
+    return HEADER.pack(MAGIC, FRAME) + FRAME_HEADER.pack(epoch, sequence, 0, rows, cols) + pack(board).tobytes()
+
+
+def test_master_restart():
+    disp = SimpleNamespace(board=np.zeros((27, 81), dtype=bool), run=True)
+    master = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    master.bind(("127.0.0.1", 0))
+    follower = SyncFollower(disp, master.getsockname(), lead=0)
+    address = ("127.0.0.1", follower.sock.getsockname()[1])
+    board = np.ones((27, 81), dtype=bool)
+    try:
+        for sequence in range(1000, 1003):
+            master.sendto(frame(1, sequence, board), address)
+            follower.receive()
+        assert follower.sequence == 1002
+
+        # Resent frame from the same master.
+        master.sendto(frame(1, 1002, board), address)
+        follower.receive()
+        assert follower.received == 3
+
+        # Restarted master: new epoch, sequence starts over.
+        for sequence in (1, 2, 3):
+            master.sendto(frame(2, sequence, board), address)
+            follower.receive()
+        assert follower.received == 6
+        assert follower.sequence == 3
+        assert [frame[1] for frame in follower.pending] == [1, 2, 3]
+    finally:
+        master.close()
+        follower.sock.close()